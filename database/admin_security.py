@@ -1,7 +1,7 @@
 # database/admin_security.py
 from datetime import datetime, timedelta, timezone
 from typing import Optional, Tuple
-from database.db import get_connection
+from database.db import get_connection, to_async
 
 UTC = timezone.utc
 
@@ -82,3 +82,11 @@ def get_last_attempt_at(tg_id: int) -> Optional[datetime]:
         row = cur.fetchone()
         return row[0] if row else None
 
+
+# --- Асинхронные версии для хендлеров ---
+get_security_state_async = to_async(get_security_state)
+set_lock_async = to_async(set_lock)
+clear_lock_and_attempts_async = to_async(clear_lock_and_attempts)
+increment_attempt_async = to_async(increment_attempt)
+is_locked_async = to_async(is_locked)
+get_last_attempt_at_async = to_async(get_last_attempt_at)
@@ -1,4 +1,4 @@
-from database.db import get_connection
+from database.db import get_connection, to_async
 
 def is_admin(tg_id: int) -> bool:
     with get_connection() as conn:
@@ -26,4 +26,11 @@ def get_all_admins() -> list[dict]:
     return [
         {"tg_id": row[0], "username": row[1], "full_name": row[2]}
         for row in rows
-    ]
\ No newline at end of file
+    ]
+
+
+
+# --- Асинхронные версии для хендлеров ---
+is_admin_async = to_async(is_admin)
+add_admin_async = to_async(add_admin)
+get_all_admins_async = to_async(get_all_admins)
@@ -0,0 +1,158 @@
+from collections import defaultdict
+
+from database.db import get_connection, to_async
+from database.clients import get_clients_page
+
+
+CLIENT_COLUMNS = """
+    id, telegram_id, username, full_name, age, city, phone, workplace,
+    client_photo_id, passport_main_id, passport_address_id
+"""
+
+SCOOTER_FIELDS = (
+    "id", "model", "vin", "motor_vin", "issue_date", "tariff_type", "weekly_price", "buyout_weeks",
+    "has_contract", "has_second_keys", "has_tracker", "has_limiter", "has_pedals", "has_sim",
+)
+
+# Сколько последних заметок показываем в карточке
+CARD_NOTES_LIMIT = 5
+
+
+def _client_from_row(row) -> dict:
+    return {
+        "id": row[0],
+        "telegram_id": row[1],
+        "username": row[2],
+        "full_name": row[3],
+        "age": row[4],
+        "city": row[5],
+        "phone": row[6],
+        "workplace": row[7],
+        "client_photo_id": row[8],
+        "passport_main_id": row[9],
+        "passport_address_id": row[10],
+    }
+
+
+def _attach_card_data(cur, clients: list):
+    """
+    Догружает к клиентам всё, что нужно для карточки, пятью запросами на всю страницу
+    (вместо 4–5 запросов на каждого клиента и каждый скутер):
+    client["scooters"] (у каждого — "payments" и "postpones"), client["custom_photos"], client["notes"].
+    """
+    if not clients:
+        return clients
+
+    client_ids = [c["id"] for c in clients]
+    for c in clients:
+        c["scooters"] = []
+        c["custom_photos"] = []
+        c["notes"] = []
+    by_client = {c["id"]: c for c in clients}
+
+    # Скутеры
+    cur.execute(f"""
+        SELECT client_id, {", ".join(SCOOTER_FIELDS)}
+        FROM scooters
+        WHERE client_id = ANY(%s)
+        ORDER BY client_id, id
+    """, (client_ids,))
+    scooters = {}
+    for row in cur.fetchall():
+        scooter = dict(zip(SCOOTER_FIELDS, row[1:]))
+        scooter["payments"] = []
+        scooter["postpones"] = []
+        scooters[scooter["id"]] = scooter
+        by_client[row[0]]["scooters"].append(scooter)
+
+    if scooters:
+        scooter_ids = list(scooters)
+
+        # Платежи — в том же виде, что get_payments_by_scooter
+        cur.execute("""
+            SELECT scooter_id, id, payment_date, amount, is_paid, paid_at
+            FROM payments
+            WHERE scooter_id = ANY(%s)
+            ORDER BY scooter_id, payment_date ASC
+        """, (scooter_ids,))
+        for row in cur.fetchall():
+            scooters[row[0]]["payments"].append(tuple(row[1:]))
+
+        # Активные переносы — сразу словарями для format_payment_schedule
+        cur.execute("""
+            SELECT scooter_id, original_date, scheduled_date, with_fine, fine_amount, requested_at
+            FROM payment_postpones
+            WHERE scooter_id = ANY(%s) AND is_closed = FALSE
+        """, (scooter_ids,))
+        for row in cur.fetchall():
+            scooters[row[0]]["postpones"].append({
+                "original_date": row[1],
+                "scheduled_date": row[2],
+                "with_fine": row[3],
+                "fine_amount": row[4],
+                "requested_at": row[5],
+            })
+
+    # Доп. фото
+    cur.execute("""
+        SELECT client_id, file_id
+        FROM client_photos
+        WHERE client_id = ANY(%s)
+        ORDER BY client_id, uploaded_at
+    """, (client_ids,))
+    for client_id, file_id in cur.fetchall():
+        by_client[client_id]["custom_photos"].append(file_id)
+
+    # Последние заметки каждого клиента
+    cur.execute("""
+        SELECT client_id, note, created_at
+        FROM (
+            SELECT client_id, note, created_at,
+                   ROW_NUMBER() OVER (PARTITION BY client_id ORDER BY created_at DESC) AS rn
+            FROM client_notes
+            WHERE client_id = ANY(%s)
+        ) t
+        WHERE rn <= %s
+        ORDER BY client_id, created_at DESC
+    """, (client_ids, CARD_NOTES_LIMIT))
+    notes = defaultdict(list)
+    for client_id, note, created_at in cur.fetchall():
+        notes[client_id].append((note, created_at))
+    for client_id, items in notes.items():
+        by_client[client_id]["notes"] = items
+
+    return clients
+
+
+# Страница карточек клиентов по курсору: (cards, next_cursor, total_estimate), см. get_clients_page
+def get_client_cards_page(cursor: int = None, per_page: int = 5, backward: bool = False):
+    clients, next_cursor, total = get_clients_page(cursor, per_page, backward)
+    if not clients:
+        return clients, next_cursor, total
+    with get_connection() as conn:
+        with conn.cursor() as cur:
+            _attach_card_data(cur, clients)
+    return clients, next_cursor, total
+
+
+# Карточка одного клиента (поиск, возврат к клиенту)
+def get_client_card(client_id: int):
+    with get_connection() as conn:
+        with conn.cursor() as cur:
+            cur.execute(f"""
+                SELECT {CLIENT_COLUMNS}
+                FROM clients
+                WHERE id = %s
+            """, (client_id,))
+            row = cur.fetchone()
+            if not row:
+                return None
+            client = _client_from_row(row)
+            _attach_card_data(cur, [client])
+            return client
+
+
+
+# --- Асинхронные версии для хендлеров ---
+get_client_cards_page_async = to_async(get_client_cards_page)
+get_client_card_async = to_async(get_client_card)
@@ -1,6 +1,8 @@
-from database.db import get_connection
+from database.db import get_connection, to_async, estimate_rows
 
-from psycopg2.extras import DictCursor
+import re
+
+from psycopg2.extras import RealDictCursor
 
 
 ALLOWED_CLIENT_FIELDS = {
@@ -75,23 +77,119 @@ def get_all_clients():
             return clients
 
 
-
-def search_clients(query):
+# Страница клиентов по курсору (keyset): (rows, next_cursor, total_estimate).
+# cursor — id клиента, на котором остановились; backward=True — страница перед ним.
+# Сортировка по COALESCE(full_name, ''), id: клиенты без имени идут первыми и не выпадают из keyset.
+# next_cursor — id последнего клиента страницы, если дальше есть ещё клиенты, иначе None.
+def get_clients_page(cursor: int = None, limit: int = 5, backward: bool = False):
     with get_connection() as conn:
-        with conn.cursor(cursor_factory=DictCursor) as cur:
-            sql = """
-                SELECT * FROM clients
-                WHERE
-                    full_name ILIKE %s OR
-                    city ILIKE %s OR
-                    phone ILIKE %s OR
-                    CAST(telegram_id AS TEXT) ILIKE %s OR
-                    username ILIKE %s
+        with conn.cursor() as cur:
+            columns = """
+                id, telegram_id, username, full_name, age, city, phone, workplace,
+                client_photo_id, passport_main_id, passport_address_id
             """
-            param = f"%{query}%"
-            cur.execute(sql, (param, param, param, param, param))
-            return cur.fetchall()
-        
+            if cursor is None:
+                cur.execute(f"""
+                    SELECT {columns}
+                    FROM clients
+                    ORDER BY COALESCE(full_name, ''), id
+                    LIMIT %s
+                """, (limit + 1,))
+            elif not backward:
+                cur.execute(f"""
+                    SELECT {columns}
+                    FROM clients
+                    WHERE (COALESCE(full_name, ''), id) > (SELECT COALESCE(full_name, ''), id FROM clients WHERE id = %s)
+                    ORDER BY COALESCE(full_name, ''), id
+                    LIMIT %s
+                """, (cursor, limit + 1))
+            else:
+                cur.execute(f"""
+                    SELECT {columns}
+                    FROM clients
+                    WHERE (COALESCE(full_name, ''), id) < (SELECT COALESCE(full_name, ''), id FROM clients WHERE id = %s)
+                    ORDER BY COALESCE(full_name, '') DESC, id DESC
+                    LIMIT %s
+                """, (cursor, limit))
+            rows = cur.fetchall()
+
+            if backward and cursor is not None:
+                rows = rows[::-1]
+                has_more = True         # клиент-курсор и всё после него никуда не делись
+            else:
+                has_more = len(rows) > limit
+                rows = rows[:limit]
+
+            clients = [{
+                "id": row[0],
+                "telegram_id": row[1],
+                "username": row[2],
+                "full_name": row[3],
+                "age": row[4],
+                "city": row[5],
+                "phone": row[6],
+                "workplace": row[7],
+                "client_photo_id": row[8],
+                "passport_main_id": row[9],
+                "passport_address_id": row[10]
+            } for row in rows]
+
+            next_cursor = clients[-1]["id"] if has_more and clients else None
+            return clients, next_cursor, estimate_rows(cur, "clients")
+
+
+# Сколько клиентов максимум показываем в результатах поиска
+SEARCH_LIMIT = 20
+# Порог похожести для нечёткого поиска по имени (опечатки)
+SEARCH_SIMILARITY = 0.3
+
+
+# Поиск клиентов для админки: только поля для списка, самые похожие сверху, не больше limit
+def search_clients(query: str, limit: int = SEARCH_LIMIT):
+    q = (query or "").strip()
+    if q.startswith("@"):
+        q = q[1:]
+    if not q:
+        return []
+    digits = re.sub(r"\D", "", q)
+    is_number = bool(digits) and re.fullmatch(r"[\d\s()+\-]+", q) is not None
+    pattern = f"%{q}%"
+
+    with get_connection() as conn:
+        with conn.cursor(cursor_factory=RealDictCursor) as cur:
+            if is_number:
+                # номер телефона или Telegram ID: точное совпадение ID выше всего
+                cur.execute("""
+                    SELECT id, telegram_id, username, full_name, city, phone
+                    FROM clients
+                    WHERE telegram_id = %(tg_id)s OR phone_digits LIKE %(digits_pattern)s
+                    ORDER BY (telegram_id = %(tg_id)s) DESC, full_name
+                    LIMIT %(limit)s
+                """, {
+                    "tg_id": int(digits) if len(digits) <= 18 else None,
+                    "digits_pattern": f"%{digits}%",
+                    "limit": limit,
+                })
+            else:
+                # подстрока по имени/городу/username (GIN trgm) + нечёткое совпадение по имени
+                cur.execute("SELECT set_config('pg_trgm.word_similarity_threshold', %s, true)", (str(SEARCH_SIMILARITY),))
+                cur.execute("""
+                    SELECT id, telegram_id, username, full_name, city, phone
+                    FROM clients
+                    WHERE full_name ILIKE %(pattern)s
+                       OR %(q)s <%% full_name
+                       OR city ILIKE %(pattern)s
+                       OR username ILIKE %(pattern)s
+                    ORDER BY GREATEST(
+                                 word_similarity(%(q)s, full_name),
+                                 similarity(city, %(q)s),
+                                 similarity(COALESCE(username, ''), %(q)s)
+                             ) DESC,
+                             full_name
+                    LIMIT %(limit)s
+                """, {"q": q, "pattern": pattern, "limit": limit})
+            return [dict(row) for row in cur.fetchall()]
+
 
 
 def get_client_by_id(client_id: int):
@@ -143,6 +241,19 @@ def get_custom_photos_by_client(client_id: int):
             return [row[0] for row in cur.fetchall()]            
         
 
+def add_client_photos(client_id: int, file_ids: list):
+    if not file_ids:
+        return
+    with get_connection() as conn:
+        with conn.cursor() as cur:
+            for file_id in file_ids:
+                cur.execute("""
+                    INSERT INTO client_photos (client_id, file_id, uploaded_at)
+                    VALUES (%s, %s, NOW())
+                """, (client_id, file_id))
+        conn.commit()
+
+
 def delete_client_full(client_id: int):
     with get_connection() as conn:
         with conn.cursor() as cur:
@@ -173,4 +284,18 @@ def delete_client_full(client_id: int):
             # Удаление самого клиента
             cur.execute("DELETE FROM clients WHERE id = %s", (client_id,))
 
-        conn.commit()        
\ No newline at end of file
+        conn.commit()
+
+
+
+# --- Асинхронные версии для хендлеров ---
+add_client_async = to_async(add_client)
+get_client_by_tg_id_async = to_async(get_client_by_tg_id)
+get_all_clients_async = to_async(get_all_clients)
+get_clients_page_async = to_async(get_clients_page)
+search_clients_async = to_async(search_clients)
+get_client_by_id_async = to_async(get_client_by_id)
+update_client_field_async = to_async(update_client_field)
+get_custom_photos_by_client_async = to_async(get_custom_photos_by_client)
+add_client_photos_async = to_async(add_client_photos)
+delete_client_full_async = to_async(delete_client_full)
@@ -1,7 +1,279 @@
+import asyncio
+import functools
+import threading
+import time
+from concurrent.futures import ThreadPoolExecutor
+from os import getenv
 
 import psycopg2
-from os import getenv
+from psycopg2 import pool, sql
+from dotenv import load_dotenv
+
+load_dotenv()
+
+# Настройки пула (можно переопределить через .env)
+DB_POOL_MIN = int(getenv("DB_POOL_MIN", 1))
+DB_POOL_MAX = int(getenv("DB_POOL_MAX", 10))
+# Сколько ждать свободное соединение, прежде чем упасть (сек)
+DB_POOL_TIMEOUT = float(getenv("DB_POOL_TIMEOUT", 10))
+# Соединение старше этого возраста закрывается и открывается заново (сек)
+DB_POOL_MAX_LIFETIME = float(getenv("DB_POOL_MAX_LIFETIME", 1800))
+# Соединение, пролежавшее в пуле дольше этого, проверяется SELECT 1 перед выдачей (сек)
+DB_POOL_HEALTHCHECK_IDLE = float(getenv("DB_POOL_HEALTHCHECK_IDLE", 30))
+
+
+_pool = None
+_pool_lock = threading.Lock()
+_executor = None              # потоки, в которых выполняются async-версии запросов
+_slots = None                 # семафор: не больше DB_POOL_MAX выданных соединений
+_conn_meta = {}               # id(conn) -> {"created": ts, "released": ts}
+
+_stats = {
+    "acquired": 0,
+    "released": 0,
+    "created": 0,
+    "recycled": 0,
+    "healthcheck_failed": 0,
+    "timeouts": 0,
+    "wait_time_total": 0.0,
+}
+
+
+def init_pool(minconn: int = None, maxconn: int = None):
+    """Создаёт общий пул соединений. Вызывается один раз при старте бота."""
+    global _pool, _slots
+    with _pool_lock:
+        if _pool is not None:
+            return _pool
+        minconn = DB_POOL_MIN if minconn is None else minconn
+        maxconn = DB_POOL_MAX if maxconn is None else maxconn
+        _pool = pool.ThreadedConnectionPool(minconn, maxconn, getenv("DB_URL"))
+        _slots = threading.BoundedSemaphore(maxconn)
+        now = time.monotonic()
+        # соединения, открытые пулом при создании (minconn)
+        for conn in _pool._pool:
+            _conn_meta[id(conn)] = {"created": now, "released": now}
+            _stats["created"] += 1
+        print(f"[DB] Пул соединений создан: min={minconn}, max={maxconn}")
+        return _pool
+
+
+def close_pool():
+    """Закрывает все соединения пула. Вызывается при остановке бота."""
+    global _pool, _slots, _executor
+    with _pool_lock:
+        if _pool is None:
+            return
+        _pool.closeall()
+        _pool = None
+        if _executor is not None:
+            _executor.shutdown(wait=False)
+        _slots = None
+        _executor = None
+        _conn_meta.clear()
+        print("[DB] Пул соединений закрыт")
+
+
+def _get_pool():
+    if _pool is None:
+        # на случай скриптов/тестов, которые не вызвали init_pool явно
+        init_pool()
+    return _pool
+
+
+def _is_healthy(conn) -> bool:
+    if conn.closed:
+        return False
+    try:
+        with conn.cursor() as cur:
+            cur.execute("SELECT 1")
+        conn.rollback()
+        return True
+    except psycopg2.Error:
+        return False
+
+
+def _acquire():
+    p = _get_pool()
+    started = time.monotonic()
+    if not _slots.acquire(timeout=DB_POOL_TIMEOUT):
+        _stats["timeouts"] += 1
+        raise pool.PoolError(f"Нет свободных соединений в пуле за {DB_POOL_TIMEOUT} сек")
+
+    try:
+        conn = p.getconn()
+        now = time.monotonic()
+        meta = _conn_meta.get(id(conn))
+        if meta is None:
+            meta = _conn_meta[id(conn)] = {"created": now, "released": now}
+            _stats["created"] += 1
+
+        expired = now - meta["created"] > DB_POOL_MAX_LIFETIME
+        stale = now - meta["released"] > DB_POOL_HEALTHCHECK_IDLE
+        if expired or conn.closed or (stale and not _is_healthy(conn)):
+            if expired:
+                _stats["recycled"] += 1
+            else:
+                _stats["healthcheck_failed"] += 1
+            _conn_meta.pop(id(conn), None)
+            p.putconn(conn, close=True)
+            conn = p.getconn()
+            _conn_meta[id(conn)] = {"created": time.monotonic(), "released": time.monotonic()}
+            _stats["created"] += 1
+    except Exception:
+        _slots.release()
+        raise
+
+    _stats["acquired"] += 1
+    _stats["wait_time_total"] += time.monotonic() - started
+    return conn
+
+
+def _release(conn):
+    p = _pool
+    try:
+        if p is None:
+            conn.close()
+            return
+        broken = conn.closed or conn.info.transaction_status != psycopg2.extensions.TRANSACTION_STATUS_IDLE
+        if broken and not conn.closed:
+            # незакрытая транзакция (например, SELECT без commit) — откатываем
+            try:
+                conn.rollback()
+                broken = False
+            except psycopg2.Error:
+                pass
+        meta = _conn_meta.get(id(conn))
+        if meta is not None:
+            meta["released"] = time.monotonic()
+        if broken:
+            _conn_meta.pop(id(conn), None)
+        p.putconn(conn, close=broken)
+        _stats["released"] += 1
+    finally:
+        if _slots is not None:
+            _slots.release()
+
+
+class PooledConnection:
+    """
+    Обёртка над соединением из пула.
+    Ведёт себя как psycopg2-соединение (cursor/commit/rollback),
+    но `close()` и выход из `with` возвращают соединение в пул, а не закрывают его.
+    """
+
+    def __init__(self, conn):
+        self._conn = conn
+        self._released = False
+
+    def __getattr__(self, name):
+        return getattr(self._conn, name)
+
+    def __enter__(self):
+        return self
+
+    def __exit__(self, exc_type, exc, tb):
+        # та же семантика, что у `with psycopg2.connect(...)`: commit или rollback
+        try:
+            if not self._conn.closed:
+                if exc_type is None:
+                    self._conn.commit()
+                else:
+                    self._conn.rollback()
+        finally:
+            self.close()
+        return False
+
+    def close(self):
+        if self._released:
+            return
+        self._released = True
+        _release(self._conn)
+
+
+# До такого размера таблицы считаем строки точно, дальше берём оценку планировщика
+DB_EXACT_COUNT_LIMIT = int(getenv("DB_EXACT_COUNT_LIMIT", 10000))
+
+
+def estimate_rows(cur, table: str) -> int:
+    """
+    Примерное число строк в таблице для «Стр. N/M» без COUNT(*) по всей таблице.
+    Берёт reltuples из pg_class (обновляется autovacuum/ANALYZE);
+    для маленьких и ещё не проанализированных таблиц считает точно.
+    """
+    cur.execute("SELECT reltuples::bigint FROM pg_class WHERE oid = to_regclass(%s)", (table,))
+    row = cur.fetchone()
+    estimate = row[0] if row else -1
+    if estimate is None or estimate < DB_EXACT_COUNT_LIMIT:
+        cur.execute(f"SELECT COUNT(*) FROM {table}")
+        return cur.fetchone()[0]
+    return estimate
+
+
+def get_connection() -> PooledConnection:
+    return PooledConnection(_acquire())
+
+
+def open_dedicated_connection():
+    """
+    Отдельное от пула соединение в autocommit — для того, что держит соединение всё время работы
+    (LISTEN, advisory-lock лидера). keepalive: обрыв сети замечаем за ~30 сек, а не за часы.
+    """
+    conn = psycopg2.connect(
+        getenv("DB_URL"),
+        keepalives=1, keepalives_idle=10, keepalives_interval=5, keepalives_count=3,
+    )
+    conn.set_isolation_level(psycopg2.extensions.ISOLATION_LEVEL_AUTOCOMMIT)
+    return conn
+
+
+def open_listen_connection(*channels: str):
+    """
+    Отдельное соединение с LISTEN на каналы (pg_notify);
+    читать уведомления: conn.poll() и conn.notifies (см. utils/reminder_planner.py).
+    """
+    conn = open_dedicated_connection()
+    with conn.cursor() as cur:
+        for channel in channels:
+            cur.execute(sql.SQL("LISTEN {}").format(sql.Identifier(channel)))
+    return conn
+
+
+def _get_executor():
+    global _executor
+    if _executor is None:
+        with _pool_lock:
+            if _executor is None:
+                # потоков столько же, сколько соединений: лишние всё равно ждали бы пул
+                _executor = ThreadPoolExecutor(max_workers=DB_POOL_MAX, thread_name_prefix="db")
+    return _executor
+
+
+def to_async(fn):
+    """
+    Делает awaitable-двойника синхронной функции из database/*.
+    Запрос выполняется в отдельном потоке с соединением из пула,
+    поэтому медленный SQL не останавливает event loop бота.
+    """
+    @functools.wraps(fn)
+    async def wrapper(*args, **kwargs):
+        loop = asyncio.get_running_loop()
+        return await loop.run_in_executor(_get_executor(), functools.partial(fn, *args, **kwargs))
+    return wrapper
 
 
-def get_connection():
-    return psycopg2.connect(getenv("DB_URL"))
+def get_pool_stats() -> dict:
+    """Метрики пула: сколько соединений выдано/свободно, сколько пересоздано и т.п."""
+    p = _pool
+    stats = dict(_stats)
+    stats["avg_wait_ms"] = round(stats["wait_time_total"] / stats["acquired"] * 1000, 3) if stats["acquired"] else 0.0
+    if p is None:
+        stats.update({"initialized": False, "in_use": 0, "idle": 0, "max": DB_POOL_MAX})
+        return stats
+    stats.update({
+        "initialized": True,
+        "in_use": len(p._used),
+        "idle": len(p._pool),
+        "max": p.maxconn,
+    })
+    return stats
@@ -0,0 +1,116 @@
+import pickle
+
+import psycopg2
+from apscheduler.job import Job
+from apscheduler.jobstores.base import BaseJobStore, ConflictingIdError, JobLookupError
+from apscheduler.util import datetime_to_utc_timestamp, utc_timestamp_to_datetime
+
+from database.db import get_connection
+
+
+class PostgresJobStore(BaseJobStore):
+    """
+    Хранилище задач APScheduler в таблице apscheduler_jobs (миграция 0007) через наш пул psycopg2 —
+    то же, что SQLAlchemyJobStore, но без SQLAlchemy. Задача хранится как pickle состояния Job,
+    поэтому func задаётся текстовой ссылкой "модуль:объект", а аргументы должны быть сериализуемы.
+    """
+
+    def __init__(self, table: str = "apscheduler_jobs", pickle_protocol: int = pickle.HIGHEST_PROTOCOL):
+        super().__init__()
+        self.table = table
+        self.pickle_protocol = pickle_protocol
+
+    def _reconstitute_job(self, job_state: bytes) -> Job:
+        state = pickle.loads(job_state)
+        state["jobstore"] = self
+        job = Job.__new__(Job)
+        job.__setstate__(state)
+        job._scheduler = self._scheduler
+        job._jobstore_alias = self._alias
+        return job
+
+    def _get_jobs(self, where: str = "", params: tuple = ()) -> list:
+        with get_connection() as conn:
+            with conn.cursor() as cur:
+                cur.execute(f"""
+                    SELECT id, job_state
+                    FROM {self.table}
+                    {where}
+                    ORDER BY next_run_time ASC NULLS LAST
+                """, params)
+                rows = cur.fetchall()
+
+        jobs, failed = [], []
+        for job_id, job_state in rows:
+            try:
+                jobs.append(self._reconstitute_job(bytes(job_state)))
+            except Exception:
+                self._logger.exception("Не удалось восстановить задачу %s — удаляю", job_id)
+                failed.append(job_id)
+
+        if failed:
+            with get_connection() as conn:
+                with conn.cursor() as cur:
+                    cur.execute(f"DELETE FROM {self.table} WHERE id = ANY(%s)", (failed,))
+        return jobs
+
+    def lookup_job(self, job_id):
+        with get_connection() as conn:
+            with conn.cursor() as cur:
+                cur.execute(f"SELECT job_state FROM {self.table} WHERE id = %s", (job_id,))
+                row = cur.fetchone()
+        return self._reconstitute_job(bytes(row[0])) if row else None
+
+    def get_due_jobs(self, now):
+        return self._get_jobs("WHERE next_run_time <= %s", (datetime_to_utc_timestamp(now),))
+
+    def get_next_run_time(self):
+        with get_connection() as conn:
+            with conn.cursor() as cur:
+                cur.execute(f"SELECT MIN(next_run_time) FROM {self.table} WHERE next_run_time IS NOT NULL")
+                row = cur.fetchone()
+        return utc_timestamp_to_datetime(row[0]) if row and row[0] is not None else None
+
+    def get_all_jobs(self):
+        jobs = self._get_jobs()
+        self._fix_paused_jobs_sorting(jobs)
+        return jobs
+
+    def add_job(self, job):
+        state = pickle.dumps(job.__getstate__(), self.pickle_protocol)
+        try:
+            with get_connection() as conn:
+                with conn.cursor() as cur:
+                    cur.execute(f"""
+                        INSERT INTO {self.table} (id, next_run_time, job_state)
+                        VALUES (%s, %s, %s)
+                    """, (job.id, datetime_to_utc_timestamp(job.next_run_time), psycopg2.Binary(state)))
+        except psycopg2.IntegrityError:
+            raise ConflictingIdError(job.id)
+
+    def update_job(self, job):
+        state = pickle.dumps(job.__getstate__(), self.pickle_protocol)
+        with get_connection() as conn:
+            with conn.cursor() as cur:
+                cur.execute(f"""
+                    UPDATE {self.table}
+                    SET next_run_time = %s, job_state = %s
+                    WHERE id = %s
+                """, (datetime_to_utc_timestamp(job.next_run_time), psycopg2.Binary(state), job.id))
+                if cur.rowcount == 0:
+                    raise JobLookupError(job.id)
+
+    def remove_job(self, job_id):
+        with get_connection() as conn:
+            with conn.cursor() as cur:
+                cur.execute(f"DELETE FROM {self.table} WHERE id = %s", (job_id,))
+                if cur.rowcount == 0:
+                    raise JobLookupError(job_id)
+
+    def remove_all_jobs(self):
+        with get_connection() as conn:
+            with conn.cursor() as cur:
+                cur.execute(f"DELETE FROM {self.table}")
+
+    def __repr__(self):
+        return f"<{self.__class__.__name__} (table={self.table})>"
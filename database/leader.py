@@ -0,0 +1,124 @@
+import asyncio
+from os import getenv
+
+import psycopg2
+from dotenv import load_dotenv
+
+from database.db import open_dedicated_connection
+
+
+load_dotenv()
+
+# Ключ advisory-lock лидера (у миграций свой — 7_310_001)
+LEADER_LOCK_KEY = int(getenv("LEADER_LOCK_KEY", 7_310_002))
+# Как часто follower пытается стать лидером, а лидер проверяет, что lock ещё за ним (сек)
+LEADER_CHECK_INTERVAL = float(getenv("LEADER_CHECK_INTERVAL", 10))
+
+
+class LeaderElection:
+    """
+    Выбор одного лидера среди процессов бота через pg_try_advisory_lock.
+    Lock сессионный и держится на отдельном соединении: если процесс упал или потерял связь с базой,
+    Postgres сам освобождает lock, и лидером становится другой процесс.
+    on_elected / on_demoted — корутины: запустить / остановить то, что должно работать в одном экземпляре
+    (общие задачи APScheduler, напоминания об оплате).
+    """
+
+    def __init__(self, on_elected, on_demoted, lock_key: int = LEADER_LOCK_KEY,
+                 interval: float = LEADER_CHECK_INTERVAL):
+        self.on_elected = on_elected
+        self.on_demoted = on_demoted
+        self.lock_key = lock_key
+        self.interval = interval
+        self.is_leader = False
+        self._conn = None
+        self._task = None
+
+    # --- Синхронные вызовы (в потоке) ---
+
+    def _close(self):
+        if self._conn is not None:
+            try:
+                self._conn.close()
+            except psycopg2.Error:
+                pass
+            self._conn = None
+
+    def _try_acquire(self) -> bool:
+        try:
+            if self._conn is None or self._conn.closed:
+                self._conn = open_dedicated_connection()
+            with self._conn.cursor() as cur:
+                cur.execute("SELECT pg_try_advisory_lock(%s)", (self.lock_key,))
+                return cur.fetchone()[0]
+        except psycopg2.Error as e:
+            print(f"[LEADER] база недоступна: {e}")
+            self._close()
+            return False
+
+    def _still_holding(self) -> bool:
+        try:
+            with self._conn.cursor() as cur:
+                cur.execute("""
+                    SELECT EXISTS (
+                        SELECT 1 FROM pg_locks
+                        WHERE locktype = 'advisory' AND pid = pg_backend_pid() AND granted AND objsubid = 1
+                          AND ((classid::bigint << 32) | objid::bigint) = %s
+                    )
+                """, (self.lock_key,))
+                return cur.fetchone()[0]
+        except (psycopg2.Error, AttributeError) as e:
+            print(f"[LEADER] соединение с lock потеряно: {e}")
+            self._close()
+            return False
+
+    # --- Цикл ---
+
+    async def _set_leader(self, leader: bool):
+        self.is_leader = leader
+        if not leader:
+            print("[LEADER] лидерство потеряно")
+            try:
+                await self.on_demoted()
+            except Exception as e:
+                print(f"[LEADER] ❌ ошибка при снятии лидерства: {e}")
+            return
+
+        print("[LEADER] 👑 этот процесс — лидер")
+        try:
+            await self.on_elected()
+        except Exception as e:
+            # лидер, который ничего не запустил, хуже, чем никакого: держит lock и не даёт другим.
+            # Откатываем то, что успело запуститься, отпускаем lock и пробуем на следующем круге
+            print(f"[LEADER] ❌ не удалось запустить задачи лидера: {e}; отпускаю lock")
+            self.is_leader = False
+            try:
+                await self.on_demoted()
+            except Exception as e:
+                print(f"[LEADER] ❌ ошибка при откате: {e}")
+            await asyncio.to_thread(self._close)
+
+    async def _run(self):
+        while True:
+            if not self.is_leader:
+                if await asyncio.to_thread(self._try_acquire):
+                    await self._set_leader(True)
+            elif not await asyncio.to_thread(self._still_holding):
+                await self._set_leader(False)
+            await asyncio.sleep(self.interval)
+
+    async def start(self):
+        self._task = asyncio.create_task(self._run(), name="leader-election")
+
+    async def stop(self):
+        if self._task is not None:
+            self._task.cancel()
+            try:
+                await self._task
+            except asyncio.CancelledError:
+                pass
+            self._task = None
+        if self.is_leader:
+            await self._set_leader(False)
+        # закрытие соединения отпускает lock — другой процесс подхватит лидерство
+        await asyncio.to_thread(self._close)
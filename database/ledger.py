@@ -0,0 +1,104 @@
+from datetime import date
+
+from psycopg2.extras import RealDictCursor
+
+from database.db import get_connection, to_async
+from utils.time_utils import get_today
+
+
+# Канал NOTIFY с id клиента при каждом изменении сводки (0006_ledger_notify.sql)
+LEDGER_CHANNEL = "scooter_ledger"
+
+# Сводку пересчитывают триггеры (database/migrations/0005_scooter_ledger.sql),
+# здесь — только чтение и то, что зависит от сегодняшней даты
+LEDGER_COLUMNS = """
+    scooter_id, client_id,
+    unpaid_ids, unpaid_dates, unpaid_amounts, unpaid_fines, unpaid_count, unpaid_total,
+    next_due_date, next_due_amount, fines_total,
+    paid_count, paid_total, last_paid_at,
+    postpone_original_date, postpone_scheduled_date, postpone_with_fine, postpone_fine_amount,
+    open_postpones, postponed_dates, updated_at
+"""
+
+
+def _with_today(ledger: dict, today: date) -> dict:
+    """
+    Добавляет к строке сводки:
+    unpaid — неоплаченные платежи в виде строк get_unpaid_payments_by_scooter (id, payment_date, amount, fine, scooter_id);
+    overdue — просроченные из них (дата раньше сегодняшней и неделя не перенесена), overdue_weeks — их число;
+    postpone — ближайший открытый перенос словарём как у get_postpone_for_date (или None).
+    """
+    scooter_id = ledger["scooter_id"]
+    ledger["unpaid"] = [
+        (pid, pdate, amount, fine, scooter_id)
+        for pid, pdate, amount, fine in zip(
+            ledger["unpaid_ids"], ledger["unpaid_dates"], ledger["unpaid_amounts"], ledger["unpaid_fines"]
+        )
+    ]
+    postponed = set(ledger["postponed_dates"])
+    ledger["overdue"] = [row for row in ledger["unpaid"] if row[1] < today and row[1] not in postponed]
+    ledger["overdue_weeks"] = len(ledger["overdue"])
+
+    if ledger["postpone_scheduled_date"] is not None:
+        ledger["postpone"] = {
+            "original_date": ledger["postpone_original_date"],
+            "scheduled_date": ledger["postpone_scheduled_date"],
+            "with_fine": ledger["postpone_with_fine"],
+            "fine_amount": ledger["postpone_fine_amount"],
+        }
+    else:
+        ledger["postpone"] = None
+    return ledger
+
+
+# Сводка по одному скутеру — одна строка по первичному ключу
+def get_scooter_ledger(scooter_id: int, today: date = None):
+    with get_connection() as conn:
+        with conn.cursor(cursor_factory=RealDictCursor) as cur:
+            cur.execute(f"""
+                SELECT {LEDGER_COLUMNS}
+                FROM scooter_ledger
+                WHERE scooter_id = %s
+            """, (scooter_id,))
+            row = cur.fetchone()
+    return _with_today(dict(row), today or get_today()) if row else None
+
+
+# Сводки по всем скутерам клиента: {scooter_id: ledger}
+def get_client_ledgers(client_id: int, today: date = None) -> dict:
+    with get_connection() as conn:
+        with conn.cursor(cursor_factory=RealDictCursor) as cur:
+            cur.execute(f"""
+                SELECT {LEDGER_COLUMNS}
+                FROM scooter_ledger
+                WHERE client_id = %s
+                ORDER BY scooter_id
+            """, (client_id,))
+            rows = cur.fetchall()
+    today = today or get_today()
+    return {row["scooter_id"]: _with_today(dict(row), today) for row in rows}
+
+
+# Сводки скутеров с долгом для планировщика напоминаний: {client_id: [ledger, ...]}.
+# client_ids — только эти клиенты, None — все должники (частичный индекс scooter_ledger_next_due_idx)
+def get_reminder_ledgers(client_ids: list = None) -> dict:
+    with get_connection() as conn:
+        with conn.cursor(cursor_factory=RealDictCursor) as cur:
+            cur.execute("""
+                SELECT client_id, scooter_id, unpaid_dates, postponed_dates, postpone_scheduled_date
+                FROM scooter_ledger
+                WHERE unpaid_count > 0 AND client_id IS NOT NULL
+                  AND (%s::int[] IS NULL OR client_id = ANY(%s::int[]))
+            """, (client_ids, client_ids))
+            rows = cur.fetchall()
+    ledgers = {}
+    for row in rows:
+        ledgers.setdefault(row["client_id"], []).append(dict(row))
+    return ledgers
+
+
+
+# --- Асинхронные версии для хендлеров ---
+get_scooter_ledger_async = to_async(get_scooter_ledger)
+get_client_ledgers_async = to_async(get_client_ledgers)
+get_reminder_ledgers_async = to_async(get_reminder_ledgers)
@@ -0,0 +1,142 @@
+# database/migrate.py
+import hashlib
+import re
+import sys
+from os import getenv
+from pathlib import Path
+
+from dotenv import load_dotenv
+
+from database.db import get_connection, init_pool, close_pool
+
+
+load_dotenv()
+
+MIGRATIONS_DIR = Path(__file__).resolve().parent / "migrations"
+# Применять недостающие миграции при старте бота (иначе — только проверить и упасть)
+DB_AUTO_MIGRATE = getenv("DB_AUTO_MIGRATE", "1") not in ("0", "false", "False", "")
+# Ключ advisory-lock: два процесса не применяют миграции одновременно
+MIGRATIONS_LOCK_KEY = 7_310_001
+
+_FILE_RE = re.compile(r"^(\d{4})_([\w\-]+)\.sql$")
+
+
+class SchemaOutdatedError(RuntimeError):
+    """В базе не применены миграции, которые есть в репозитории."""
+
+
+def list_migrations():
+    """[(version, name, sql, checksum), ...] по возрастанию версии из database/migrations/NNNN_name.sql."""
+    migrations = []
+    for path in sorted(MIGRATIONS_DIR.glob("*.sql")):
+        match = _FILE_RE.match(path.name)
+        if not match:
+            print(f"[MIGRATE] пропускаю файл с неверным именем: {path.name}")
+            continue
+        sql = path.read_text(encoding="utf-8")
+        checksum = hashlib.sha256(sql.encode("utf-8")).hexdigest()
+        migrations.append((int(match.group(1)), match.group(2), sql, checksum))
+    versions = [m[0] for m in migrations]
+    if len(versions) != len(set(versions)):
+        raise RuntimeError("Две миграции с одинаковым номером в database/migrations")
+    return migrations
+
+
+def _ensure_migrations_table(cur):
+    cur.execute("""
+        CREATE TABLE IF NOT EXISTS schema_migrations (
+            version    INTEGER PRIMARY KEY,
+            name       TEXT NOT NULL,
+            checksum   TEXT NOT NULL,
+            applied_at TIMESTAMPTZ NOT NULL DEFAULT NOW()
+        )
+    """)
+
+
+def _applied(cur) -> dict:
+    cur.execute("SELECT version, checksum FROM schema_migrations")
+    return dict(cur.fetchall())
+
+
+def get_pending_migrations():
+    """Миграции из репозитория, которых ещё нет в schema_migrations."""
+    with get_connection() as conn:
+        with conn.cursor() as cur:
+            _ensure_migrations_table(cur)
+            applied = _applied(cur)
+        conn.commit()
+
+    pending = []
+    for version, name, sql, checksum in list_migrations():
+        if version not in applied:
+            pending.append((version, name, sql, checksum))
+        elif applied[version] != checksum:
+            # применённую миграцию не переписываем — изменения только новой миграцией
+            print(f"[MIGRATE] ⚠️ миграция {version:04d}_{name} изменена после применения")
+    return pending
+
+
+def apply_migrations() -> list:
+    """Применяет недостающие миграции по порядку, каждую в своей транзакции. Возвращает применённые версии."""
+    applied_now = []
+    with get_connection() as conn:
+        with conn.cursor() as cur:
+            cur.execute("SELECT pg_advisory_lock(%s)", (MIGRATIONS_LOCK_KEY,))
+            try:
+                _ensure_migrations_table(cur)
+                conn.commit()
+                applied = _applied(cur)
+                conn.commit()
+
+                for version, name, sql, checksum in list_migrations():
+                    if version in applied:
+                        continue
+                    print(f"[MIGRATE] применяю {version:04d}_{name}")
+                    try:
+                        cur.execute(sql)
+                        cur.execute("""
+                            INSERT INTO schema_migrations (version, name, checksum)
+                            VALUES (%s, %s, %s)
+                        """, (version, name, checksum))
+                        conn.commit()
+                    except Exception:
+                        conn.rollback()
+                        print(f"[MIGRATE] ❌ миграция {version:04d}_{name} не применена")
+                        raise
+                    applied_now.append(version)
+            finally:
+                cur.execute("SELECT pg_advisory_unlock(%s)", (MIGRATIONS_LOCK_KEY,))
+                conn.commit()
+    return applied_now
+
+
+def check_schema(auto_migrate: bool = DB_AUTO_MIGRATE):
+    """
+    Проверка при старте: схема должна совпадать с миграциями из репозитория.
+    С DB_AUTO_MIGRATE=1 недостающие миграции применяются, иначе — SchemaOutdatedError.
+    """
+    pending = get_pending_migrations()
+    if not pending:
+        print("[MIGRATE] схема актуальна")
+        return
+    names = ", ".join(f"{v:04d}_{n}" for v, n, _, _ in pending)
+    if not auto_migrate:
+        raise SchemaOutdatedError(f"Не применены миграции: {names}. Запустите: python -m database.migrate")
+    applied = apply_migrations()
+    print(f"[MIGRATE] применено миграций: {len(applied)}")
+
+
+if __name__ == "__main__":
+    # python -m database.migrate          — применить недостающие миграции
+    # python -m database.migrate --check  — только проверить (код выхода 1, если есть неприменённые)
+    init_pool()
+    try:
+        if "--check" in sys.argv:
+            pending = get_pending_migrations()
+            for version, name, _, _ in pending:
+                print(f"[MIGRATE] не применена: {version:04d}_{name}")
+            sys.exit(1 if pending else 0)
+        applied = apply_migrations()
+        print(f"[MIGRATE] применено миграций: {len(applied)}")
+    finally:
+        close_pool()
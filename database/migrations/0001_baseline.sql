@@ -0,0 +1,139 @@
+-- Базовая схема бота (то, что раньше создавалось вручную на сервере).
+-- IF NOT EXISTS: на уже развёрнутой базе миграция ничего не меняет.
+
+CREATE TABLE IF NOT EXISTS tg_users (
+    telegram_id BIGINT PRIMARY KEY,
+    username    TEXT,
+    created_at  TIMESTAMP NOT NULL DEFAULT NOW()
+);
+
+CREATE TABLE IF NOT EXISTS users (
+    tg_id       BIGINT PRIMARY KEY,
+    username    TEXT,
+    full_name   TEXT,
+    phone       TEXT,
+    has_scooter BOOLEAN NOT NULL DEFAULT FALSE
+);
+
+CREATE TABLE IF NOT EXISTS pending_users (
+    tg_id            BIGINT PRIMARY KEY,
+    username         TEXT,
+    name             TEXT,
+    age              INTEGER,
+    city             TEXT,
+    phone            TEXT,
+    preferred_tariff TEXT,
+    is_processed     BOOLEAN NOT NULL DEFAULT FALSE,
+    submitted_at     TIMESTAMP NOT NULL DEFAULT NOW()
+);
+
+CREATE TABLE IF NOT EXISTS clients (
+    id                  SERIAL PRIMARY KEY,
+    telegram_id         BIGINT,
+    username            TEXT,
+    full_name           TEXT,
+    age                 INTEGER,
+    city                TEXT,
+    phone               TEXT,
+    workplace           TEXT,
+    client_photo_id     TEXT,
+    passport_main_id    TEXT,
+    passport_address_id TEXT
+);
+
+CREATE TABLE IF NOT EXISTS client_photos (
+    id          SERIAL PRIMARY KEY,
+    client_id   INTEGER NOT NULL REFERENCES clients (id) ON DELETE CASCADE,
+    file_id     TEXT NOT NULL,
+    uploaded_at TIMESTAMP NOT NULL DEFAULT NOW()
+);
+
+CREATE TABLE IF NOT EXISTS client_notes (
+    id         SERIAL PRIMARY KEY,
+    client_id  INTEGER NOT NULL REFERENCES clients (id) ON DELETE CASCADE,
+    note       TEXT NOT NULL,
+    created_at TIMESTAMP NOT NULL DEFAULT NOW()
+);
+
+CREATE TABLE IF NOT EXISTS scooters (
+    id              SERIAL PRIMARY KEY,
+    client_id       INTEGER REFERENCES clients (id),
+    model           TEXT,
+    vin             TEXT,
+    motor_vin       TEXT,
+    issue_date      DATE,
+    tariff_type     TEXT,
+    weekly_price    INTEGER,
+    buyout_weeks    INTEGER,
+    has_contract    BOOLEAN NOT NULL DEFAULT FALSE,
+    has_second_keys BOOLEAN NOT NULL DEFAULT FALSE,
+    has_tracker     BOOLEAN NOT NULL DEFAULT FALSE,
+    has_limiter     BOOLEAN NOT NULL DEFAULT FALSE,
+    has_pedals      BOOLEAN NOT NULL DEFAULT FALSE,
+    has_sim         BOOLEAN NOT NULL DEFAULT FALSE,
+    sheet_col       INTEGER
+);
+
+CREATE TABLE IF NOT EXISTS payments (
+    id           SERIAL PRIMARY KEY,
+    scooter_id   INTEGER NOT NULL REFERENCES scooters (id),
+    payment_date DATE NOT NULL,
+    amount       INTEGER NOT NULL DEFAULT 0,
+    is_paid      BOOLEAN NOT NULL DEFAULT FALSE,
+    paid_at      TIMESTAMP,
+    proof_path   TEXT,
+    UNIQUE (scooter_id, payment_date)
+);
+
+CREATE TABLE IF NOT EXISTS payment_postpones (
+    id             SERIAL PRIMARY KEY,
+    tg_id          BIGINT,
+    scooter_id     INTEGER NOT NULL REFERENCES scooters (id),
+    original_date  DATE NOT NULL,
+    scheduled_date DATE NOT NULL,
+    with_fine      BOOLEAN NOT NULL DEFAULT FALSE,
+    fine_amount    INTEGER NOT NULL DEFAULT 0,
+    is_closed      BOOLEAN NOT NULL DEFAULT FALSE,
+    requested_at   TIMESTAMP NOT NULL DEFAULT NOW(),
+    UNIQUE (scooter_id, scheduled_date)
+);
+
+CREATE TABLE IF NOT EXISTS pending_repairs (
+    id            SERIAL PRIMARY KEY,
+    tg_id         BIGINT NOT NULL,
+    username      TEXT,
+    name          TEXT,
+    city          TEXT,
+    phone         TEXT,
+    vin           TEXT,
+    problem       TEXT,
+    photo_file_id TEXT,
+    is_processed  BOOLEAN NOT NULL DEFAULT FALSE,
+    submitted_at  TIMESTAMP NOT NULL DEFAULT NOW()
+);
+
+CREATE TABLE IF NOT EXISTS repairs_done (
+    id            INTEGER PRIMARY KEY,   -- id исходной заявки из pending_repairs
+    tg_id         BIGINT NOT NULL,
+    username      TEXT,
+    name          TEXT,
+    city          TEXT,
+    phone         TEXT,
+    vin           TEXT,
+    problem       TEXT,
+    photo_file_id TEXT,
+    completed_at  TIMESTAMP NOT NULL DEFAULT NOW()
+);
+
+CREATE TABLE IF NOT EXISTS admins (
+    tg_id     BIGINT PRIMARY KEY,
+    username  TEXT,
+    full_name TEXT
+);
+
+CREATE TABLE IF NOT EXISTS admin_locks (
+    tg_id           BIGINT PRIMARY KEY,
+    attempts        INTEGER NOT NULL DEFAULT 0,
+    locked_until    TIMESTAMPTZ,
+    last_attempt_at TIMESTAMPTZ
+);
@@ -0,0 +1,11 @@
+-- Ключи кнопки «✅ Я оплатил» (раньше таблица создавалась лениво из database/payment_confirm.py)
+
+CREATE TABLE IF NOT EXISTS payment_confirm_keys (
+    key         TEXT PRIMARY KEY,
+    payment_ids INTEGER[] NOT NULL,
+    created_at  TIMESTAMPTZ NOT NULL DEFAULT NOW(),
+    expires_at  TIMESTAMPTZ NOT NULL
+);
+
+CREATE INDEX IF NOT EXISTS payment_confirm_keys_expires_idx
+    ON payment_confirm_keys (expires_at);
@@ -0,0 +1,72 @@
+-- Индексы под частые запросы бота.
+-- Частичные индексы хранят только «живые» строки: неоплаченные платежи,
+-- открытые переносы, необработанные заявки — они маленькие и не растут с историей.
+
+-- Напоминания и «мои платежи»: неоплаченные платежи скутера по дате
+CREATE INDEX IF NOT EXISTS payments_unpaid_scooter_date_idx
+    ON payments (scooter_id, payment_date)
+    WHERE is_paid = FALSE;
+
+-- Кандидаты на уведомление / должники: неоплаченные платежи по дате
+CREATE INDEX IF NOT EXISTS payments_unpaid_date_idx
+    ON payments (payment_date)
+    WHERE is_paid = FALSE;
+
+-- Активные переносы скутера (get_active_postpones, LATERAL в уведомлениях)
+CREATE INDEX IF NOT EXISTS payment_postpones_open_scooter_date_idx
+    ON payment_postpones (scooter_id, scheduled_date)
+    WHERE is_closed = FALSE;
+
+CREATE INDEX IF NOT EXISTS payment_postpones_open_tg_idx
+    ON payment_postpones (tg_id)
+    WHERE is_closed = FALSE;
+
+-- Скутеры клиента
+CREATE INDEX IF NOT EXISTS scooters_client_id_idx
+    ON scooters (client_id);
+
+-- Клиент по Telegram ID
+CREATE INDEX IF NOT EXISTS clients_telegram_id_idx
+    ON clients (telegram_id);
+
+-- Постраничный список клиентов (keyset по full_name, id)
+CREATE INDEX IF NOT EXISTS clients_full_name_id_idx
+    ON clients (full_name, id);
+
+-- Арендаторы для рассылок
+CREATE INDEX IF NOT EXISTS users_has_scooter_idx
+    ON users (tg_id)
+    WHERE has_scooter = TRUE;
+
+-- Необработанные заявки на ремонт
+CREATE INDEX IF NOT EXISTS pending_repairs_open_tg_idx
+    ON pending_repairs (tg_id)
+    WHERE is_processed = FALSE;
+
+CREATE INDEX IF NOT EXISTS pending_repairs_open_submitted_idx
+    ON pending_repairs (submitted_at)
+    WHERE is_processed = FALSE;
+
+-- Необработанные заявки на регистрацию
+CREATE INDEX IF NOT EXISTS pending_users_open_submitted_idx
+    ON pending_users (submitted_at)
+    WHERE is_processed = FALSE;
+
+-- Завершённые ремонты: история клиента и постраничный список в админке
+CREATE INDEX IF NOT EXISTS repairs_done_tg_completed_idx
+    ON repairs_done (tg_id, completed_at DESC);
+
+CREATE INDEX IF NOT EXISTS repairs_done_completed_id_idx
+    ON repairs_done (completed_at DESC, id DESC);
+
+-- Карточка клиента: фото и последние заметки
+CREATE INDEX IF NOT EXISTS client_photos_client_idx
+    ON client_photos (client_id, uploaded_at);
+
+CREATE INDEX IF NOT EXISTS client_notes_client_created_idx
+    ON client_notes (client_id, created_at DESC);
+
+ANALYZE payments;
+ANALYZE payment_postpones;
+ANALYZE scooters;
+ANALYZE clients;
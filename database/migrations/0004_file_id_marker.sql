@@ -0,0 +1,14 @@
+-- Явная метка зашифрованных file_id: "fernet:<токен>" (см. utils/encryption.py).
+-- Старые токены Fernet начинаются с "gAAAAA"; незашифрованные file_id Telegram так не начинаются.
+
+UPDATE clients SET client_photo_id = 'fernet:' || client_photo_id
+WHERE client_photo_id LIKE 'gAAAAA%';
+
+UPDATE clients SET passport_main_id = 'fernet:' || passport_main_id
+WHERE passport_main_id LIKE 'gAAAAA%';
+
+UPDATE clients SET passport_address_id = 'fernet:' || passport_address_id
+WHERE passport_address_id LIKE 'gAAAAA%';
+
+UPDATE client_photos SET file_id = 'fernet:' || file_id
+WHERE file_id LIKE 'gAAAAA%';
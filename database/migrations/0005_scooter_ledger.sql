@@ -0,0 +1,195 @@
+-- Сводка по каждому скутеру: что и к какой дате клиент должен.
+-- Строку пересчитывают триггеры на payments / payment_postpones / scooters,
+-- поэтому личный кабинет и уведомления читают одну строку по первичному ключу
+-- вместо всех платежей скутера с перебором переносов в Python.
+-- «Просрочено» зависит от сегодняшней даты, поэтому хранится упорядоченный список
+-- неоплаченных дат, а просрочка считается при чтении (database/ledger.py).
+
+-- Код уже читает payments.fine (get_unpaid_payments_by_scooter); в baseline колонки не было
+ALTER TABLE payments ADD COLUMN IF NOT EXISTS fine INTEGER NOT NULL DEFAULT 0;
+
+CREATE TABLE IF NOT EXISTS scooter_ledger (
+    scooter_id              INTEGER PRIMARY KEY REFERENCES scooters (id) ON DELETE CASCADE,
+    client_id               INTEGER,
+    -- неоплаченные платежи по возрастанию даты, массивы выровнены по индексу
+    unpaid_ids              INTEGER[] NOT NULL DEFAULT '{}',
+    unpaid_dates            DATE[]    NOT NULL DEFAULT '{}',
+    unpaid_amounts          INTEGER[] NOT NULL DEFAULT '{}',
+    unpaid_fines            INTEGER[] NOT NULL DEFAULT '{}',
+    unpaid_count            INTEGER NOT NULL DEFAULT 0,
+    unpaid_total            BIGINT  NOT NULL DEFAULT 0,
+    next_due_date           DATE,
+    next_due_amount         INTEGER,
+    -- штрафы: по неоплаченным платежам + по открытым переносам
+    fines_total             BIGINT  NOT NULL DEFAULT 0,
+    paid_count              INTEGER NOT NULL DEFAULT 0,
+    paid_total              BIGINT  NOT NULL DEFAULT 0,
+    last_paid_at            TIMESTAMP,
+    -- ближайший открытый перенос
+    postpone_original_date  DATE,
+    postpone_scheduled_date DATE,
+    postpone_with_fine      BOOLEAN,
+    postpone_fine_amount    INTEGER,
+    open_postpones          INTEGER NOT NULL DEFAULT 0,
+    -- исходные даты всех открытых переносов: такие недели не считаются просроченными
+    postponed_dates         DATE[] NOT NULL DEFAULT '{}',
+    updated_at              TIMESTAMPTZ NOT NULL DEFAULT NOW()
+);
+
+CREATE INDEX IF NOT EXISTS scooter_ledger_client_idx
+    ON scooter_ledger (client_id);
+
+-- Должники и напоминания: только скутеры с долгом
+CREATE INDEX IF NOT EXISTS scooter_ledger_next_due_idx
+    ON scooter_ledger (next_due_date)
+    WHERE unpaid_count > 0;
+
+
+CREATE OR REPLACE FUNCTION refresh_scooter_ledger(p_ids INTEGER[]) RETURNS VOID AS $$
+BEGIN
+    IF p_ids IS NULL OR cardinality(p_ids) = 0 THEN
+        RETURN;
+    END IF;
+
+    -- Сначала блокируем строки сводки: параллельная транзакция по тому же скутеру дождётся нас,
+    -- а следующий запрос возьмёт свежий снимок и увидит её изменения (READ COMMITTED)
+    PERFORM 1 FROM scooter_ledger WHERE scooter_id = ANY(p_ids) ORDER BY scooter_id FOR UPDATE;
+
+    INSERT INTO scooter_ledger (
+        scooter_id, client_id,
+        unpaid_ids, unpaid_dates, unpaid_amounts, unpaid_fines, unpaid_count, unpaid_total,
+        next_due_date, next_due_amount, fines_total,
+        paid_count, paid_total, last_paid_at,
+        postpone_original_date, postpone_scheduled_date, postpone_with_fine, postpone_fine_amount,
+        open_postpones, postponed_dates, updated_at
+    )
+    SELECT s.id, s.client_id,
+           COALESCE(u.ids, '{}'), COALESCE(u.dates, '{}'), COALESCE(u.amounts, '{}'), COALESCE(u.fines, '{}'),
+           COALESCE(u.cnt, 0), COALESCE(u.total, 0),
+           u.dates[1], u.amounts[1],
+           COALESCE(u.fines_sum, 0) + COALESCE(pc.fines_sum, 0),
+           COALESCE(pd.cnt, 0), COALESCE(pd.total, 0), pd.last_paid_at,
+           pp.original_date, pp.scheduled_date, pp.with_fine, pp.fine_amount,
+           COALESCE(pc.cnt, 0), COALESCE(pc.dates, '{}'), NOW()
+    FROM scooters s
+    LEFT JOIN LATERAL (
+        SELECT array_agg(p.id ORDER BY p.payment_date)           AS ids,
+               array_agg(p.payment_date ORDER BY p.payment_date) AS dates,
+               array_agg(p.amount ORDER BY p.payment_date)       AS amounts,
+               array_agg(p.fine ORDER BY p.payment_date)         AS fines,
+               COUNT(*)                                          AS cnt,
+               SUM(p.amount + p.fine)                            AS total,
+               SUM(p.fine)                                       AS fines_sum
+        FROM payments p
+        WHERE p.scooter_id = s.id AND p.is_paid = FALSE
+    ) u ON TRUE
+    LEFT JOIN LATERAL (
+        SELECT COUNT(*) AS cnt, SUM(p.amount) AS total, MAX(p.paid_at) AS last_paid_at
+        FROM payments p
+        WHERE p.scooter_id = s.id AND p.is_paid = TRUE
+    ) pd ON TRUE
+    LEFT JOIN LATERAL (
+        SELECT COUNT(*) AS cnt, SUM(x.fine_amount) AS fines_sum,
+               array_agg(x.original_date ORDER BY x.original_date) AS dates
+        FROM payment_postpones x
+        WHERE x.scooter_id = s.id AND x.is_closed = FALSE
+    ) pc ON TRUE
+    LEFT JOIN LATERAL (
+        SELECT x.original_date, x.scheduled_date, x.with_fine, x.fine_amount
+        FROM payment_postpones x
+        WHERE x.scooter_id = s.id AND x.is_closed = FALSE
+        ORDER BY x.scheduled_date
+        LIMIT 1
+    ) pp ON TRUE
+    WHERE s.id = ANY(p_ids)
+    ON CONFLICT (scooter_id) DO UPDATE SET
+        client_id               = EXCLUDED.client_id,
+        unpaid_ids              = EXCLUDED.unpaid_ids,
+        unpaid_dates            = EXCLUDED.unpaid_dates,
+        unpaid_amounts          = EXCLUDED.unpaid_amounts,
+        unpaid_fines            = EXCLUDED.unpaid_fines,
+        unpaid_count            = EXCLUDED.unpaid_count,
+        unpaid_total            = EXCLUDED.unpaid_total,
+        next_due_date           = EXCLUDED.next_due_date,
+        next_due_amount         = EXCLUDED.next_due_amount,
+        fines_total             = EXCLUDED.fines_total,
+        paid_count              = EXCLUDED.paid_count,
+        paid_total              = EXCLUDED.paid_total,
+        last_paid_at            = EXCLUDED.last_paid_at,
+        postpone_original_date  = EXCLUDED.postpone_original_date,
+        postpone_scheduled_date = EXCLUDED.postpone_scheduled_date,
+        postpone_with_fine      = EXCLUDED.postpone_with_fine,
+        postpone_fine_amount    = EXCLUDED.postpone_fine_amount,
+        open_postpones          = EXCLUDED.open_postpones,
+        postponed_dates         = EXCLUDED.postponed_dates,
+        updated_at              = EXCLUDED.updated_at;
+END;
+$$ LANGUAGE plpgsql;
+
+
+-- Триггеры уровня оператора: refresh_payment_schedule_by_scooter вставляет десятки недель
+-- одним запросом — сводка пересчитывается один раз, а не на каждую строку.
+-- Таблицы переходов нельзя объявить у триггера на несколько событий, поэтому их три на таблицу.
+CREATE OR REPLACE FUNCTION scooter_ledger_on_change() RETURNS TRIGGER AS $$
+DECLARE
+    ids INTEGER[];
+BEGIN
+    IF TG_OP = 'INSERT' THEN
+        SELECT array_agg(DISTINCT scooter_id) INTO ids FROM new_rows;
+    ELSIF TG_OP = 'DELETE' THEN
+        SELECT array_agg(DISTINCT scooter_id) INTO ids FROM old_rows;
+    ELSE
+        SELECT array_agg(DISTINCT scooter_id) INTO ids
+        FROM (SELECT scooter_id FROM new_rows UNION SELECT scooter_id FROM old_rows) t;
+    END IF;
+    PERFORM refresh_scooter_ledger(ids);
+    RETURN NULL;
+END;
+$$ LANGUAGE plpgsql;
+
+DROP TRIGGER IF EXISTS payments_ledger_ins ON payments;
+CREATE TRIGGER payments_ledger_ins AFTER INSERT ON payments
+    REFERENCING NEW TABLE AS new_rows
+    FOR EACH STATEMENT EXECUTE FUNCTION scooter_ledger_on_change();
+
+DROP TRIGGER IF EXISTS payments_ledger_upd ON payments;
+CREATE TRIGGER payments_ledger_upd AFTER UPDATE ON payments
+    REFERENCING OLD TABLE AS old_rows NEW TABLE AS new_rows
+    FOR EACH STATEMENT EXECUTE FUNCTION scooter_ledger_on_change();
+
+DROP TRIGGER IF EXISTS payments_ledger_del ON payments;
+CREATE TRIGGER payments_ledger_del AFTER DELETE ON payments
+    REFERENCING OLD TABLE AS old_rows
+    FOR EACH STATEMENT EXECUTE FUNCTION scooter_ledger_on_change();
+
+DROP TRIGGER IF EXISTS postpones_ledger_ins ON payment_postpones;
+CREATE TRIGGER postpones_ledger_ins AFTER INSERT ON payment_postpones
+    REFERENCING NEW TABLE AS new_rows
+    FOR EACH STATEMENT EXECUTE FUNCTION scooter_ledger_on_change();
+
+DROP TRIGGER IF EXISTS postpones_ledger_upd ON payment_postpones;
+CREATE TRIGGER postpones_ledger_upd AFTER UPDATE ON payment_postpones
+    REFERENCING OLD TABLE AS old_rows NEW TABLE AS new_rows
+    FOR EACH STATEMENT EXECUTE FUNCTION scooter_ledger_on_change();
+
+DROP TRIGGER IF EXISTS postpones_ledger_del ON payment_postpones;
+CREATE TRIGGER postpones_ledger_del AFTER DELETE ON payment_postpones
+    REFERENCING OLD TABLE AS old_rows
+    FOR EACH STATEMENT EXECUTE FUNCTION scooter_ledger_on_change();
+
+
+-- Новый скутер сразу получает пустую сводку; смена владельца переносит client_id
+CREATE OR REPLACE FUNCTION scooter_ledger_on_scooter() RETURNS TRIGGER AS $$
+BEGIN
+    PERFORM refresh_scooter_ledger(ARRAY[NEW.id]);
+    RETURN NULL;
+END;
+$$ LANGUAGE plpgsql;
+
+DROP TRIGGER IF EXISTS scooters_ledger ON scooters;
+CREATE TRIGGER scooters_ledger AFTER INSERT OR UPDATE OF client_id ON scooters
+    FOR EACH ROW EXECUTE FUNCTION scooter_ledger_on_scooter();
+
+
+-- Заполнить сводку по уже существующим скутерам
+SELECT refresh_scooter_ledger(ARRAY(SELECT id FROM scooters));
@@ -0,0 +1,28 @@
+-- Изменение сводки по скутеру (0005_scooter_ledger) рассылает NOTIFY с id клиента:
+-- планировщик напоминаний пересчитывает только этого клиента, а не опрашивает всех по таймеру.
+-- Одинаковые уведомления в одной транзакции Postgres склеивает сам.
+
+CREATE OR REPLACE FUNCTION scooter_ledger_notify() RETURNS TRIGGER AS $$
+BEGIN
+    IF TG_OP IN ('INSERT', 'UPDATE') THEN
+        IF NEW.client_id IS NOT NULL THEN
+            PERFORM pg_notify('scooter_ledger', NEW.client_id::text);
+        END IF;
+    END IF;
+    IF TG_OP = 'DELETE' THEN
+        IF OLD.client_id IS NOT NULL THEN
+            PERFORM pg_notify('scooter_ledger', OLD.client_id::text);
+        END IF;
+    ELSIF TG_OP = 'UPDATE' THEN
+        -- скутер перешёл к другому клиенту: пересчитать и прежнего
+        IF OLD.client_id IS NOT NULL AND OLD.client_id IS DISTINCT FROM NEW.client_id THEN
+            PERFORM pg_notify('scooter_ledger', OLD.client_id::text);
+        END IF;
+    END IF;
+    RETURN NULL;
+END;
+$$ LANGUAGE plpgsql;
+
+DROP TRIGGER IF EXISTS scooter_ledger_notify ON scooter_ledger;
+CREATE TRIGGER scooter_ledger_notify AFTER INSERT OR UPDATE OR DELETE ON scooter_ledger
+    FOR EACH ROW EXECUTE FUNCTION scooter_ledger_notify();
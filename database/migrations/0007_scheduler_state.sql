@@ -0,0 +1,21 @@
+-- Общее состояние планировщика для нескольких процессов бота.
+
+-- Задачи APScheduler (database/job_store.py): переживают перезапуск,
+-- выполняет их только процесс-лидер (database/leader.py)
+CREATE TABLE IF NOT EXISTS apscheduler_jobs (
+    id            TEXT PRIMARY KEY,
+    next_run_time DOUBLE PRECISION,
+    job_state     BYTEA NOT NULL
+);
+
+CREATE INDEX IF NOT EXISTS apscheduler_jobs_next_run_time_idx
+    ON apscheduler_jobs (next_run_time);
+
+-- Когда клиенту последний раз отправили напоминание каждого вида:
+-- новый лидер продолжает с того же места, а не шлёт всё заново и не пропускает слот
+CREATE TABLE IF NOT EXISTS reminder_marks (
+    client_id INTEGER NOT NULL,
+    severity  TEXT NOT NULL,
+    fired_at  TIMESTAMP NOT NULL,
+    PRIMARY KEY (client_id, severity)
+);
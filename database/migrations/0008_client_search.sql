@@ -0,0 +1,20 @@
+-- Поиск клиентов в админке (database/clients.py: search_clients):
+-- подстрока и опечатки по имени, городу и username через pg_trgm + GIN.
+-- Расширение ставит пользователь с правом CREATE на базу (владелец или суперпользователь).
+CREATE EXTENSION IF NOT EXISTS pg_trgm;
+
+-- Телефон без «+», пробелов и скобок: «8 (999) 123-45-67» ищется по «9991234567»
+ALTER TABLE clients ADD COLUMN IF NOT EXISTS phone_digits TEXT
+    GENERATED ALWAYS AS (regexp_replace(COALESCE(phone, ''), '\D', '', 'g')) STORED;
+
+CREATE INDEX IF NOT EXISTS clients_full_name_trgm_idx
+    ON clients USING gin (full_name gin_trgm_ops);
+
+CREATE INDEX IF NOT EXISTS clients_city_trgm_idx
+    ON clients USING gin (city gin_trgm_ops);
+
+CREATE INDEX IF NOT EXISTS clients_username_trgm_idx
+    ON clients USING gin (username gin_trgm_ops);
+
+CREATE INDEX IF NOT EXISTS clients_phone_digits_trgm_idx
+    ON clients USING gin (phone_digits gin_trgm_ops);
@@ -0,0 +1,7 @@
+-- Постраничный список клиентов сортирует по COALESCE(full_name, ''), id:
+-- full_name может быть NULL, а сравнение кортежа с NULL не даёт ни true, ни false —
+-- клиенты без имени выпадали из страниц. Индекс по тому же выражению заменяет старый.
+CREATE INDEX IF NOT EXISTS clients_page_order_idx
+    ON clients ((COALESCE(full_name, '')), id);
+
+DROP INDEX IF EXISTS clients_full_name_id_idx;
@@ -0,0 +1 @@
+# Схема БД описана SQL-миграциями в database/migrations/, применяются через database/migrate.py
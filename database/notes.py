@@ -1,4 +1,4 @@
-from database.db import get_connection
+from database.db import get_connection, to_async
 
 # Добавить заметку
 def add_note(client_id: int, note: str):
@@ -21,4 +21,10 @@ def get_notes(client_id: int, limit: int = 5):
                 ORDER BY created_at DESC
                 LIMIT %s
             """, (client_id, limit))
-            return cur.fetchall()
\ No newline at end of file
+            return cur.fetchall()
+
+
+
+# --- Асинхронные версии для хендлеров ---
+add_note_async = to_async(add_note)
+get_notes_async = to_async(get_notes)
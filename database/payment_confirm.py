@@ -0,0 +1,61 @@
+from datetime import datetime, timedelta, timezone
+from psycopg2.extras import execute_values
+from database.db import get_connection, to_async
+
+UTC = timezone.utc
+
+
+# Сохранить пачку ключей одним запросом: items = [(key, payment_ids), ...].
+# Существующий ключ не перезаписываем (иначе старая кнопка подтвердила бы чужие платежи) —
+# возвращает множество реально вставленных ключей, остальные вызывающий генерирует заново
+def save_payment_confirm_keys(items: list, ttl: timedelta) -> set:
+    if not items:
+        return set()
+    expires_at = datetime.now(UTC) + ttl
+    with get_connection() as conn:
+        with conn.cursor() as cur:
+            rows = execute_values(
+                cur,
+                """
+                INSERT INTO payment_confirm_keys (key, payment_ids, expires_at)
+                VALUES %s
+                ON CONFLICT (key) DO NOTHING
+                RETURNING key
+                """,
+                [(key, list(ids), expires_at) for key, ids in items],
+                fetch=True
+            )
+        conn.commit()
+    return {row[0] for row in rows}
+
+
+# Забрать ключ: удалить и вернуть id его платежей одним запросом (просроченные ключи не возвращаются).
+# Нажатие в двух процессах сразу получит платежи только в одном — второй увидит None
+def claim_payment_confirm_key(key: str):
+    with get_connection() as conn:
+        with conn.cursor() as cur:
+            cur.execute("""
+                DELETE FROM payment_confirm_keys
+                WHERE key = %s AND expires_at > NOW()
+                RETURNING payment_ids
+            """, (key,))
+            row = cur.fetchone()
+        conn.commit()
+    return list(row[0]) if row else None
+
+
+# Удалить все истёкшие ключи, вернуть их количество
+def purge_expired_payment_confirm_keys() -> int:
+    with get_connection() as conn:
+        with conn.cursor() as cur:
+            cur.execute("DELETE FROM payment_confirm_keys WHERE expires_at <= NOW()")
+            deleted = cur.rowcount
+        conn.commit()
+        return deleted
+
+
+
+# --- Асинхронные версии для хендлеров ---
+save_payment_confirm_keys_async = to_async(save_payment_confirm_keys)
+claim_payment_confirm_key_async = to_async(claim_payment_confirm_key)
+purge_expired_payment_confirm_keys_async = to_async(purge_expired_payment_confirm_keys)
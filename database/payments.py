@@ -1,4 +1,4 @@
-from database.db import get_connection
+from database.db import get_connection, to_async
 from psycopg2.extras import execute_values
 from utils.schedule_utils import get_next_fridays
 from utils.time_utils import get_today
@@ -50,25 +50,58 @@ def get_payments_for_date_by_client(client_id: int, target_date):
             return cur.fetchall()
 
 
-# Отметить платежи как оплаченные (по списку ID платежей)
-def mark_payments_as_paid(payment_ids: list, proof_path: str = None):
+# Отметить платежи как оплаченные (по списку ID платежей).
+# Возвращает id тех, что действительно сменили статус: уже оплаченные не трогаем и в журнал повторно не пишем
+def mark_payments_as_paid(payment_ids: list, proof_path: str = None) -> list:
     if not payment_ids:
-        return
+        return []
     with get_connection() as conn:
         with conn.cursor() as cur:
             if proof_path:
                 cur.execute("""
                     UPDATE payments
                     SET is_paid = TRUE, paid_at = NOW(), proof_path = %s
-                    WHERE id = ANY(%s)
+                    WHERE id = ANY(%s) AND is_paid = FALSE
+                    RETURNING id
                 """, (proof_path, payment_ids))
             else:
                 cur.execute("""
                     UPDATE payments
                     SET is_paid = TRUE, paid_at = NOW()
-                    WHERE id = ANY(%s)
+                    WHERE id = ANY(%s) AND is_paid = FALSE
+                    RETURNING id
                 """, (payment_ids,))
+            marked = [row[0] for row in cur.fetchall()]
         conn.commit()
+    return marked
+
+
+# Получить платежи по списку ID (для подтверждения оплаты)
+def get_payments_by_ids(payment_ids: list):
+    if not payment_ids:
+        return []
+    with get_connection() as conn:
+        with conn.cursor() as cur:
+            cur.execute("""
+                SELECT id, scooter_id, payment_date, amount
+                FROM payments
+                WHERE id = ANY(%s)
+            """, (list(payment_ids),))
+            return cur.fetchall()
+
+
+# Закрыть старую дату переноса: платёж считается оплаченным с нулевой суммой
+def close_original_payment(scooter_id: int, original_date) -> int:
+    with get_connection() as conn:
+        with conn.cursor() as cur:
+            cur.execute("""
+                UPDATE payments
+                SET is_paid = TRUE, paid_at = NOW(), amount = 0
+                WHERE scooter_id = %s AND payment_date = %s
+            """, (scooter_id, original_date))
+            rowcount = cur.rowcount
+        conn.commit()
+    return rowcount
 
 
 # Продление аренды (новая функция для продления)
@@ -165,4 +198,53 @@ def get_all_unpaid_clients_by_dates(dates: list):
                 WHERE p.payment_date = ANY(%s) AND p.is_paid = FALSE
                 ORDER BY p.payment_date, c.full_name
             """, (dates,))
-            return cur.fetchall()
\ No newline at end of file
+            return cur.fetchall()
+
+
+# Все неоплаченные платежи на сегодня и раньше — одним запросом для рассылки уведомлений.
+# postpone_* — активный перенос, у которого scheduled_date совпадает с датой платежа;
+# covered_by_postpone — по дате платежа есть активный перенос (как original, так и scheduled).
+# client_ids — только эти клиенты (планировщик напоминаний), None — все.
+def get_payment_notification_candidates(today: date, client_ids: list = None):
+    with get_connection() as conn:
+        with conn.cursor() as cur:
+            cur.execute("""
+                SELECT c.id, c.telegram_id, c.full_name,
+                       s.id, s.model, s.weekly_price,
+                       p.id, p.payment_date, p.amount,
+                       pp.original_date, pp.scheduled_date, pp.with_fine, pp.fine_amount,
+                       EXISTS (
+                           SELECT 1 FROM payment_postpones x
+                           WHERE x.scooter_id = s.id AND x.is_closed = FALSE
+                             AND (x.original_date = p.payment_date OR x.scheduled_date = p.payment_date)
+                       ) AS covered_by_postpone
+                FROM payments p
+                JOIN scooters s ON p.scooter_id = s.id
+                JOIN clients c ON s.client_id = c.id
+                LEFT JOIN LATERAL (
+                    SELECT original_date, scheduled_date, with_fine, fine_amount
+                    FROM payment_postpones
+                    WHERE scooter_id = s.id AND is_closed = FALSE AND scheduled_date = p.payment_date
+                    LIMIT 1
+                ) pp ON TRUE
+                WHERE p.is_paid = FALSE AND p.payment_date <= %s
+                  AND (%s::int[] IS NULL OR c.id = ANY(%s::int[]))
+                ORDER BY c.full_name, c.id, s.id, p.payment_date
+            """, (today, client_ids, client_ids))
+            return cur.fetchall()
+
+
+
+# --- Асинхронные версии для хендлеров ---
+create_payment_schedule_async = to_async(create_payment_schedule)
+get_payments_by_scooter_async = to_async(get_payments_by_scooter)
+get_payments_for_date_by_client_async = to_async(get_payments_for_date_by_client)
+mark_payments_as_paid_async = to_async(mark_payments_as_paid)
+get_payments_by_ids_async = to_async(get_payments_by_ids)
+close_original_payment_async = to_async(close_original_payment)
+save_payment_schedule_by_scooter_async = to_async(save_payment_schedule_by_scooter)
+refresh_payment_schedule_by_scooter_async = to_async(refresh_payment_schedule_by_scooter)
+get_unpaid_payments_by_scooter_async = to_async(get_unpaid_payments_by_scooter)
+update_payment_amount_async = to_async(update_payment_amount)
+get_all_unpaid_clients_by_dates_async = to_async(get_all_unpaid_clients_by_dates)
+get_payment_notification_candidates_async = to_async(get_payment_notification_candidates)
@@ -1,38 +1,30 @@
-import psycopg2
-import os
-from dotenv import load_dotenv
-from database.db import get_connection
+from database.db import get_connection, to_async
 
-load_dotenv()
 
 def save_pending_user(data: dict):
-    conn = psycopg2.connect(
-        dbname=os.getenv("DB_NAME"),
-        user=os.getenv("DB_USER"),
-        password=os.getenv("DB_PASSWORD"),
-        host=os.getenv("DB_HOST"),
-        port=os.getenv("DB_PORT")
-    )
-    cur = conn.cursor()
-
-    cur.execute("""
-    INSERT INTO pending_users (tg_id, username, name, age, city, phone, preferred_tariff)
-    VALUES (%s, %s, %s, %s, %s, %s, %s)
-    ON CONFLICT (tg_id) DO NOTHING
-""", (
-    data["tg_id"],
-    data.get("username"),
-    data["name"],
-    data["age"],
-    data["city"],
-    data["phone"],
-    data.get("preferred_tariff"),
-    
-))
-
-    conn.commit()
-    cur.close()
-    conn.close()
+    with get_connection() as conn:
+        with conn.cursor() as cur:
+            cur.execute("""
+                INSERT INTO pending_users (tg_id, username, name, age, city, phone, preferred_tariff)
+                VALUES (%s, %s, %s, %s, %s, %s, %s)
+                ON CONFLICT (tg_id) DO NOTHING
+            """, (
+                data["tg_id"],
+                data.get("username"),
+                data["name"],
+                data["age"],
+                data["city"],
+                data["phone"],
+                data.get("preferred_tariff"),
+            ))
+        conn.commit()
+
+
+def has_pending_user(tg_id: int) -> bool:
+    with get_connection() as conn:
+        with conn.cursor() as cur:
+            cur.execute("SELECT 1 FROM pending_users WHERE tg_id = %s AND is_processed = FALSE", (tg_id,))
+            return cur.fetchone() is not None
 
 
 def get_all_pending_users():
@@ -54,4 +46,12 @@ def delete_pending_user(tg_id: int):
                 DELETE FROM pending_users
                 WHERE tg_id = %s
             """, (tg_id,))
-        conn.commit()        
\ No newline at end of file
+        conn.commit()
+
+
+
+# --- Асинхронные версии для хендлеров ---
+save_pending_user_async = to_async(save_pending_user)
+has_pending_user_async = to_async(has_pending_user)
+get_all_pending_users_async = to_async(get_all_pending_users)
+delete_pending_user_async = to_async(delete_pending_user)
@@ -1,4 +1,4 @@
-from database.db import get_connection
+from database.db import get_connection, to_async
 from datetime import date, datetime
 from typing import List, Optional, Tuple
 
@@ -146,4 +146,16 @@ def has_active_postpone(scooter_id: int) -> bool:
     result = cursor.fetchone()
     cursor.close()
     conn.close()
-    return result is not None                
\ No newline at end of file
+    return result is not None
+
+
+
+# --- Асинхронные версии для хендлеров ---
+save_postpone_request_async = to_async(save_postpone_request)
+get_postpone_for_date_async = to_async(get_postpone_for_date)
+get_all_postpones_async = to_async(get_all_postpones)
+get_active_postpones_async = to_async(get_active_postpones)
+close_postpone_async = to_async(close_postpone)
+get_postpone_dates_by_tg_id_async = to_async(get_postpone_dates_by_tg_id)
+close_postpone_if_paid_async = to_async(close_postpone_if_paid)
+has_active_postpone_async = to_async(has_active_postpone)
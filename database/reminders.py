@@ -0,0 +1,39 @@
+from datetime import datetime
+
+from database.db import get_connection, to_async
+
+
+# Когда клиентам последний раз слали напоминания: {client_id: {severity: fired_at}}.
+# client_ids — только эти клиенты, None — все
+def get_reminder_marks(client_ids: list = None) -> dict:
+    with get_connection() as conn:
+        with conn.cursor() as cur:
+            cur.execute("""
+                SELECT client_id, severity, fired_at
+                FROM reminder_marks
+                WHERE %s::int[] IS NULL OR client_id = ANY(%s::int[])
+            """, (client_ids, client_ids))
+            rows = cur.fetchall()
+    marks = {}
+    for client_id, severity, fired_at in rows:
+        marks.setdefault(client_id, {})[severity] = fired_at
+    return marks
+
+
+# Отметить отправку напоминания severity клиентам одним запросом
+def mark_reminders_fired(client_ids: list, severity: str, fired_at: datetime):
+    if not client_ids:
+        return
+    with get_connection() as conn:
+        with conn.cursor() as cur:
+            cur.execute("""
+                INSERT INTO reminder_marks (client_id, severity, fired_at)
+                SELECT unnest(%s::int[]), %s, %s
+                ON CONFLICT (client_id, severity) DO UPDATE SET fired_at = EXCLUDED.fired_at
+            """, (client_ids, severity, fired_at))
+
+
+
+# --- Асинхронные версии для хендлеров ---
+get_reminder_marks_async = to_async(get_reminder_marks)
+mark_reminders_fired_async = to_async(mark_reminders_fired)
@@ -1,4 +1,4 @@
-from database.db import get_connection
+from database.db import get_connection, to_async, estimate_rows
 
 def save_pending_repair(data: dict):
     with get_connection() as conn:
@@ -18,6 +18,15 @@ def save_pending_repair(data: dict):
             ))
             conn.commit()
 
+def has_pending_repair(tg_id: int) -> bool:
+    with get_connection() as conn:
+        with conn.cursor() as cur:
+            cur.execute("""
+                SELECT 1 FROM pending_repairs
+                WHERE tg_id = %s AND is_processed = FALSE
+            """, (tg_id,))
+            return cur.fetchone() is not None
+
 def get_all_pending_repairs():
     with get_connection() as conn:
         with conn.cursor() as cur:
@@ -72,22 +81,21 @@ def add_done_repair(repair: dict):
     with get_connection() as conn:
         with conn.cursor() as cur:
             cur.execute("""
-    INSERT INTO repairs_done (
-        id, tg_id, username, name, city, phone, vin, problem, photo_file_id
-    ) VALUES (%s, %s, %s, %s, %s, %s, %s, %s, %s)
-""", (
-    repair["id"],
-    repair["tg_id"],
-    repair["username"],
-    repair["name"],
-    repair["city"],
-    repair["phone"],
-    repair["vin"],
-    repair["problem"],
-    repair.get("photo_file_id")
-))
-    conn.commit()
-    conn.close()
+                INSERT INTO repairs_done (
+                    id, tg_id, username, name, city, phone, vin, problem, photo_file_id
+                ) VALUES (%s, %s, %s, %s, %s, %s, %s, %s, %s)
+            """, (
+                repair["id"],
+                repair["tg_id"],
+                repair["username"],
+                repair["name"],
+                repair["city"],
+                repair["phone"],
+                repair["vin"],
+                repair["problem"],
+                repair.get("photo_file_id")
+            ))
+        conn.commit()
 
 
 
@@ -111,4 +119,58 @@ def get_all_done_repairs_admin():
                 FROM repairs_done
                 ORDER BY completed_at DESC
             """)
-            return cur.fetchall()
\ No newline at end of file
+            return cur.fetchall()
+
+
+# Страница завершённых ремонтов по курсору (keyset), свежие сверху: (rows, next_cursor, total_estimate).
+# cursor — id заявки, на которой остановились; backward=True — страница перед ней.
+def get_done_repairs_page(cursor: int = None, limit: int = 5, backward: bool = False):
+    with get_connection() as conn:
+        with conn.cursor() as cur:
+            columns = "id, tg_id, username, name, city, phone, vin, problem, photo_file_id, completed_at"
+            if cursor is None:
+                cur.execute(f"""
+                    SELECT {columns}
+                    FROM repairs_done
+                    ORDER BY completed_at DESC, id DESC
+                    LIMIT %s
+                """, (limit + 1,))
+            elif not backward:
+                cur.execute(f"""
+                    SELECT {columns}
+                    FROM repairs_done
+                    WHERE (completed_at, id) < (SELECT completed_at, id FROM repairs_done WHERE id = %s)
+                    ORDER BY completed_at DESC, id DESC
+                    LIMIT %s
+                """, (cursor, limit + 1))
+            else:
+                cur.execute(f"""
+                    SELECT {columns}
+                    FROM repairs_done
+                    WHERE (completed_at, id) > (SELECT completed_at, id FROM repairs_done WHERE id = %s)
+                    ORDER BY completed_at ASC, id ASC
+                    LIMIT %s
+                """, (cursor, limit))
+            rows = cur.fetchall()
+
+            if backward and cursor is not None:
+                rows = rows[::-1]
+                has_more = True
+            else:
+                has_more = len(rows) > limit
+                rows = rows[:limit]
+
+            next_cursor = rows[-1][0] if has_more and rows else None
+            return rows, next_cursor, estimate_rows(cur, "repairs_done")
+
+
+# --- Асинхронные версии для хендлеров ---
+save_pending_repair_async = to_async(save_pending_repair)
+has_pending_repair_async = to_async(has_pending_repair)
+get_all_pending_repairs_async = to_async(get_all_pending_repairs)
+get_repair_by_id_async = to_async(get_repair_by_id)
+mark_repair_as_processed_async = to_async(mark_repair_as_processed)
+add_done_repair_async = to_async(add_done_repair)
+get_all_done_repairs_async = to_async(get_all_done_repairs)
+get_all_done_repairs_admin_async = to_async(get_all_done_repairs_admin)
+get_done_repairs_page_async = to_async(get_done_repairs_page)
@@ -1,4 +1,4 @@
-from database.db import get_connection
+from database.db import get_connection, to_async
 from typing import Optional
 
 
@@ -128,3 +128,13 @@ def update_scooter_field(scooter_id, field, value):
             sql = f"UPDATE scooters SET {field} = %s WHERE id = %s"
             cur.execute(sql, (value, scooter_id))
             conn.commit()
+
+
+
+# --- Асинхронные версии для хендлеров ---
+add_scooter_async = to_async(add_scooter)
+set_sheet_col_for_scooter_async = to_async(set_sheet_col_for_scooter)
+get_sheet_col_for_scooter_async = to_async(get_sheet_col_for_scooter)
+get_scooters_by_client_async = to_async(get_scooters_by_client)
+get_scooter_by_id_async = to_async(get_scooter_by_id)
+update_scooter_field_async = to_async(update_scooter_field)
@@ -1,6 +1,6 @@
 import json
 from datetime import datetime
-from database.db import get_connection
+from database.db import get_connection, to_async
 
 def save_basic_user(tg_id: int, username: str | None):
     try:
@@ -38,4 +38,10 @@ def user_exists(tg_id: int) -> bool:
     with get_connection() as conn:
         with conn.cursor() as cur:
             cur.execute("SELECT 1 FROM tg_users WHERE telegram_id = %s", (tg_id,))
-            return cur.fetchone() is not None        
+            return cur.fetchone() is not None
+
+
+
+# --- Асинхронные версии для хендлеров ---
+save_basic_user_async = to_async(save_basic_user)
+user_exists_async = to_async(user_exists)
@@ -1,4 +1,4 @@
-from database.db import get_connection
+from database.db import get_connection, to_async
 
 def check_user(tg_id: int) -> bool:
     with get_connection() as conn:
@@ -26,6 +26,14 @@ def get_user_info(tg_id: int) -> dict:
             }
 
 
+def user_has_scooter(tg_id: int) -> bool:
+    with get_connection() as conn:
+        with conn.cursor() as cur:
+            cur.execute("SELECT has_scooter FROM users WHERE tg_id = %s", (tg_id,))
+            row = cur.fetchone()
+            return bool(row and row[0])
+
+
 def add_user(tg_id: int, username: str, full_name: str, phone: str):
     with get_connection() as conn:
         with conn.cursor() as cur:
@@ -52,4 +60,14 @@ def get_renters_tg_ids() -> list[int]:
     with get_connection() as conn:
         with conn.cursor() as cur:
             cur.execute("SELECT tg_id FROM users WHERE has_scooter = TRUE")
-            return [row[0] for row in cur.fetchall()]
\ No newline at end of file
+            return [row[0] for row in cur.fetchall()]
+
+
+
+# --- Асинхронные версии для хендлеров ---
+check_user_async = to_async(check_user)
+get_user_info_async = to_async(get_user_info)
+user_has_scooter_async = to_async(user_has_scooter)
+add_user_async = to_async(add_user)
+set_user_has_scooter_async = to_async(set_user_has_scooter)
+get_renters_tg_ids_async = to_async(get_renters_tg_ids)
@@ -1,6 +1,6 @@
 from telegram import InlineKeyboardMarkup, InlineKeyboardButton, Update
 from telegram.ext import ContextTypes, CallbackQueryHandler
-from database.repairs import get_repair_by_id, mark_repair_as_processed
+from database.repairs import get_repair_by_id_async, mark_repair_as_processed_async
 from services.notifier import send_repair_to_master
 from handlers.keyboard_utils import get_admin_inline_keyboard
 
@@ -40,7 +40,7 @@ async def assign_repair_callback(update: Update, context: ContextTypes.DEFAULT_T
 
     repair_id = int(query.data.split(":")[1])
     context.user_data["repair_id"] = repair_id
-    repair = get_repair_by_id(repair_id)
+    repair = await get_repair_by_id_async(repair_id)
     context.user_data["current_repair"] = repair
 
     await query.message.reply_text(
@@ -71,7 +71,7 @@ async def handle_master_selection(update: Update, context: ContextTypes.DEFAULT_
 
     try:
         await send_repair_to_master(master_id, repair)
-        mark_repair_as_processed(repair["id"])
+        await mark_repair_as_processed_async(repair["id"])
         keyboard = InlineKeyboardMarkup([
         [InlineKeyboardButton("⬅️ Назад в админку", callback_data="back_to_admin")]
     ])
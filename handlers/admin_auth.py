@@ -5,11 +5,11 @@ from os import getenv
 from telegram import Bot, Update
 from telegram.ext import ContextTypes
 
-from database.admins import add_admin
+from database.admins import add_admin_async
 
 from database.admin_security import (
-    get_security_state, set_lock, clear_lock_and_attempts,
-    increment_attempt, is_locked, get_last_attempt_at
+    set_lock_async, clear_lock_and_attempts_async, increment_attempt_async, is_locked_async,
+    get_last_attempt_at_async
 )
 
 from utils.cleanup import cleanup_admin_messages
@@ -42,7 +42,7 @@ async def admin_entry(update: Update, context: ContextTypes.DEFAULT_TYPE):
     await cleanup_previous_messages(update, context)
 
     user = update.effective_user
-    locked_until = is_locked(user.id)
+    locked_until = await is_locked_async(user.id)
     if locked_until and datetime.now(timezone.utc) < locked_until:
         await update.effective_chat.send_message(
             f"⛔ Доступ заблокирован. Подождите {_remain_text(locked_until)}."
@@ -64,14 +64,14 @@ async def check_admin_pin(update: Update, context: ContextTypes.DEFAULT_TYPE):
     user = update.effective_user
 
     # 1) Проверка блокировки
-    locked_until = is_locked(user.id)
+    locked_until = await is_locked_async(user.id)
     if locked_until and datetime.now(timezone.utc) < locked_until:
         await update.message.reply_text(f"⛔ Доступ заблокирован. Подождите {_remain_text(locked_until)}.")
         context.user_data.pop("awaiting_admin_pin", None)
         return
 
     # 2) Антифлуд (частота)
-    last_at = get_last_attempt_at(user.id)
+    last_at = await get_last_attempt_at_async(user.id)
     if last_at and (datetime.now(timezone.utc) - last_at).total_seconds() < RATE_LIMIT_SECONDS:
         await update.message.reply_text("⏳ Слишком часто. Подождите пару секунд и попробуйте снова.")
         return
@@ -80,18 +80,18 @@ async def check_admin_pin(update: Update, context: ContextTypes.DEFAULT_TYPE):
     correct_pin = getenv("ADMIN_PIN")
 
     if entered_pin == correct_pin:
-        add_admin(user.id, user.username, user.full_name)
+        await add_admin_async(user.id, user.username, user.full_name)
         context.user_data["admin_authenticated"] = True
         context.user_data.pop("awaiting_admin_pin", None)
-        clear_lock_and_attempts(user.id)
+        await clear_lock_and_attempts_async(user.id)
         await update.message.reply_text("✅ PIN верный, доступ разрешён.")
         return await show_admin_panel(update, context)
 
     # Неверно — инкремент в БД
-    attempts = increment_attempt(user.id)
+    attempts = await increment_attempt_async(user.id)
 
     if attempts >= MAX_ATTEMPTS:
-        lock_until = set_lock(user.id, LOCK_MINUTES)
+        lock_until = await set_lock_async(user.id, LOCK_MINUTES)
         alert_text = (
             f"🚨 <b>{MAX_ATTEMPTS} неверные попытки входа в админку!</b>\n\n"
             f"👤 {user.full_name} | @{user.username or '—'}\n"
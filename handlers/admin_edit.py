@@ -1,8 +1,8 @@
 from telegram import Update, InlineKeyboardButton, InlineKeyboardMarkup
 from telegram.ext import ContextTypes, ConversationHandler, CallbackQueryHandler, MessageHandler, filters
 
-from database.clients import update_client_field
-from database.scooters import get_scooter_by_id, get_scooters_by_client, update_scooter_field
+from database.clients import update_client_field_async
+from database.scooters import get_scooters_by_client_async, update_scooter_field_async
 from datetime import datetime
 
 from handlers.admin_panel import handle_back_to_clients, show_single_client
@@ -132,7 +132,7 @@ async def choose_section(update: Update, context: ContextTypes.DEFAULT_TYPE):
 
     elif query.data == "edit_scooters":
         client_id = context.user_data["edit_client_id"]
-        scooters = get_scooters_by_client(client_id)
+        scooters = await get_scooters_by_client_async(client_id)
         if not scooters:
             msg = await query.message.reply_text("❌ У клиента нет скутеров.")
             context.user_data.setdefault("edit_message_ids", []).append(msg.message_id)
@@ -188,7 +188,7 @@ async def process_name(update: Update, context: ContextTypes.DEFAULT_TYPE):
 
     client_id = context.user_data["edit_client_id"]
     value = update.message.text.strip()
-    update_client_field(client_id, "full_name", value)
+    await update_client_field_async(client_id, "full_name", value)
 
     msg = await update.message.reply_text("✅ ФИО обновлено.")
     context.user_data["edit_message_ids"].append(msg.message_id)
@@ -207,7 +207,7 @@ async def process_age(update: Update, context: ContextTypes.DEFAULT_TYPE):
         context.user_data["edit_message_ids"].append(msg.message_id)
         return EDIT_AGE
 
-    update_client_field(client_id, "age", int(value))
+    await update_client_field_async(client_id, "age", int(value))
     msg = await update.message.reply_text("✅ Возраст обновлён.")
     context.user_data["edit_message_ids"].append(msg.message_id)
 
@@ -224,7 +224,7 @@ async def process_city(update: Update, context: ContextTypes.DEFAULT_TYPE):
     print(f"[FSM] process_city: новое значение = {value}")
 
     try:
-        update_client_field(client_id, "city", value)
+        await update_client_field_async(client_id, "city", value)
         msg = await update.message.reply_text("✅ Город обновлён.")
         context.user_data["edit_message_ids"].append(msg.message_id)
     except Exception as e:
@@ -250,7 +250,7 @@ async def process_phone(update: Update, context: ContextTypes.DEFAULT_TYPE):
 
     client_id = context.user_data["edit_client_id"]
     value = update.message.text.strip()
-    update_client_field(client_id, "phone", value)
+    await update_client_field_async(client_id, "phone", value)
 
     msg = await update.message.reply_text("✅ Телефон обновлён.")
     context.user_data["edit_message_ids"].append(msg.message_id)
@@ -263,7 +263,7 @@ async def process_workplace(update: Update, context: ContextTypes.DEFAULT_TYPE):
 
     client_id = context.user_data["edit_client_id"]
     value = update.message.text.strip()
-    update_client_field(client_id, "workplace", value)
+    await update_client_field_async(client_id, "workplace", value)
 
     msg = await update.message.reply_text("✅ Место работы обновлено.")
     context.user_data["edit_message_ids"].append(msg.message_id)
@@ -303,7 +303,7 @@ async def back_to_scooters_list(update: Update, context: ContextTypes.DEFAULT_TY
     await cleanup_edit_messages(update, context)  
 
     client_id = context.user_data["edit_client_id"]
-    scooters = get_scooters_by_client(client_id)
+    scooters = await get_scooters_by_client_async(client_id)
 
     keyboard = []
     for scooter in scooters:
@@ -384,7 +384,7 @@ async def process_model(update: Update, context: ContextTypes.DEFAULT_TYPE):
     await cleanup_edit_messages(update, context)
     scooter_id = context.user_data["selected_scooter_id"]
     value = update.message.text.strip()
-    update_scooter_field(scooter_id, "model", value)
+    await update_scooter_field_async(scooter_id, "model", value)
     msg = await update.message.reply_text("✅ Модель обновлена.")
     context.user_data["edit_message_ids"].append(msg.message_id) 
     return await back_to_scooter_field_menu(update, context)
@@ -394,7 +394,7 @@ async def process_vin(update: Update, context: ContextTypes.DEFAULT_TYPE):
     await cleanup_edit_messages(update, context)  
     scooter_id = context.user_data["selected_scooter_id"]
     value = update.message.text.strip()
-    update_scooter_field(scooter_id, "vin", value)
+    await update_scooter_field_async(scooter_id, "vin", value)
     msg = await update.message.reply_text("✅ VIN обновлён.")
     context.user_data["edit_message_ids"].append(msg.message_id)
     return await back_to_scooter_field_menu(update, context)
@@ -403,7 +403,7 @@ async def process_motor_vin(update: Update, context: ContextTypes.DEFAULT_TYPE):
     await cleanup_edit_messages(update, context) 
     scooter_id = context.user_data["selected_scooter_id"]
     value = update.message.text.strip()
-    update_scooter_field(scooter_id, "motor_vin", value)
+    await update_scooter_field_async(scooter_id, "motor_vin", value)
     msg = await update.message.reply_text("✅ VIN мотора обновлён.")
     context.user_data["edit_message_ids"].append(msg.message_id)
     return await back_to_scooter_field_menu(update, context)
@@ -417,7 +417,7 @@ async def process_issue_date(update: Update, context: ContextTypes.DEFAULT_TYPE)
     except ValueError:
         await update.message.reply_text("❌ Неверный формат даты.")
         return EDIT_DATE
-    update_scooter_field(scooter_id, "issue_date", date_obj)
+    await update_scooter_field_async(scooter_id, "issue_date", date_obj)
     msg = await update.message.reply_text("✅ Дата обновлена.")
     context.user_data["edit_message_ids"].append(msg.message_id)
     return await back_to_scooter_field_menu(update, context)
@@ -518,13 +518,13 @@ async def process_weekly_price(update: Update, context: ContextTypes.DEFAULT_TYP
         return INPUT_WEEKLY_PRICE
 
     price = int(value)
-    update_scooter_field(scooter_id, "tariff_type", context.user_data["new_tariff_type"])
-    update_scooter_field(scooter_id, "weekly_price", price)
+    await update_scooter_field_async(scooter_id, "tariff_type", context.user_data["new_tariff_type"])
+    await update_scooter_field_async(scooter_id, "weekly_price", price)
 
     if context.user_data["new_tariff_type"] == "Выкуп":
-        update_scooter_field(scooter_id, "buyout_weeks", context.user_data["buyout_weeks"])
+        await update_scooter_field_async(scooter_id, "buyout_weeks", context.user_data["buyout_weeks"])
     else:
-        update_scooter_field(scooter_id, "buyout_weeks", None)
+        await update_scooter_field_async(scooter_id, "buyout_weeks", None)
 
     msg = await update.message.reply_text(
         f"✅ Тариф обновлён: {context.user_data['new_tariff_type']} — {price}₽/нед"
@@ -585,7 +585,7 @@ async def process_flag_value(update: Update, context: ContextTypes.DEFAULT_TYPE)
     field = context.user_data["edit_flag_field"]
     value = query.data.endswith("true")
 
-    update_scooter_field(scooter_id, field, value)
+    await update_scooter_field_async(scooter_id, field, value)
 
     msg = await query.message.reply_text(
         f"✅ {field} обновлён: {'✅ Да' if value else '❌ Нет'}"
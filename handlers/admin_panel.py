@@ -8,15 +8,18 @@ from telegram import Update, ReplyKeyboardMarkup, InlineKeyboardButton, InlineKe
 from telegram.ext import (ContextTypes, CommandHandler, CallbackQueryHandler, MessageHandler,
                           filters, ConversationHandler)
 
-from database.db import get_connection
-from database.admins import is_admin, add_admin
-from database.pending import get_all_pending_users
-from database.clients import get_all_clients, get_client_by_tg_id, search_clients, get_custom_photos_by_client, delete_client_full
-from database.repairs import get_all_pending_repairs, get_all_done_repairs, get_all_done_repairs_admin
-from database.scooters import get_scooters_by_client, get_scooter_by_id
-from database.payments import get_payments_by_scooter, save_payment_schedule_by_scooter, refresh_payment_schedule_by_scooter, get_last_and_next_friday, get_all_unpaid_clients_by_dates
-from database.notes import get_notes, add_note
-from database.postpone import get_all_postpones, get_active_postpones
+from database.pending import get_all_pending_users_async
+from database.clients import search_clients_async, delete_client_full_async, add_client_photos_async
+from database.client_cards import get_client_cards_page_async, get_client_card_async
+from database.repairs import get_all_pending_repairs_async, get_done_repairs_page_async
+from database.scooters import get_scooters_by_client_async, get_scooter_by_id_async
+from database.payments import (
+    get_payments_by_scooter_async, save_payment_schedule_by_scooter_async,
+    refresh_payment_schedule_by_scooter_async, get_last_and_next_friday,
+    get_all_unpaid_clients_by_dates_async
+)
+from database.notes import get_notes_async, add_note_async
+from database.postpone import get_all_postpones_async
 
 
 from collections import defaultdict
@@ -26,7 +29,7 @@ from utils.payments_utils import format_payment_schedule
 from utils.schedule_utils import get_next_fridays
 from utils.cleanup import cleanup_admin_messages
 from utils.time_utils import get_today
-from utils.encryption import encrypt_file_id, decrypt_file_id
+from utils.encryption import encrypt_file_id, decrypt_file_id, decrypt_file_ids
 
 from handlers.cancel_handler import universal_cancel_handler, admin_back_handler
 from handlers.admin_register import fill_callback
@@ -87,7 +90,7 @@ async def pending_requests_list(update: Update, context: ContextTypes.DEFAULT_TY
 
     await cleanup_admin_messages(update, context)
 
-    pending_users = get_all_pending_users()
+    pending_users = await get_all_pending_users_async()
     context.user_data.setdefault("admin_message_ids", [])
 
     if not pending_users:
@@ -133,14 +136,22 @@ async def handle_back_to_clients(update: Update, context: ContextTypes.DEFAULT_T
     await show_clients_page(update, context, page=0)
 
 
-async def show_clients_page(update: Update, context: ContextTypes.DEFAULT_TYPE, page: int = 0):
-    clients = get_all_clients()
-    total = len(clients)
-    pages = max(1, (total - 1) // CLIENTS_PER_PAGE + 1)
+async def show_clients_page(update: Update, context: ContextTypes.DEFAULT_TYPE, page: int = 0,
+                            cursor: int = None, backward: bool = False):
+    # одна страница карточек со скутерами, платежами, фото и заметками — несколькими запросами;
+    # cursor — id клиента, от которого листаем (keyset), page — только для подписи «Стр. N/M»
+    clients_slice, next_cursor, total = await get_client_cards_page_async(cursor, CLIENTS_PER_PAGE, backward)
 
-    if page < 0 or page >= pages:
-        await update.callback_query.answer("Нет такой страницы.")
-        return
+    if not clients_slice and cursor is not None:
+        # клиента-курсора удалили или список сдвинулся — начинаем с первой страницы
+        page, cursor, backward = 0, None, False
+        clients_slice, next_cursor, total = await get_client_cards_page_async(None, CLIENTS_PER_PAGE)
+
+    if backward and len(clients_slice) < CLIENTS_PER_PAGE:
+        # дошли до начала списка
+        page = 0
+    pages = max(1, (total - 1) // CLIENTS_PER_PAGE + 1, page + 1)
+    context.user_data["clients_page_state"] = {"page": page, "cursor": cursor, "backward": backward}
 
     await cleanup_admin_messages(update, context)
 
@@ -152,14 +163,10 @@ async def show_clients_page(update: Update, context: ContextTypes.DEFAULT_TYPE,
             pass
     context.user_data["client_message_ids"] = []
 
-    start = page * CLIENTS_PER_PAGE
-    end = start + CLIENTS_PER_PAGE
-    clients_slice = clients[start:end]
-
     for client in clients_slice:
         client_id = client["id"]
         photos = []
-        custom_photos = get_custom_photos_by_client(client_id)
+        custom_photos = decrypt_file_ids(client["custom_photos"])
 
         if client.get("client_photo_id"):
             photos.append(InputMediaPhoto(
@@ -181,7 +188,7 @@ async def show_clients_page(update: Update, context: ContextTypes.DEFAULT_TYPE,
 
         for i, file_id in enumerate(custom_photos, start=1):
             photos.append(InputMediaPhoto(
-                decrypt_file_id(file_id), 
+                file_id, 
                 caption=f"📷 Доп. фото {i}"
         ))
 
@@ -206,7 +213,7 @@ async def show_clients_page(update: Update, context: ContextTypes.DEFAULT_TYPE,
             f"\n<b>🛵 Скутеры клиента:</b>\n\n"
         )
 
-        scooters = get_scooters_by_client(client_id)
+        scooters = client["scooters"]
 
         for idx, scooter in enumerate(scooters, start=1):
             if len(scooters) > 1 and idx > 1:
@@ -236,24 +243,9 @@ async def show_clients_page(update: Update, context: ContextTypes.DEFAULT_TYPE,
             ]
             text += "\n" + "\n".join(options) + "\n"
 
-            payments = get_payments_by_scooter(scooter['id'])
-            postpones = get_active_postpones(scooter['id'])
+            text += format_payment_schedule(client['telegram_id'], scooter["payments"], scooter["postpones"])
 
-
-            postpones_dicts = [
-            {
-            "original_date": row[0],
-            "scheduled_date": row[1],
-            "with_fine": row[2],
-            "fine_amount": row[3],
-            "requested_at": row[4]
-            }
-            for row in postpones
-            ]
-
-            text += format_payment_schedule(client['telegram_id'], payments, postpones_dicts)
-
-        notes = get_notes(client_id)
+        notes = client["notes"]
 
         if notes:
             text += "\n\n📝 <b>Последние заметки:</b>\n\n"
@@ -284,11 +276,15 @@ async def show_clients_page(update: Update, context: ContextTypes.DEFAULT_TYPE,
 
 # Навигация + кнопка назад
     nav_buttons = []
-    if page > 0:
-        nav_buttons.append(InlineKeyboardButton("◀️ Назад", callback_data=f"clients_page:{page - 1}"))
+    if page > 0 and clients_slice:
+        nav_buttons.append(InlineKeyboardButton(
+            "◀️ Назад", callback_data=f"clients_page:b:{clients_slice[0]['id']}:{page - 1}"
+        ))
     nav_buttons.append(InlineKeyboardButton(f"📄 Стр. {page + 1}/{pages}", callback_data="noop"))
-    if end < total:
-        nav_buttons.append(InlineKeyboardButton("▶️ Вперёд", callback_data=f"clients_page:{page + 1}"))
+    if next_cursor is not None:
+        nav_buttons.append(InlineKeyboardButton(
+            "▶️ Вперёд", callback_data=f"clients_page:f:{next_cursor}:{page + 1}"
+        ))
 
 # Кнопка назад в админку
     nav_buttons.append(InlineKeyboardButton("↩️ Назад", callback_data="admin_back"))
@@ -303,8 +299,14 @@ async def handle_clients_pagination(update: Update, context: ContextTypes.DEFAUL
     await update.callback_query.answer()
     await cleanup_admin_messages(update, context)
 
-    page = int(update.callback_query.data.split(":")[1])
-    await show_clients_page(update, context, page=page)
+    # clients_page:<f|b>:<id клиента-курсора>:<номер страницы>
+    parts = update.callback_query.data.split(":")
+    if len(parts) != 4:
+        # кнопка из старого сообщения — открываем первую страницу
+        await show_clients_page(update, context, page=0)
+        return
+    _, direction, cursor, page = parts
+    await show_clients_page(update, context, page=int(page), cursor=int(cursor), backward=direction == "b")
 
 
 async def repair_pending_requests_list(update: Update, context: ContextTypes.DEFAULT_TYPE):
@@ -313,7 +315,7 @@ async def repair_pending_requests_list(update: Update, context: ContextTypes.DEF
 
     await cleanup_admin_messages(update, context)
 
-    requests = get_all_pending_repairs()
+    requests = await get_all_pending_repairs_async()
     context.user_data["admin_message_ids"] = []
 
     if not requests:
@@ -421,35 +423,26 @@ async def handle_flexible_photo(update: Update, context: ContextTypes.DEFAULT_TY
     client_id = context.user_data["upload_photo_client_id"]
     photos = context.user_data["photo_ids"]
 
-    with get_connection() as conn:
-        with conn.cursor() as cur:
-            for file_id in photos:
-                cur.execute("""
-                    INSERT INTO client_photos (client_id, file_id, uploaded_at)
-                    VALUES (%s, %s, NOW())
-                """, (client_id, file_id))
-        conn.commit()
+    await add_client_photos_async(client_id, photos)
 
     await cleanup_admin_messages(update, context)
     await update.message.reply_text("✅ Фото успешно добавлены!")
 
     return await back_to_selected_client(update, context)
 
-async def show_done_repairs_page(update: Update, context: ContextTypes.DEFAULT_TYPE, page: int = 0):
-    repairs = get_all_done_repairs_admin()
-    total = len(repairs)
-    pages = (total - 1) // REPAIRS_PER_PAGE + 1
+async def show_done_repairs_page(update: Update, context: ContextTypes.DEFAULT_TYPE, page: int = 0,
+                                 cursor: int = None, backward: bool = False):
+    repairs_slice, next_cursor, total = await get_done_repairs_page_async(cursor, REPAIRS_PER_PAGE, backward)
 
-    if page < 0 or page >= pages:
-        if update.callback_query:
-            await update.callback_query.answer("Нет такой страницы.")
-        return
+    if not repairs_slice and cursor is not None:
+        page, cursor, backward = 0, None, False
+        repairs_slice, next_cursor, total = await get_done_repairs_page_async(None, REPAIRS_PER_PAGE)
 
-    await cleanup_admin_messages(update, context)
+    if backward and len(repairs_slice) < REPAIRS_PER_PAGE:
+        page = 0
+    pages = max(1, (total - 1) // REPAIRS_PER_PAGE + 1, page + 1)
 
-    start = page * REPAIRS_PER_PAGE
-    end = start + REPAIRS_PER_PAGE
-    repairs_slice = repairs[start:end]
+    await cleanup_admin_messages(update, context)
 
     for r in repairs_slice:
         id, tg_id, username, name, city, phone, vin, problem, photo_file_id, completed_at = r
@@ -480,11 +473,15 @@ async def show_done_repairs_page(update: Update, context: ContextTypes.DEFAULT_T
 
     # Пагинация + кнопка назад
     nav_buttons = []
-    if page > 0:
-        nav_buttons.append(InlineKeyboardButton("◀️ Назад", callback_data=f"repairs_page:{page - 1}"))
+    if page > 0 and repairs_slice:
+        nav_buttons.append(InlineKeyboardButton(
+            "◀️ Назад", callback_data=f"repairs_page:b:{repairs_slice[0][0]}:{page - 1}"
+        ))
     nav_buttons.append(InlineKeyboardButton(f"📄 Стр. {page + 1}/{pages}", callback_data="noop"))
-    if end < total:
-        nav_buttons.append(InlineKeyboardButton("▶️ Вперёд", callback_data=f"repairs_page:{page + 1}"))
+    if next_cursor is not None:
+        nav_buttons.append(InlineKeyboardButton(
+            "▶️ Вперёд", callback_data=f"repairs_page:f:{next_cursor}:{page + 1}"
+        ))
 
     # Кнопка назад в админку
     nav_buttons.append(InlineKeyboardButton("🔙 Назад", callback_data="admin_back"))
@@ -500,8 +497,13 @@ async def done_repairs_list_entry(update: Update, context: ContextTypes.DEFAULT_
 
 
 async def handle_repairs_pagination(update: Update, context: ContextTypes.DEFAULT_TYPE):
-    page = int(update.callback_query.data.split(":")[1])
-    await show_done_repairs_page(update, context, page=page)
+    # repairs_page:<f|b>:<id заявки-курсора>:<номер страницы>
+    parts = update.callback_query.data.split(":")
+    if len(parts) != 4:
+        await show_done_repairs_page(update, context, page=0)
+        return
+    _, direction, cursor, page = parts
+    await show_done_repairs_page(update, context, page=int(page), cursor=int(cursor), backward=direction == "b")
 
 
 #Продление аренды
@@ -511,7 +513,7 @@ async def extend_start(update: Update, context: ContextTypes.DEFAULT_TYPE):
     client_id = int(query.data.split(":")[1])
     context.user_data["extend_client_id"] = client_id
 
-    scooters = get_scooters_by_client(client_id)
+    scooters = await get_scooters_by_client_async(client_id)
     if not scooters:
         await cleanup_admin_messages(update, context)
         msg = await query.message.reply_text("❗ У этого клиента нет зарегистрированных скутеров.")
@@ -578,7 +580,7 @@ async def extend_save(update: Update, context: ContextTypes.DEFAULT_TYPE):
         await update.message.reply_text("⚠️ Не выбран самокат для продления.")
         return ConversationHandler.END
 
-    payments = get_payments_by_scooter(scooter_id)
+    payments = await get_payments_by_scooter_async(scooter_id)
     if not payments:
         await update.message.reply_text("❗ Нет графика платежей для этого скутера.")
         return ConversationHandler.END
@@ -587,7 +589,7 @@ async def extend_save(update: Update, context: ContextTypes.DEFAULT_TYPE):
     start_date = last_date + timedelta(days=1)
     new_dates = get_next_fridays(start_date, weeks)
 
-    scooters = get_scooters_by_client(context.user_data["extend_client_id"])
+    scooters = await get_scooters_by_client_async(context.user_data["extend_client_id"])
     scooter = next((s for s in scooters if s['id'] == scooter_id), None)
 
     if not scooter:
@@ -597,7 +599,7 @@ async def extend_save(update: Update, context: ContextTypes.DEFAULT_TYPE):
     weekly_price = scooter['weekly_price']
 
     # Запись новых платежей
-    save_payment_schedule_by_scooter(scooter_id, new_dates, weekly_price)
+    await save_payment_schedule_by_scooter_async(scooter_id, new_dates, weekly_price)
 
     await cleanup_admin_messages(update, context)
 
@@ -614,7 +616,7 @@ async def refresh_menu(update: Update, context: ContextTypes.DEFAULT_TYPE):
     await query.answer()
 
     client_id = int(query.data.split(":")[1])
-    scooters = get_scooters_by_client(client_id)
+    scooters = await get_scooters_by_client_async(client_id)
 
     if not scooters:
         await cleanup_admin_messages(update, context)
@@ -645,7 +647,7 @@ async def refresh_scooter(update: Update, context: ContextTypes.DEFAULT_TYPE):
     await query.answer()
 
     scooter_id = int(query.data.split(":")[1])
-    scooter = get_scooter_by_id(scooter_id)
+    scooter = await get_scooter_by_id_async(scooter_id)
 
     if not scooter:
         await query.message.reply_text("❗ Скутер не найден.")
@@ -657,7 +659,7 @@ async def refresh_scooter(update: Update, context: ContextTypes.DEFAULT_TYPE):
     else:
         full_weeks_count = 10
 
-    payments = get_payments_by_scooter(scooter_id)
+    payments = await get_payments_by_scooter_async(scooter_id)
     paid_payments = [p for p in payments if p[2] is True]
 
     if paid_payments:
@@ -692,7 +694,7 @@ async def refresh_scooter(update: Update, context: ContextTypes.DEFAULT_TYPE):
         remaining_weeks = full_weeks_count
 
     
-    refresh_payment_schedule_by_scooter(scooter_id, start_date, remaining_weeks, weekly_price)
+    await refresh_payment_schedule_by_scooter_async(scooter_id, start_date, remaining_weeks, weekly_price)
 
     await cleanup_admin_messages(update, context)
     msg = await query.message.reply_text("✅ График платежей обновлён!")
@@ -707,7 +709,7 @@ async def show_unpaid_payments(update: Update, context: ContextTypes.DEFAULT_TYP
     today = get_today()
     last_friday, next_friday = get_last_and_next_friday(today)
 
-    unpaid = get_all_unpaid_clients_by_dates([last_friday, next_friday])
+    unpaid = await get_all_unpaid_clients_by_dates_async([last_friday, next_friday])
     if not unpaid:
         await update.callback_query.message.edit_text(
             "✅ Все платежи оплачены.",
@@ -718,7 +720,7 @@ async def show_unpaid_payments(update: Update, context: ContextTypes.DEFAULT_TYP
         return
 
     # Получаем все активные переносы
-    active_postpones = get_all_postpones()
+    active_postpones = await get_all_postpones_async()
     postpones_dict = {}
     for tg_id, scooter_id, original_date, scheduled_date, with_fine, fine_amount, is_closed, requested_at in active_postpones:
         postpones_dict[original_date] = (scheduled_date, with_fine, fine_amount)
@@ -785,7 +787,7 @@ async def save_note(update: Update, context: ContextTypes.DEFAULT_TYPE):
     text = update.message.text.strip()
     client_id = context.user_data["notes_client_id"]
 
-    add_note(client_id, text)
+    await add_note_async(client_id, text)
 
     await cleanup_admin_messages(update, context)
 
@@ -810,7 +812,7 @@ async def show_all_notes(update: Update, context: ContextTypes.DEFAULT_TYPE):
 
     client_id = int(query.data.split(":")[1])
    
-    notes = get_notes(client_id, limit=50)
+    notes = await get_notes_async(client_id, limit=50)
 
     if not notes:
         msg = await query.message.reply_text("⚠️ У клиента пока нет заметок.")
@@ -851,7 +853,7 @@ async def process_search_query(update: Update, context: ContextTypes.DEFAULT_TYP
     print("FSM (DEBUG): получен текст:", update.message.text)
     print("context:", context.user_data)
     query = update.message.text.strip()
-    results = search_clients(query)
+    results = await search_clients_async(query)
 
     await cleanup_admin_messages(update, context)
 
@@ -882,8 +884,7 @@ async def process_search_query(update: Update, context: ContextTypes.DEFAULT_TYP
 async def show_single_client(update: Update, context: ContextTypes.DEFAULT_TYPE, client_id: int):
     await cleanup_admin_messages(update, context)
 
-    clients = get_all_clients()
-    client = next((c for c in clients if c["id"] == client_id), None)
+    client = await get_client_card_async(client_id)
 
     if not client:
         await update.effective_chat.send_message("❌ Клиент не найден.")
@@ -900,7 +901,7 @@ async def show_single_client(update: Update, context: ContextTypes.DEFAULT_TYPE,
         f"\n<b>🛵 Скутеры клиента:</b>\n\n"
     )
 
-    scooters = get_scooters_by_client(client_id)
+    scooters = client["scooters"]
     for idx, scooter in enumerate(scooters, start=1):
         if len(scooters) > 1 and idx > 1:
             text += "\n🔻🔻🔻🔻🔻🔻🔻🔻🔻\n\n"
@@ -928,22 +929,9 @@ async def show_single_client(update: Update, context: ContextTypes.DEFAULT_TYPE,
         ]
         text += "\n" + "\n".join(options) + "\n"
 
-        payments = get_payments_by_scooter(scooter['id'])
-        postpones = get_active_postpones(scooter['id'])
-
-        postpones_dicts = [
-            {
-                "original_date": row[0],
-                "scheduled_date": row[1],
-                "with_fine": row[2],
-                "fine_amount": row[3],
-                "requested_at": row[4]
-            }
-            for row in postpones
-        ]
-        text += format_payment_schedule(client['telegram_id'], payments, postpones_dicts)
+        text += format_payment_schedule(client['telegram_id'], scooter["payments"], scooter["postpones"])
 
-    notes = get_notes(client_id)
+    notes = client["notes"]
     if notes:
         text += "\n\n📝 <b>Последние заметки:</b>\n\n"
         for note, created_at in notes:
@@ -967,7 +955,7 @@ async def show_single_client(update: Update, context: ContextTypes.DEFAULT_TYPE,
     ])
 
     # Фото
-    custom_photos = get_custom_photos_by_client(client_id)
+    custom_photos = decrypt_file_ids(client["custom_photos"])
     standard_photos = []
 
     if client.get("client_photo_id"):
@@ -988,7 +976,7 @@ async def show_single_client(update: Update, context: ContextTypes.DEFAULT_TYPE,
 
     for i, file_id in enumerate(custom_photos, start=1):
         standard_photos.append(InputMediaPhoto(
-            decrypt_file_id(file_id),
+            file_id,
             caption=f"📷 Доп. фото {i}"
         ))
 
@@ -1056,8 +1044,8 @@ async def back_to_selected_client(update: Update, context: ContextTypes.DEFAULT_
             await show_single_client(update, context, client_id)
             return ConversationHandler.END
 
-    page = context.user_data.get("current_page", 0)
-    await show_clients_page(update, context, page=page)
+    state = context.user_data.get("clients_page_state") or {}
+    await show_clients_page(update, context, **state)
     return ConversationHandler.END
 
 async def handle_admin_back(update: Update, context: ContextTypes.DEFAULT_TYPE):
@@ -1095,7 +1083,7 @@ async def go_to_main_menu(update: Update, context: ContextTypes.DEFAULT_TYPE):
 
 async def handle_delete_client(update: Update, context: ContextTypes.DEFAULT_TYPE):
     client_id = int(update.callback_query.data.split(":")[1])
-    delete_client_full(client_id)
+    await delete_client_full_async(client_id)
     await update.callback_query.answer("Клиент удалён.")
     await update.callback_query.message.edit_text("✅ Клиент полностью удалён из базы.")
 
@@ -1114,11 +1102,11 @@ def register_admin_handlers(app):
     app.add_handler(CallbackQueryHandler(show_unpaid_payments, pattern="^unpaid_payments$"))
     app.add_handler(CallbackQueryHandler(go_to_main_menu, pattern="^admin_to_main$"))
     app.add_handler(CallbackQueryHandler(lambda u, c: show_clients_page(u, c, page=0), pattern="^admin_all_clients$"))
-    app.add_handler(CallbackQueryHandler(handle_clients_pagination, pattern=r"^clients_page:\d+$"))
+    app.add_handler(CallbackQueryHandler(handle_clients_pagination, pattern=r"^clients_page:"))
     app.add_handler(CallbackQueryHandler(lambda u, c: u.callback_query.answer("Навигация"), pattern="^noop$"))
     app.add_handler(CallbackQueryHandler(repair_pending_requests_list, pattern="^admin_pending_repairs$"))
     app.add_handler(CallbackQueryHandler(done_repairs_list_entry, pattern="^admin_done_repairs$"))
-    app.add_handler(CallbackQueryHandler(handle_repairs_pagination, pattern=r"^repairs_page:\d+$"))
+    app.add_handler(CallbackQueryHandler(handle_repairs_pagination, pattern=r"^repairs_page:"))
     app.add_handler(CallbackQueryHandler(show_all_notes, pattern=r"^all_notes:\d+$"))
     
     
@@ -14,13 +14,14 @@ from integrations.gsheets_fleet_matrix import (
     upload_image_bytes_to_drive,
     place_client_photos,
 )
+from integrations.google_io import run_google
 
 
-from database.clients import add_client
-from database.scooters import add_scooter, set_sheet_col_for_scooter
-from database.payments import create_payment_schedule
-from database.users import add_user, set_user_has_scooter
-from database.pending import delete_pending_user, get_all_pending_users
+from database.clients import add_client_async
+from database.scooters import add_scooter_async, set_sheet_col_for_scooter_async
+from database.payments import create_payment_schedule_async
+from database.users import add_user_async, set_user_has_scooter_async
+from database.pending import delete_pending_user_async, get_all_pending_users_async
 
 from utils.schedule_utils import get_next_fridays
 from utils.encryption import encrypt_file_id, decrypt_file_id
@@ -97,7 +98,7 @@ async def fill_callback(update: Update, context: ContextTypes.DEFAULT_TYPE):
     tg_id = int(query.data.split(":")[1])
     context.user_data["tg_id_to_register"] = tg_id
 
-    for user in get_all_pending_users():
+    for user in await get_all_pending_users_async():
         if user[0] == tg_id:
             context.user_data["username"] = user[1]
 
@@ -418,7 +419,7 @@ async def save_all_data(update: Update, context: ContextTypes.DEFAULT_TYPE):
         username = f"@{username}"
 
     # --- 1) создаём клиента ---
-    client_id = add_client(
+    client_id = await add_client_async(
         telegram_id=tg_id,
         username=username,
         full_name=context.user_data["full_name"],
@@ -434,12 +435,12 @@ async def save_all_data(update: Update, context: ContextTypes.DEFAULT_TYPE):
     # --- 2) обрабатываем каждый скутер пользователя ---
     for scooter in context.user_data.get("scooters", []):
         # 2.1) запись скутера в БД
-        scooter_id = add_scooter(client_id, scooter)
+        scooter_id = await add_scooter_async(client_id, scooter)
 
         # 2.2) график платежей в БД
         weeks = scooter.get("buyout_weeks") or 10
         payment_dates = get_next_fridays(scooter["issue_date"], weeks=weeks)
-        create_payment_schedule(scooter_id, payment_dates, scooter["weekly_price"])
+        await create_payment_schedule_async(scooter_id, payment_dates, scooter["weekly_price"])
 
         # 2.3) колонка в Google Sheets (левая колонка пары = даты)
         new_sheet_payload = {
@@ -455,9 +456,9 @@ async def save_all_data(update: Update, context: ContextTypes.DEFAULT_TYPE):
             "Зашло": 0,
         }
 
-        left_col, _ = create_client_column_auto(new_sheet_payload, project_name="Самокат")
-        set_cost_value(left_col, int(scooter.get("weekly_price", 0) or 0))
-        set_sheet_col_for_scooter(scooter_id, left_col)
+        left_col, _ = await run_google(create_client_column_auto, new_sheet_payload, project_name="Самокат")
+        await run_google(set_cost_value, left_col, int(scooter.get("weekly_price", 0) or 0))
+        await set_sheet_col_for_scooter_async(scooter_id, left_col)
 
         # 2.4) фото → Drive → вставка в таблицу (если фотки есть)
         async def _dl(enc_file_id: str | None) -> bytes | None:
@@ -481,11 +482,11 @@ async def save_all_data(update: Update, context: ContextTypes.DEFAULT_TYPE):
             if not (img1 and img2 and img3):
                 await update.effective_chat.send_message("⚠️ Не удалось скачать одно из фото из Telegram. Фото в Google Sheets не загружены.")
             else:
-                url1 = upload_image_bytes_to_drive(img1, f"client_{scooter_id}_1.jpg")
-                url2 = upload_image_bytes_to_drive(img2, f"client_{scooter_id}_2.jpg")
-                url3 = upload_image_bytes_to_drive(img3, f"client_{scooter_id}_3.jpg")
+                url1 = await run_google(upload_image_bytes_to_drive, bytes(img1), f"client_{scooter_id}_1.jpg")
+                url2 = await run_google(upload_image_bytes_to_drive, bytes(img2), f"client_{scooter_id}_2.jpg")
+                url3 = await run_google(upload_image_bytes_to_drive, bytes(img3), f"client_{scooter_id}_3.jpg")
                 print("[PH] urls:", url1, url2, url3)
-                place_client_photos(left_col, url1, url2, url3)
+                await run_google(place_client_photos, left_col, url1, url2, url3)
                 print ("[PH] placed at col", left_col)
         except Exception as e:
             print ("[PH] ERROR:", e)
@@ -495,14 +496,14 @@ async def save_all_data(update: Update, context: ContextTypes.DEFAULT_TYPE):
 
 
     # --- 3) учёт пользователя и финал ---
-    add_user(
+    await add_user_async(
         tg_id=tg_id,
         username=username,
         full_name=context.user_data["full_name"],
         phone=context.user_data["phone"],
     )
-    set_user_has_scooter(tg_id)
-    delete_pending_user(tg_id)
+    await set_user_has_scooter_async(tg_id)
+    await delete_pending_user_async(tg_id)
 
     await update.effective_chat.send_message(
         "✅ Клиент успешно оформлен. Колонки и даты созданы в Google Sheets, стоимость выставлена."
@@ -1,11 +1,19 @@
+import asyncio
+import os
+import time
+
 from telegram import Update, InlineKeyboardButton, InlineKeyboardMarkup
+from telegram.constants import ChatAction
+from telegram.error import BadRequest, RetryAfter
 from telegram.ext import ContextTypes, ConversationHandler, MessageHandler, filters, CallbackQueryHandler
 
 from handlers.cancel_handler import universal_cancel_handler
 
-from services.faq_ai_yandex import ask_yandex_gpt
+from services.faq_ai_yandex import stream_faq_answer, YandexGPTError
 
 WAITING_FAQ = 1
+# Как часто обновляем сообщение с ответом, пока он генерируется (сек)
+FAQ_EDIT_INTERVAL = float(os.getenv("FAQ_EDIT_INTERVAL", 1.0))
 
 
 
@@ -53,14 +61,59 @@ async def handle_faq(update: Update, context: ContextTypes.DEFAULT_TYPE):
         )
         return
 
+    await update.effective_chat.send_action(ChatAction.TYPING)
+    reply = None
+    shown = ""
+    last_edit = 0.0
+    answer = ""
     try:
-        answer = ask_yandex_gpt(user_text)  # или await, если асинхронная
-        await update.message.reply_text(answer)
+        # ответ приходит по частям — показываем его сразу и дописываем не чаще FAQ_EDIT_INTERVAL
+        async for answer in stream_faq_answer(user_text):
+            if reply is None:
+                reply = await update.message.reply_text(answer)
+                shown, last_edit = answer, time.monotonic()
+            elif time.monotonic() - last_edit >= FAQ_EDIT_INTERVAL:
+                shown = await _edit_answer(reply, answer, shown)
+                last_edit = time.monotonic()
+
+        if reply is not None:
+            await _edit_answer(reply, answer, shown, final=True)
+    except YandexGPTError as e:
+        await _show_error(update, reply, str(e))
     except Exception as e:
-        await update.message.reply_text("❌ Ошибка при получении ответа. Попробуйте позже.")
+        await _show_error(update, reply, "❌ Ошибка при получении ответа. Попробуйте позже.")
         print(f"[FAQ ERROR]: {e}")
 
 
+async def _edit_answer(reply, text: str, shown: str, final: bool = False) -> str:
+    """Обновить сообщение с ответом; возвращает то, что теперь видит пользователь."""
+    if text == shown:
+        return shown
+    try:
+        await reply.edit_text(text)
+        return text
+    except RetryAfter as e:
+        if not final:
+            # слишком частые правки — пропускаем промежуточное обновление
+            return shown
+        # итоговый текст обязательно показать целиком
+        delay = e.retry_after.total_seconds() if hasattr(e.retry_after, "total_seconds") else float(e.retry_after)
+        await asyncio.sleep(delay)
+        await reply.edit_text(text)
+        return text
+    except BadRequest as e:
+        if "not modified" in str(e).lower():
+            return text
+        raise
+
+
+async def _show_error(update: Update, reply, text: str):
+    if reply is None:
+        await update.message.reply_text(text)
+    else:
+        await update.message.reply_text(text, reply_to_message_id=reply.message_id)
+
+
 
 async def faq_exit(update: Update, context: ContextTypes.DEFAULT_TYPE):
     await update.callback_query.answer()
@@ -1,6 +1,7 @@
 from telegram import Update
 from telegram.ext import CallbackQueryHandler, MessageHandler, ConversationHandler, filters, ContextTypes
 from integrations.gsheets_fleet_matrix import upsert_by_column_index, find_column_by_transport_number
+from integrations.google_io import run_google
 
 GS_WAIT_COL = 9201
 
@@ -35,14 +36,14 @@ async def gs_enter_col(update: Update, context: ContextTypes.DEFAULT_TYPE):
 
     try:
         # 1) сначала — как 'Номер транс.' (35 / H35)
-        col_index = find_column_by_transport_number(raw)
+        col_index = await run_google(find_column_by_transport_number, raw)
         if not col_index:
             # 2) не нашли по номеру — пробуем как прямой индекс
             col_index = int(raw)
 
         # Пишем строго в найденную колонку.
         # set_transport_number не задаём, чтобы не перетирать существующее значение.
-        upsert_by_column_index(col_index, payload)
+        await run_google(upsert_by_column_index, col_index, payload)
 
         context.user_data[f"gs_synced_{client_id}"] = True
         await update.message.reply_text(f"Готово. Клиент записан в колонку (индекс {col_index}).")
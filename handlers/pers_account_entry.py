@@ -3,7 +3,7 @@ from telegram.ext import ContextTypes
 
 from utils.cleanup import cleanup_lk_messages
 from handlers.admin_edit import cleanup_client_messages
-from database.users import get_user_info, check_user
+from database.users import get_user_info_async, check_user_async
 
 
 
@@ -18,7 +18,7 @@ async def personal_account_entr(update: Update, context: ContextTypes.DEFAULT_TY
     user = update.effective_user
     tg_id = user.id
 
-    if not check_user(tg_id):
+    if not await check_user_async(tg_id):
         try:
             await message.edit_text(
                 "🔒 Основной функционал личного кабинета пока недоступен.\n"
@@ -34,7 +34,7 @@ async def personal_account_entr(update: Update, context: ContextTypes.DEFAULT_TY
             context.user_data["lk_message_ids"].append(msg.message_id)
         return
 
-    user_data = get_user_info(tg_id)
+    user_data = await get_user_info_async(tg_id)
 
     text = (
         f"✅ Добро пожаловать, {user_data['full_name']}!\n"
@@ -9,30 +9,36 @@ from collections import defaultdict
 from services.notifier import notify_admin_about_postpone
 #from services.google_sheets import log_payment_postpone
 
-import uuid
 
 from dotenv import load_dotenv
 
-from database.db import get_connection
-from database.users import check_user, get_user_info
-from database.clients import get_client_by_tg_id
-from database.repairs import  get_all_done_repairs
-from database.postpone import save_postpone_request, get_postpone_for_date, get_active_postpones, has_active_postpone, get_postpone_dates_by_tg_id, close_postpone
-from database.scooters import get_scooters_by_client, get_scooter_by_id,  get_sheet_col_for_scooter
-from database.payments import get_unpaid_payments_by_scooter, get_payments_by_scooter, update_payment_amount,  save_payment_schedule_by_scooter, mark_payments_as_paid
+from database.users import check_user_async, get_user_info_async
+from database.clients import get_client_by_tg_id_async
+from database.repairs import get_all_done_repairs_async
+from database.postpone import (
+    save_postpone_request_async, get_postpone_for_date_async, get_active_postpones_async,
+    has_active_postpone_async, close_postpone_async
+)
+from database.scooters import get_scooters_by_client_async, get_scooter_by_id_async, get_sheet_col_for_scooter_async
+from database.ledger import get_client_ledgers_async
+from database.payments import (
+    get_unpaid_payments_by_scooter_async, get_payments_by_scooter_async, update_payment_amount_async,
+    save_payment_schedule_by_scooter_async, mark_payments_as_paid_async,
+    get_payments_by_ids_async, close_original_payment_async
+)
 
 from handlers.cancel_handler import universal_cancel_handler, exit_lk_handler
 from handlers.register_client import cleanup_previous_messages
 from handlers.keyboard_utils import get_keyboard
 from handlers.admin_edit import cleanup_client_messages
 
-from integrations.gsheets_fleet_matrix import record_payment_new_layout
+from integrations.gsheets_write_queue import payment_journal_queue
 
-from utils.payments_utils import format_payment_schedule, get_payment_id_by_date
+from utils.payments_utils import format_payment_schedule
 from utils.time_utils import get_today
 from utils.cleanup import cleanup_lk_messages
 from utils.schedule_utils import get_next_fridays
-from utils.notify_utils import payment_confirm_registry
+from utils.confirm_registry import payment_confirm_registry
 
 
 from datetime import date, timedelta
@@ -116,7 +122,7 @@ async def personal_account_entry(update: Update, context: ContextTypes.DEFAULT_T
     user = update.effective_user
     tg_id = user.id
 
-    if not check_user(tg_id):
+    if not await check_user_async(tg_id):
         try:
             await message.edit_text(
                 "🔒 Основной функционал личного кабинета пока недоступен.\n"
@@ -132,7 +138,7 @@ async def personal_account_entry(update: Update, context: ContextTypes.DEFAULT_T
             context.user_data["lk_message_ids"].append(msg.message_id)
         return
 
-    user_data = get_user_info(tg_id)
+    user_data = await get_user_info_async(tg_id)
 
     text = (
         f"✅ Добро пожаловать, {user_data['full_name']}!\n"
@@ -181,7 +187,7 @@ async def handle_repairs_callback(update: Update, context: ContextTypes.DEFAULT_
 
 async def handle_status(update: Update, context: ContextTypes.DEFAULT_TYPE):
     tg_id = update.effective_user.id
-    client = get_client_by_tg_id(tg_id)
+    client = await get_client_by_tg_id_async(tg_id)
 
     if not client:
         msg = await update.callback_query.message.reply_text("⚠️ Не удалось найти клиента.")
@@ -189,7 +195,7 @@ async def handle_status(update: Update, context: ContextTypes.DEFAULT_TYPE):
         return
 
     client_id = client["id"]
-    scooters = get_scooters_by_client(client_id)
+    scooters = await get_scooters_by_client_async(client_id)
     username = client['username'] or "-"
 
     text = (
@@ -242,21 +248,21 @@ async def handle_payments(update: Update, context: ContextTypes.DEFAULT_TYPE):
    
     tg_id = update.effective_user.id
 
-    client = get_client_by_tg_id(tg_id)
+    client = await get_client_by_tg_id_async(tg_id)
     if not client:
         msg = await update.callback_query.message.reply_text("❌ Не удалось найти клиента.")
         context.user_data.setdefault("lk_message_ids", []).append(msg.message_id)
         return
 
     client_id = client["id"]
-    scooters = get_scooters_by_client(client_id)
+    scooters = await get_scooters_by_client_async(client_id)
 
     text = "<b>📅 Ваш график платежей:</b>\n"
     keyboard_buttons = []
 
     for idx, scooter in enumerate(scooters, 1):
-        payments = get_payments_by_scooter(scooter["id"])
-        postpones = get_active_postpones(scooter["id"])  # ✅ получаем переносы с нужными полями
+        payments = await get_payments_by_scooter_async(scooter["id"])
+        postpones = await get_active_postpones_async(scooter["id"])  # ✅ получаем переносы с нужными полями
 
         # Оборачиваем их в словари вручную, чтобы передать в format_payment_schedule
         postpones_dicts = [
@@ -291,70 +297,42 @@ async def handle_pay_all_entry(update: Update, context: ContextTypes.DEFAULT_TYP
     await query.answer()
 
     tg_id = query.from_user.id
-    client = get_client_by_tg_id(tg_id)
+    client = await get_client_by_tg_id_async(tg_id)
     if not client:
         await query.message.reply_text("❌ Не удалось найти клиента.")
         return ConversationHandler.END
 
-    scooters = get_scooters_by_client(client["id"])
-    all_unpaid = []
+    scooters = await get_scooters_by_client_async(client["id"])
     today = get_today()
+    # Неоплаченные недели, просрочка и открытый перенос — из сводки по скутерам (scooter_ledger)
+    ledgers = await get_client_ledgers_async(client["id"], today)
+    all_unpaid = []
     active_postpones = []
+    overdue_rows = []
 
     for scooter in scooters:
-        unpaid = get_unpaid_payments_by_scooter(scooter["id"])
-        for row in unpaid:
-            all_unpaid.append((scooter, row))
-            # ищем перенос именно по этой дате платежа
-            postpone_row = get_postpone_for_date(scooter["id"], row[1])
-            if postpone_row:
-                active_postpones.append({
-                    "scooter": scooter,
-                    "payment": row,
-                    "postpone": postpone_row,
-                })
+        ledger = ledgers.get(scooter["id"])
+        if not ledger:
+            continue
+        all_unpaid.extend((scooter, row) for row in ledger["unpaid"])
+        # === 1. Просроченные платежи (перенесённые недели не считаются)
+        overdue_rows.extend((scooter, row) for row in ledger["overdue"])
+
+        # перенос, у которого платёж по новой дате ещё не оплачен
+        postpone = ledger["postpone"]
+        if postpone:
+            for row in ledger["unpaid"]:
+                if row[1] == postpone["scheduled_date"]:
+                    active_postpones.append({
+                        "scooter": scooter,
+                        "payment": row,
+                        "postpone": postpone,
+                    })
 
     if not all_unpaid:
         await query.message.reply_text("✅ У вас нет неоплаченных платежей.")
         return ConversationHandler.END
 
-    # === 1. Просроченные платежи ===
-    original_dates, scheduled_dates = get_postpone_dates_by_tg_id(tg_id)
-
-    overdue_rows = []
-    for scooter, row in all_unpaid:
-        payment_date = row[1]
-
-        # Если платёж перенесён, пропускаем старую дату
-        if payment_date in original_dates:
-            continue  
-
-        # Проверяем просрочку
-        if payment_date < today:
-            overdue_rows.append((scooter, row))
-
-    # Теперь проверяем новые даты переносов (scheduled_dates)
-    for scooter in scooters:
-        for sched_date in scheduled_dates:
-            # получаем неоплаченный платёж по дате переноса
-            unpaid_sched = get_postpone_for_date(scooter["id"], sched_date)
-            if unpaid_sched and sched_date < today:
-                # ищем платеж с этой датой в all_unpaid
-                for sc, row in all_unpaid:
-                    if sc["id"] == scooter["id"] and row[1] == sched_date:
-                        overdue_rows.append((sc, row))
-
-    # Очистка перед циклом для scooter и row                   
-    unique = []
-    seen = set()
-    for scooter, row in overdue_rows:
-        key = (scooter["id"], row[1])
-        if key not in seen:
-            seen.add(key)
-            unique.append((scooter, row))
-
-    overdue_rows = unique
-
     # === Если есть просрочки — отправляем их пользователю
     if overdue_rows:
         total_amount = 0
@@ -382,8 +360,7 @@ async def handle_pay_all_entry(update: Update, context: ContextTypes.DEFAULT_TYP
             f"⚠️ Без выполнения всех трёх шагов платёж <b>не будет засчитан</b>."
         )
 
-        key = str(uuid.uuid4())[:8]
-        payment_confirm_registry[key] = payment_db_ids
+        key = await payment_confirm_registry.put(payment_db_ids)
 
         reply_markup = InlineKeyboardMarkup([
             [InlineKeyboardButton("✅ Я оплатил", callback_data=f"confirm_payment:{key}")],
@@ -406,11 +383,8 @@ async def handle_pay_all_entry(update: Update, context: ContextTypes.DEFAULT_TYP
             amount = scooter["weekly_price"] * 2 + postpone["fine_amount"]
             total_amount += amount
 
-            original_payment_id = payment[0]
-            scheduled_payment_id = get_payment_id_by_date(scooter["id"], postpone["scheduled_date"])
-            payment_db_ids.append(original_payment_id)
-            if scheduled_payment_id:
-                payment_db_ids.append(scheduled_payment_id)
+            # payment — и есть платёж по новой дате переноса
+            payment_db_ids.append(payment[0])
 
             model = scooter["model"]
             orig = postpone["original_date"].strftime('%d.%m')
@@ -434,11 +408,7 @@ async def handle_pay_all_entry(update: Update, context: ContextTypes.DEFAULT_TYP
             f"⚠️ Без выполнения всех трёх шагов платёж <b>не будет засчитан</b>."
         )
 
-        key = str(uuid.uuid4())[:8]
-        payment_confirm_registry[key] = {
-        "payment_ids": payment_db_ids,
-        "postpones": active_postpones  
-}
+        key = await payment_confirm_registry.put(payment_db_ids)
 
         reply_markup = InlineKeyboardMarkup([
             [InlineKeyboardButton("✅ Я оплатил", callback_data=f"confirm_payment:{key}")],
@@ -477,102 +447,68 @@ async def confirm_payment_callback(update: Update, context: ContextTypes.DEFAULT
         return
 
     key = data.split(":", 1)[1].strip()
-    payment_info = payment_confirm_registry.get(key)
+    # ключ забираем сразу: повторное нажатие (и в другом процессе бота) платежи уже не получит
+    payment_ids = await payment_confirm_registry.claim(key)
 
-    if not payment_info:
+    if not payment_ids:
         await query.edit_message_text("❌ Не удалось найти платежи для подтверждения.")
         return
 
-    # Поддерживаем старый и новый форматы payment_confirm_registry
-    if isinstance(payment_info, dict):
-        payment_ids = payment_info.get("payment_ids", [])
-    else:
-        payment_ids = payment_info
-
     # Фильтруем платежи для обычной оплаты (amount > 0)
-    payment_ids_to_mark = []
-    for pid in payment_ids:
-        with get_connection() as conn:
-            with conn.cursor() as cur:
-                cur.execute("SELECT amount FROM payments WHERE id = %s", (pid,))
-                amt = cur.fetchone()[0]
-                if amt > 0:
-                    payment_ids_to_mark.append(pid)
-
-    # ✅ Отмечаем платежи как оплаченные
-    mark_payments_as_paid(payment_ids_to_mark)
+    payments_by_id = {row[0]: row for row in await get_payments_by_ids_async(payment_ids)}
+    payment_ids_to_mark = [
+        pid for pid in payment_ids
+        if pid in payments_by_id and payments_by_id[pid][3] > 0
+    ]
+
+    # ✅ Отмечаем платежи как оплаченные — дальше только те, что действительно сменили статус
+    payment_ids_to_mark = await mark_payments_as_paid_async(payment_ids_to_mark)
 
     # ✅ Обрабатываем все платежи и закрываем переносы, если они есть
     for pid in payment_ids_to_mark:
-        with get_connection() as conn:
-            with conn.cursor() as cur:
-                # 1️⃣ Получаем данные платежа
-                cur.execute("""
-                    SELECT scooter_id, payment_date FROM payments WHERE id = %s
-                """, (pid,))
-                row = cur.fetchone()
-                if not row:
-                    continue
-                scooter_id, payment_date = row
-
-                # 2️⃣ Проверяем, есть ли перенос для этого платежа
-                postpone_row = get_postpone_for_date(scooter_id, payment_date)
-                if postpone_row:
-                    original_date = postpone_row["original_date"]
-                    scheduled_date = postpone_row["scheduled_date"]     
-
-                    # ✅ Закрываем перенос
-                    close_postpone(scooter_id, scheduled_date)
-
-                    # ✅ Закрываем старый платёж (original_date): ставим is_paid=TRUE и amount=0
-                    cur.execute("""
-                        UPDATE payments
-                        SET is_paid = TRUE, paid_at = NOW(), amount = 0
-                        WHERE scooter_id = %s AND payment_date = %s
-                    """, (scooter_id, original_date))
-
-                    print(f"[DEBUG] Закрыт перенос для скутера {scooter_id}. "
-                          f"original_date={original_date}, scheduled_date={scheduled_date}, "
-                          f"rows affected={cur.rowcount}")
-
-            conn.commit()
-
-    # ✅ Удаляем ключ из реестра (завершаем обработку)
-    payment_confirm_registry.pop(key, None)
+        # 1️⃣ Данные платежа
+        _, scooter_id, payment_date, _ = payments_by_id[pid]
+
+        # 2️⃣ Проверяем, есть ли перенос для этого платежа
+        postpone_row = await get_postpone_for_date_async(scooter_id, payment_date)
+        if postpone_row:
+            original_date = postpone_row["original_date"]
+            scheduled_date = postpone_row["scheduled_date"]
+
+            # ✅ Закрываем перенос
+            await close_postpone_async(scooter_id, scheduled_date)
+
+            # ✅ Закрываем старый платёж (original_date): ставим is_paid=TRUE и amount=0
+            rowcount = await close_original_payment_async(scooter_id, original_date)
+
+            print(f"[DEBUG] Закрыт перенос для скутера {scooter_id}. "
+                  f"original_date={original_date}, scheduled_date={scheduled_date}, "
+                  f"rows affected={rowcount}")
+
 # ✅ Проставляем суммы в Google Sheets для оплаченных платежей
+    # перечитываем суммы: у старых дат переноса они только что обнулились
+    paid_rows = {row[0]: row for row in await get_payments_by_ids_async(payment_ids_to_mark)}
     for pid in payment_ids_to_mark:
-        # 1) читаем платёж из БД
-        with get_connection() as conn:
-            with conn.cursor() as cur:
-                cur.execute("""
-                    SELECT scooter_id, payment_date, amount
-                    FROM payments
-                    WHERE id = %s
-                """, (pid,))
-                row = cur.fetchone()
-
+        # 1) платёж из БД
+        row = paid_rows.get(pid)
         if not row:
             continue
 
-        scooter_id, payment_date, amount = row
+        _, scooter_id, payment_date, amount = row
 
         # 2) узнаём левую колонку группы для этого скутера
-        left_col = get_sheet_col_for_scooter(scooter_id)
+        left_col = await get_sheet_col_for_scooter_async(scooter_id)
         if not left_col:
             print(f"[GS] нет sheet_col для scooter_id={scooter_id}")
             continue
 
-    # 3) пишем сумму в соседнюю (правую) колонку напротив даты
-        try:
-            ok, msg = record_payment_new_layout(
-                left_group_col=left_col,
-                amount=int(amount or 0),
-                paid_date=payment_date,   # date или datetime — оба ок
+        # 3) ставим сумму в очередь записи: в таблицу уйдёт пачкой, пользователь не ждёт
+        payment_journal_queue.enqueue(
+            f"payment:{pid}",
+            left_col=left_col,
+            amount=int(amount or 0),
+            paid_date=payment_date,   # date или datetime — оба ок
         )
-            print("[GS]", msg)
-        except Exception as e:
-            # не роняем обработчик подтверждения
-            print("[GS] ошибка записи платежа в шит:", e)
 
     await query.edit_message_text("✅ Оплата успешно подтверждена. Спасибо!")
 
@@ -601,7 +537,7 @@ async def handle_weeks_count_all(update: Update, context: ContextTypes.DEFAULT_T
     scheduled_dates = set()
     original_dates = set()
     for scooter_id in grouped:
-        for postpone in get_active_postpones(scooter_id):
+        for postpone in await get_active_postpones_async(scooter_id):
             if isinstance(postpone, dict):
                 scheduled_dates.add(postpone["scheduled_date"])
                 original_dates.add(postpone["original_date"])
@@ -638,8 +574,7 @@ async def handle_weeks_count_all(update: Update, context: ContextTypes.DEFAULT_T
     payment_db_ids = [row[0] for row in selected]
 
     # Регистрируем оплату с ключом
-    key = str(uuid.uuid4())[:8]
-    payment_confirm_registry[key] = payment_db_ids
+    key = await payment_confirm_registry.put(payment_db_ids)
 
     if overdue_count > 0:
         await update.message.reply_text(
@@ -674,7 +609,7 @@ async def handle_repair_history(update: Update, context: ContextTypes.DEFAULT_TY
     await cleanup_lk_messages(update, context)
 
     tg_id = update.effective_user.id
-    repairs = get_all_done_repairs(tg_id)
+    repairs = await get_all_done_repairs_async(tg_id)
 
     if not repairs:
         keyboard = InlineKeyboardMarkup([
@@ -720,7 +655,7 @@ async def postpone_entry(update: Update, context: ContextTypes.DEFAULT_TYPE):
     await cleanup_client_messages(update, context)
 
     tg_id = update.effective_user.id
-    client = get_client_by_tg_id(tg_id)
+    client = await get_client_by_tg_id_async(tg_id)
     message = update.message or update.callback_query.message
 
     if not client:
@@ -728,7 +663,7 @@ async def postpone_entry(update: Update, context: ContextTypes.DEFAULT_TYPE):
         context.user_data.setdefault("client_message_ids", []).append(msg.message_id)
         return
 
-    scooters = get_scooters_by_client(client["id"])
+    scooters = await get_scooters_by_client_async(client["id"])
     if not scooters:
         msg = await message.reply_text("❗ У вас не найдено ни одного скутера.")
         context.user_data.setdefault("client_message_ids", []).append(msg.message_id)
@@ -736,22 +671,21 @@ async def postpone_entry(update: Update, context: ContextTypes.DEFAULT_TYPE):
 
     keyboard = []
     texts = []
+    # Ближайший платёж и открытый перенос каждого скутера — одним запросом из scooter_ledger
+    ledgers = await get_client_ledgers_async(client["id"])
 
     for scooter in scooters:
-        payments = get_unpaid_payments_by_scooter(scooter["id"])
-        next_payment = payments[0] if payments else None
-
-        if not next_payment:
+        ledger = ledgers.get(scooter["id"])
+        if not ledger or not ledger["unpaid_count"]:
             continue
 
-        original_date = next_payment[1]
-        weekly_price = next_payment[2]
+        original_date = ledger["next_due_date"]
+        weekly_price = ledger["next_due_amount"]
 
         # Проверка, есть ли уже активный перенос
-        active_postpones = get_active_postpones(scooter["id"])
-        if active_postpones:
-            scheduled_date = active_postpones[0][1]
-            fine = active_postpones[0][3]
+        if ledger["postpone"]:
+            scheduled_date = ledger["postpone"]["scheduled_date"]
+            fine = ledger["postpone"]["fine_amount"]
             amount = weekly_price * 2 + fine
             text = (
                 f"⚠️ <b>Вы уже запрашивали перенос</b>\n\n"
@@ -834,10 +768,10 @@ async def confirm_postpone(update: Update, context: ContextTypes.DEFAULT_TYPE):
     with_fine = fine_amount > 0
 
     tg_id = query.from_user.id
-    client = get_client_by_tg_id(tg_id)
-    scooter = get_scooter_by_id(scooter_id)
+    client = await get_client_by_tg_id_async(tg_id)
+    scooter = await get_scooter_by_id_async(scooter_id)
 
-    unpaid = get_unpaid_payments_by_scooter(scooter_id)
+    unpaid = await get_unpaid_payments_by_scooter_async(scooter_id)
     today = date.today()
 
     if not unpaid:
@@ -854,7 +788,7 @@ async def confirm_postpone(update: Update, context: ContextTypes.DEFAULT_TYPE):
         context.user_data.setdefault("client_message_ids", []).append(msg.message_id)
         return
 
-    if has_active_postpone(scooter_id):
+    if await has_active_postpone_async(scooter_id):
         keyboard = InlineKeyboardMarkup([
             [InlineKeyboardButton("⬅️ Назад", callback_data="back_to_menu")]
         ])
@@ -867,7 +801,7 @@ async def confirm_postpone(update: Update, context: ContextTypes.DEFAULT_TYPE):
         return
 
     # Сохраняем запрос на перенос
-    save_postpone_request(
+    await save_postpone_request_async(
         tg_id=tg_id,
         scooter_id=scooter_id,
         original_date=original_date,
@@ -881,10 +815,10 @@ async def confirm_postpone(update: Update, context: ContextTypes.DEFAULT_TYPE):
 
     # Обновляем сумму по новой дате, если платёж уже есть
     try:
-        update_payment_amount(scooter_id, scheduled_date, new_amount)
+        await update_payment_amount_async(scooter_id, scheduled_date, new_amount)
     except:
         # Если платежа нет — создаём
-        save_payment_schedule_by_scooter(scooter_id, [scheduled_date], new_amount)
+        await save_payment_schedule_by_scooter_async(scooter_id, [scheduled_date], new_amount)
 
     # Логгирование и уведомление
    # log_payment_postpone(
@@ -1,10 +1,10 @@
 from telegram import Update
 from telegram.ext import ContextTypes, ConversationHandler
-from utils.validators import BAD_WORDS, compiled_bad_patterns
+from utils.validators import find_profanity
 
 
 # Ключевые безопасные фразы из кнопок
-SAFE_PHRASES = [
+SAFE_PHRASES = frozenset([
     "хочу электровелосипед",
     "необходим ремонт",
     "личный кабинет",
@@ -14,7 +14,7 @@ SAFE_PHRASES = [
     "💳 платежи",
     "📷 загрузить оплату",
     "📅 перенести платёж"
-]
+])
 
 async def profanity_guard(update: Update, context: ContextTypes.DEFAULT_TYPE):
     if not update.message or not update.message.text:
@@ -25,11 +25,12 @@ async def profanity_guard(update: Update, context: ContextTypes.DEFAULT_TYPE):
     if text in SAFE_PHRASES:
         return None  # кнопку пропускаем
 
-    if any(bad in text for bad in BAD_WORDS):
+    found = find_profanity(text)
+    if found == "word":
         await update.message.reply_text("⛔ Без нецензурной лексики, пожалуйста.")
         return ConversationHandler.END
 
-    if any(pattern.search(text) for pattern in compiled_bad_patterns):
+    if found == "pattern":
         await update.message.reply_text("⛔ Просьба не использовать ненормативную лексику.")
         return ConversationHandler.END
 
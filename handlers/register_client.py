@@ -3,8 +3,7 @@ from telegram.ext import ContextTypes, ConversationHandler, MessageHandler, filt
 
 from services.notifier import notify_admin_about_new_client
 from handlers.cancel_handler import universal_cancel_handler
-from database.db import get_connection
-from database.pending import save_pending_user
+from database.pending import save_pending_user_async, has_pending_user_async
 from utils.validators import is_valid_name
 from handlers.keyboard_utils import get_keyboard
 
@@ -110,12 +109,6 @@ async def show_products(update: Update, context: ContextTypes.DEFAULT_TYPE):
         "👇 Выбери, что тебе нужно:", reply_markup=get_keyboard())
         return ConversationHandler.END
 
-async def already_pending(tg_id: int) -> bool:
-    with get_connection() as conn:
-        with conn.cursor() as cur:
-            cur.execute("SELECT 1 FROM pending_users WHERE tg_id = %s AND is_processed = FALSE", (tg_id,))
-            return cur.fetchone() is not None
-
 async def confirm_order(update: Update, context: ContextTypes.DEFAULT_TYPE):
     query = update.callback_query
     await query.answer()
@@ -123,7 +116,7 @@ async def confirm_order(update: Update, context: ContextTypes.DEFAULT_TYPE):
     await cleanup_previous_messages(update, context)
 
     tg_id = query.from_user.id
-    if await already_pending(tg_id):
+    if await has_pending_user_async(tg_id):
         msg = await query.message.reply_text(
             "⚠️ Ваша заявка уже находится на рассмотрении.\nПожалуйста, дождитесь ответа администратора.",
             reply_markup=get_keyboard()
@@ -212,7 +205,7 @@ async def finish(update: Update, context: ContextTypes.DEFAULT_TYPE):
     context.user_data["tg_id"] = tg_user.id
 
     data = context.user_data
-    save_pending_user(data)
+    await save_pending_user_async(data)
 
     try:
         await notify_admin_about_new_client(data)
@@ -1,7 +1,8 @@
 from telegram import Update, InlineKeyboardMarkup, InlineKeyboardButton, Bot
 from telegram.ext import ContextTypes
-from database.repairs import get_repair_by_id, add_done_repair
-from database.admins import get_all_admins
+from database.repairs import get_repair_by_id_async, add_done_repair_async
+from database.admins import get_all_admins_async
+from services.broadcast import broadcast
 
 import os
 NOTIFIER_BOT = Bot(token=os.getenv("NOTIFIER_TOKEN"))
@@ -27,22 +28,19 @@ async def finish_repair_and_notify_admin(update: Update, context: ContextTypes.D
     await query.answer()
 
     repair_id = int(query.data.split(":")[1])
-    admin_ids = [a["tg_id"] for a in get_all_admins()]
+    admin_ids = [a["tg_id"] for a in await get_all_admins_async()]
 
-    for admin_id in admin_ids:
-
-        await NOTIFIER_BOT.send_message(
-            chat_id=admin_id,
-            text=f"✅ Мастер подтвердил завершение ремонта по заявке #{repair_id}. Проверьте оплату и закройте кейс.",
-            parse_mode="HTML"
-        )
+    text = f"✅ Мастер подтвердил завершение ремонта по заявке #{repair_id}. Проверьте оплату и закройте кейс."
+    await broadcast(NOTIFIER_BOT, [
+        {"chat_id": admin_id, "text": text, "parse_mode": "HTML"} for admin_id in admin_ids
+    ], label="admins:repair_done")
 
     await query.message.reply_text("✅ Спасибо! Ремонт отмечен как завершённый.")
 
 
-    repair = get_repair_by_id(repair_id)
+    repair = await get_repair_by_id_async(repair_id)
     if repair:
-        add_done_repair(repair)
+        await add_done_repair_async(repair)
 
 
 
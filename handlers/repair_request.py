@@ -6,14 +6,14 @@ from services.notifier import notify_admin_about_new_repair as send_repair_reque
 from handlers.cancel_handler import universal_cancel_handler
 from handlers.register_client import cleanup_previous_messages
 
-from database.repairs import save_pending_repair
-from database.clients import get_client_by_tg_id
-from database.scooters import get_scooters_by_client
+from database.repairs import save_pending_repair_async, has_pending_repair_async
+from database.clients import get_client_by_tg_id_async
+from database.scooters import get_scooters_by_client_async
 
 from utils.validators import is_valid_name
 
 
-from database.db import get_connection
+from database.users import user_has_scooter_async
 
 
 ASK_NAME, ASK_CITY, ASK_PHONE, ASK_VIN, ASK_PROBLEM, ASK_PHOTO = range(6)
@@ -40,16 +40,6 @@ async def cleanup_repair_messages(update: Update, context: ContextTypes.DEFAULT_
 
 
 
-def already_pending_repair(tg_id: int) -> bool:
-
-    with get_connection() as conn:
-        with conn.cursor() as cur:
-            cur.execute("""
-                SELECT 1 FROM pending_repairs
-                WHERE tg_id = %s AND is_processed = FALSE
-            """, (tg_id,))
-            return cur.fetchone() is not None
-
 
 
 async def repair_entry(update: Update, context: ContextTypes.DEFAULT_TYPE):
@@ -63,12 +53,7 @@ async def repair_entry(update: Update, context: ContextTypes.DEFAULT_TYPE):
     await cleanup_repair_messages(update, context)
 
     
-    with get_connection() as conn:
-        with conn.cursor() as cur:
-            cur.execute("SELECT has_scooter FROM users WHERE tg_id = %s", (tg_id,))
-            result = cur.fetchone()
-
-    if result and result[0]:
+    if await user_has_scooter_async(tg_id):
         text = f"Привет, @{username}! У тебя что-то сломалось?"
         keyboard = [
             [InlineKeyboardButton("📝 Заполнить анкету", callback_data="short_repair")],
@@ -91,7 +76,7 @@ async def start_full_repair(update: Update, context: ContextTypes.DEFAULT_TYPE):
     await update.callback_query.answer()
     tg_id = update.effective_user.id
 
-    if already_pending_repair(tg_id):
+    if await has_pending_repair_async(tg_id):
         keyboard = InlineKeyboardMarkup([
         [InlineKeyboardButton("⬅️ Назад", callback_data="admin_to_main")]
     ])
@@ -171,7 +156,7 @@ async def finish(update: Update, context: ContextTypes.DEFAULT_TYPE):
     context.user_data["username"] = f"@{user.username}" if user.username else "не указан"
     context.user_data["tg_id"] = user.id
 
-    save_pending_repair(context.user_data)
+    await save_pending_repair_async(context.user_data)
     keyboard = InlineKeyboardMarkup([
         [InlineKeyboardButton("⬅️ Назад", callback_data="admin_to_main")]
     ])
@@ -210,7 +195,7 @@ async def start_short_repair(update, context):
     await update.callback_query.answer()
     tg_id = update.effective_user.id
 
-    if already_pending_repair(tg_id):
+    if await has_pending_repair_async(tg_id):
         keyboard = InlineKeyboardMarkup([
         [InlineKeyboardButton("⬅️ Назад", callback_data="admin_to_main")]
     ])
@@ -247,8 +232,8 @@ async def receive_short_photo(update: Update, context: ContextTypes.DEFAULT_TYPE
     context.user_data["problem"] = context.user_data["repair_description"]
 
     # Пробуем получить клиента из базы
-    client = get_client_by_tg_id(tg_id)
-    scooters = get_scooters_by_client(client["id"])
+    client = await get_client_by_tg_id_async(tg_id)
+    scooters = await get_scooters_by_client_async(client["id"])
 
     vin = scooters[0]["vin"] if scooters else "-"   
 
@@ -267,7 +252,7 @@ async def receive_short_photo(update: Update, context: ContextTypes.DEFAULT_TYPE
         context.user_data.setdefault("username", username)
 
     # Сохраняем заявку и уведомляем админа
-    save_pending_repair(context.user_data)
+    await save_pending_repair_async(context.user_data)
     await send_repair_request(context.user_data)
     keyboard = InlineKeyboardMarkup([
         [InlineKeyboardButton("⬅️ Назад", callback_data="admin_to_main")]
@@ -1,7 +1,7 @@
 from telegram import Update
 from telegram.ext import CommandHandler, ContextTypes, ConversationHandler
 from handlers.keyboard_utils import get_keyboard 
-from database.tg_users import save_basic_user, user_exists
+from database.tg_users import save_basic_user_async, user_exists_async
 
 
 async def start(update: Update, context: ContextTypes.DEFAULT_TYPE):
@@ -14,8 +14,8 @@ async def start(update: Update, context: ContextTypes.DEFAULT_TYPE):
     print(f"[START] tg_id: {tg_id}, username: {username}")
 
     # ✅ проверяем, есть ли уже этот tg_id в базе
-    if not user_exists(tg_id):
-        save_basic_user(tg_id, username)
+    if not await user_exists_async(tg_id):
+        await save_basic_user_async(tg_id, username)
         print("[START] Пользователь сохранен в базу")
     else:
         print("[START] Пользователь уже существует, сохранение не требуется")
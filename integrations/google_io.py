@@ -0,0 +1,144 @@
+# integrations/google_io.py
+import asyncio
+import functools
+import os
+import threading
+import time
+from concurrent.futures import ThreadPoolExecutor
+from typing import Callable
+
+from dotenv import load_dotenv
+
+from integrations.retry import google_breaker, retry_async
+
+
+load_dotenv()
+
+# Потоков под блокирующие клиенты Sheets/Drive
+GOOGLE_IO_WORKERS = int(os.getenv("GOOGLE_IO_WORKERS", 4))
+# Сколько вызовов может одновременно стоять в очереди + выполняться; дальше — ждём место
+GOOGLE_IO_MAX_PENDING = int(os.getenv("GOOGLE_IO_MAX_PENDING", 32))
+# Сколько ждать место в очереди, прежде чем отказать (сек)
+GOOGLE_IO_QUEUE_TIMEOUT = float(os.getenv("GOOGLE_IO_QUEUE_TIMEOUT", 10))
+# Общий бюджет времени на один вызов Google из хендлера (сек)
+GOOGLE_CALL_DEADLINE = float(os.getenv("GOOGLE_CALL_DEADLINE", 60))
+
+
+class GoogleIOBusyError(RuntimeError):
+    """Очередь вызовов Google переполнена — отказываем, а не копим задачи бесконечно."""
+
+
+_executor = None
+_slots = None
+_stats = {
+    "submitted": 0,
+    "completed": 0,
+    "failed": 0,
+    "timeouts": 0,
+    "rejected": 0,
+    "busy_time_total": 0.0,
+    "wait_time_total": 0.0,
+}
+_running = 0
+_running_lock = threading.Lock()
+
+
+def _get_executor() -> ThreadPoolExecutor:
+    global _executor
+    if _executor is None:
+        _executor = ThreadPoolExecutor(max_workers=GOOGLE_IO_WORKERS, thread_name_prefix="google-io")
+    return _executor
+
+
+def _get_slots() -> asyncio.Semaphore:
+    global _slots
+    if _slots is None:
+        _slots = asyncio.Semaphore(GOOGLE_IO_MAX_PENDING)
+    return _slots
+
+
+def _timed(fn, *args, **kwargs):
+    global _running
+    with _running_lock:
+        _running += 1
+    started = time.monotonic()
+    try:
+        return fn(*args, **kwargs)
+    finally:
+        with _running_lock:
+            _running -= 1
+            _stats["busy_time_total"] += time.monotonic() - started
+
+
+async def _submit(fn: Callable, *args, **kwargs):
+    slots = _get_slots()
+    waited = time.monotonic()
+    try:
+        await asyncio.wait_for(slots.acquire(), timeout=GOOGLE_IO_QUEUE_TIMEOUT)
+    except asyncio.TimeoutError:
+        _stats["rejected"] += 1
+        raise GoogleIOBusyError(
+            f"Очередь Google I/O занята ({GOOGLE_IO_MAX_PENDING} вызовов), повторите позже"
+        )
+    _stats["wait_time_total"] += time.monotonic() - waited
+
+    _stats["submitted"] += 1
+    loop = asyncio.get_running_loop()
+    future = loop.run_in_executor(_get_executor(), functools.partial(_timed, fn, *args, **kwargs))
+    # слот освобождается, когда поток реально закончил (даже если вызывающий уже ушёл по таймауту)
+    future.add_done_callback(lambda _: slots.release())
+    try:
+        # shield: по таймауту перестаём ждать, но сам вызов в потоке доработает и освободит слот
+        result = await asyncio.shield(future)
+    except Exception:
+        _stats["failed"] += 1
+        raise
+    _stats["completed"] += 1
+    return result
+
+
+async def run_google(fn: Callable, *args, tries: int = 1, deadline: float = GOOGLE_CALL_DEADLINE, **kwargs):
+    """
+    Выполняет блокирующую функцию Sheets/Drive в отдельном пуле потоков Google I/O
+    и ждёт её без блокировки event loop.
+    Ретраи отдельных запросов к API делает сама функция (_retry внутри gsheets_fleet_matrix),
+    поэтому tries > 1 имеет смысл только для функций без своих ретраев.
+    Если предохранитель Google разомкнут — сразу CircuitOpenError, без похода в сеть;
+    если очередь переполнена дольше GOOGLE_IO_QUEUE_TIMEOUT — GoogleIOBusyError.
+    """
+    google_breaker.check()
+    try:
+        return await retry_async(
+            lambda: _submit(fn, *args, **kwargs),
+            tries=tries,
+            deadline=deadline,
+            breaker=None,       # ошибки считает внутренний _retry, чтобы не учитывать их дважды
+            what=getattr(fn, "__name__", "google"),
+        )
+    except asyncio.TimeoutError:
+        _stats["timeouts"] += 1
+        raise
+
+
+def get_google_io_stats() -> dict:
+    """Метрики пула Google I/O: очередь, выполняемые вызовы, отказы, средние времена."""
+    stats = dict(_stats)
+    pending = GOOGLE_IO_MAX_PENDING - _slots._value if _slots is not None else 0
+    stats.update({
+        "workers": GOOGLE_IO_WORKERS,
+        "running": _running,
+        "queued": max(0, pending - _running),
+        "max_pending": GOOGLE_IO_MAX_PENDING,
+        "breaker": google_breaker.state,
+    })
+    done = stats["completed"] + stats["failed"]
+    stats["avg_busy_ms"] = round(stats["busy_time_total"] / done * 1000, 1) if done else 0.0
+    stats["avg_wait_ms"] = round(stats["wait_time_total"] / stats["submitted"] * 1000, 1) if stats["submitted"] else 0.0
+    return stats
+
+
+def shutdown_google_io():
+    global _executor
+    if _executor is not None:
+        _executor.shutdown(wait=False)
+        _executor = None
@@ -5,7 +5,6 @@ from typing import Dict, Any, Optional, Tuple, List
 
 import gspread
 from google.oauth2.service_account import Credentials
-from google.auth.exceptions import TransportError
 from googleapiclient.errors import HttpError
 from google.oauth2.credentials import Credentials as UserCredentials
 
@@ -13,7 +12,10 @@ from gspread.exceptions import APIError
 
 
 import time
-import requests
+import threading
+
+from integrations.retry import retry_sync
+from integrations.http_clients import make_pooled, http_timeout, HTTP_READ_TIMEOUT
 
 from pathlib import Path
 from dotenv import load_dotenv
@@ -21,18 +23,10 @@ from dotenv import load_dotenv
 
 def _retry(fn, tries: int = 4, base_delay: float = 0.8, what: str = ""):
     """
-    Выполняет fn() с ретраями и экспоненциальной паузой.
-    Перехватывает типичные сетевые ошибки Google/Requests.
+    Выполняет fn() с ретраями, экспоненциальной паузой с джиттером и общим предохранителем Google.
+    Паузы блокирующие — все функции модуля вызываются из рабочих потоков (см. integrations/google_io.py).
     """
-    for attempt in range(1, tries + 1):
-        try:
-            return fn()
-        except (requests.exceptions.RequestException, TransportError, HttpError, APIError) as e:
-            if attempt == tries:
-                raise
-            # опционально лог:
-            # print(f"[retry:{what}] attempt {attempt}/{tries} failed: {e}")
-            time.sleep(base_delay * (2 ** (attempt - 1)))
+    return retry_sync(fn, tries=tries, base_delay=base_delay, what=what)
 
 
 def _ensure_env_loaded():
@@ -92,24 +86,65 @@ def _google_credentials():
         raise RuntimeError("No Google SA credentials provided")
     return Credentials.from_service_account_info(json.loads(content), scopes=SCOPES)
 
+# Кэш клиента gspread и листов на весь процесс.
+# gspread ходит через AuthorizedSession: токен обновляется сам, HTTP-сессия переиспользуется,
+# поэтому авторизация и open_by_key делаются один раз, а не на каждую запись.
+_client_lock = threading.Lock()
+_client = None
+_ws_cache: Dict[str, Tuple[Any, float]] = {}    # sheet_id -> (worksheet, когда открыт)
+WS_CACHE_TTL = 3600                             # раз в час перечитываем метаданные таблицы
+_local = threading.local()                      # сервисы googleapiclient — свои на поток
+
 def _auth():
-    _ensure_env_loaded()
-    sa_path = os.getenv("GOOGLE_SA_JSON")
-    if sa_path and os.path.exists(sa_path):
-        creds = _google_credentials()
-    else:
-        content = os.getenv("GOOGLE_SA_JSON_CONTENT")
-        if not content:
-            raise RuntimeError("No Google SA credentials provided")
-        creds = Credentials.from_service_account_info(json.loads(content), scopes=SCOPES)
-    return gspread.authorize(creds)
+    global _client
+    if _client is not None:
+        return _client
+    with _client_lock:
+        if _client is None:
+            from google.auth.transport.requests import AuthorizedSession
+            creds = _google_credentials()
+            # keep-alive пул на все потоки Google I/O вместо нового соединения на каждый запрос
+            session = make_pooled(AuthorizedSession(creds), "google")
+            _client = gspread.Client(auth=creds, session=session)
+            _client.set_timeout(http_timeout("google"))
+        return _client
+
+
+def _authorized_http(creds):
+    """httplib2 с таймаутом для googleapiclient (по умолчанию запрос может висеть бесконечно)."""
+    import httplib2
+    from google_auth_httplib2 import AuthorizedHttp
+    return AuthorizedHttp(creds, http=httplib2.Http(timeout=HTTP_READ_TIMEOUT))
+
+def reset_sheets_client():
+    """Сбросить кэш (например, после смены ключа сервис-аккаунта)."""
+    global _client
+    with _client_lock:
+        _client = None
+        _ws_cache.clear()
+    _local.__dict__.clear()
+
+def _open_ws(sid: str):
+    try:
+        return _auth().open_by_key(sid).sheet1
+    except APIError as e:
+        # протухшие/отозванные креды — пробуем один раз с новым клиентом
+        if getattr(e, "code", None) in (401, 403):
+            reset_sheets_client()
+            return _auth().open_by_key(sid).sheet1
+        raise
 
 def _ws(sheet_id: Optional[str] = None):
     _ensure_env_loaded()
     sid = sheet_id or os.getenv("GOOGLE_SHEET_RENT_ID")
     if not sid:
         raise RuntimeError("GOOGLE_SHEET_RENT_ID not set")
-    return _retry(lambda: _auth().open_by_key(sid).sheet1, what="open sheet1")
+    cached = _ws_cache.get(sid)
+    if cached and time.monotonic() - cached[1] < WS_CACHE_TTL:
+        return cached[0]
+    ws = _retry(lambda: _open_ws(sid), what="open sheet1")
+    _ws_cache[sid] = (ws, time.monotonic())
+    return ws
 
 def _col_letter(n: int) -> str:
     s = ""
@@ -160,7 +195,7 @@ def upsert_by_column_index(
 
     # текущие значения (чтобы не затирать незаполненные поля)
     current = {}
-    rng = ws.get(f"{col_letter}{start}:{col_letter}{end}")
+    rng = _retry(lambda: ws.get(f"{col_letter}{start}:{col_letter}{end}"), what="read column")
     for label, i in ROW_MAP.items():
         idx = i - start
         current[label] = (rng[idx][0] if idx < len(rng) and rng[idx] else "")
@@ -194,7 +229,10 @@ def upsert_by_column_index(
     }
 
     ordered = [[values[key]] for key in ROW_MAP.keys()]
-    ws.update(f"{col_letter}{start}:{col_letter}{end}", ordered, value_input_option="RAW")
+    _retry(lambda: ws.update(f"{col_letter}{start}:{col_letter}{end}", ordered, value_input_option="RAW"),
+           what="write column")
+    if set_transport_number is not None:
+        _sheet_index(ws).drop_header()
 
 # ===== НИЖНИЙ «ЖУРНАЛ ОПЛАТ» =====
 
@@ -212,27 +250,132 @@ def _parse_date(s: str) -> Optional[datetime]:
     except Exception:
         return None
 
+# ===== ИНДЕКС РАСКЛАДКИ ЛИСТА =====
+# Номер транспорта -> колонка и дата -> строка держим в памяти, чтобы не качать
+# строку 2 и столбцы дат заново на каждый платёж. Индекс живёт INDEX_TTL секунд
+# (лист правят и руками), при промахе перечитывается один раз.
+INDEX_TTL = 600
+
+def _transport_key(v) -> str:
+    s = str(v or "").strip()
+    m = re.fullmatch(r"[Hh]?(\d+)", s)
+    return m.group(1) if m else s.lower()
+
+
+class _SheetIndex:
+    def __init__(self, ws):
+        self.ws = ws
+        self.built_at = time.monotonic()
+        self.lock = threading.RLock()
+        self.header: Optional[List[str]] = None        # строка 'Номер транс.'
+        self.transport: Dict[str, int] = {}            # _transport_key -> колонка (1-based)
+        self.dates: Dict[Tuple[int, int], Dict[int, Dict[str, int]]] = {}   # (start, end) -> {колонка: {дата: строка}}
+
+    def expired(self) -> bool:
+        return time.monotonic() - self.built_at > INDEX_TTL
+
+    # --- строка 'Номер транс.' ---
+    def refresh_header(self) -> List[str]:
+        vals = _retry(lambda: self.ws.row_values(NEW_ROW_MAP["Номер транс."]), what="index header")
+        with self.lock:
+            self._set_header(vals)
+        return self.header
+
+    def _set_header(self, vals):
+        self.header = [str(v) for v in vals]
+        self.transport = {}
+        for idx, val in enumerate(self.header, start=1):
+            key = _transport_key(val)
+            if key and key not in self.transport:
+                self.transport[key] = idx
+
+    def drop_header(self):
+        with self.lock:
+            self.header = None
+            self.transport = {}
+
+    def get_header(self) -> List[str]:
+        if self.header is None:
+            return self.refresh_header()
+        return self.header
+
+    def find_transport(self, label: str) -> Optional[int]:
+        self.get_header()
+        key = _transport_key(label)
+        num_only = re.sub(r"\D+", "", str(label))
+        return self.transport.get(key) or (self.transport.get(num_only) if num_only else None)
+
+    # --- столбцы дат ---
+    def refresh_dates(self, start: int, end: int) -> Dict[int, Dict[str, int]]:
+        rows = _retry(lambda: self.ws.get(f"{start}:{end}"), what="index dates")
+        block: Dict[int, Dict[str, int]] = {}
+        for r_off, row in enumerate(rows):
+            for c_off, val in enumerate(row):
+                val = str(val).strip()
+                if val and _parse_date(val):
+                    block.setdefault(c_off + 1, {}).setdefault(val, start + r_off)
+        with self.lock:
+            self.dates[(start, end)] = block
+        return block
+
+    def date_block(self, start: int, end: int) -> Dict[int, Dict[str, int]]:
+        block = self.dates.get((start, end))
+        if block is None:
+            block = self.refresh_dates(start, end)
+        return block
+
+    def find_date_row(self, col: int, target: str, start: int, end: int) -> Optional[int]:
+        row = self.date_block(start, end).get(col, {}).get(target)
+        if row is None:
+            # могли дописать руками — перечитываем один раз
+            row = self.refresh_dates(start, end).get(col, {}).get(target)
+        return row
+
+    # --- инкрементальное обновление после create_client_column_auto ---
+    def add_column(self, col: int, transport_number: str, dates: List[str], start: int, end: int):
+        with self.lock:
+            if self.header is not None:
+                header = list(self.header)
+                if len(header) < col:
+                    header += [""] * (col - len(header))
+                header[col - 1] = str(transport_number)
+                self._set_header(header)
+            block = self.dates.get((start, end))
+            if block is not None:
+                block[col] = {d: start + i for i, d in enumerate(dates)}
+
+
+_index_lock = threading.Lock()
+_indexes: Dict[str, _SheetIndex] = {}     # spreadsheet id -> индекс
+
+def _sheet_index(ws) -> _SheetIndex:
+    key = ws.spreadsheet.id
+    with _index_lock:
+        idx = _indexes.get(key)
+        if idx is None or idx.expired() or idx.ws is not ws:
+            idx = _indexes[key] = _SheetIndex(ws)
+        return idx
+
+def invalidate_sheet_index(sheet_id: Optional[str] = None):
+    """Сбросить индекс раскладки (например, после ручной перестройки листа)."""
+    with _index_lock:
+        if sheet_id:
+            _indexes.pop(sheet_id, None)
+        else:
+            _indexes.clear()
+
+
 def _find_date_column_near(ws, base_col: int, max_offset: int = 8) -> Optional[int]:
     # ищем столбец, где много валидных дат
+    block = _sheet_index(ws).date_block(DATE_ROWS_START, DATE_ROWS_END)
     for col in range(base_col, base_col + max_offset + 1):
-        col_letter = _col_letter(col)
-        rng = ws.get(f"{col_letter}{DATE_ROWS_START}:{col_letter}{DATE_ROWS_END}")
-        cnt = 0
-        for row in rng:
-            if row and _parse_date(row[0]):
-                cnt += 1
-        if cnt >= 5:
+        if len(block.get(col, {})) >= 5:
             return col
     return None
 
 def _find_row_by_date(ws, date_col: int, paid_dt: datetime) -> Optional[int]:
     target = paid_dt.strftime("%d.%m.%Y")
-    col_letter = _col_letter(date_col)
-    rng = ws.get(f"{col_letter}{DATE_ROWS_START}:{col_letter}{DATE_ROWS_END}")
-    for idx, row in enumerate(rng):
-        if (row and row[0].strip()) == target:
-            return DATE_ROWS_START + idx
-    return None
+    return _sheet_index(ws).find_date_row(date_col, target, DATE_ROWS_START, DATE_ROWS_END)
 
 def find_column_by_transport_number(transport_label: str, sheet_id: Optional[str] = None) -> Optional[int]:
     """
@@ -245,19 +388,13 @@ def find_column_by_transport_number(transport_label: str, sheet_id: Optional[str
     if not target_raw:
         return None
 
-    # разрешаем формы: '35', 'H35', 'h35'
-    num_only = re.sub(r"\D+", "", target_raw)
-    candidates = {target_raw, target_raw.upper(), target_raw.lower()}
-    if num_only:
-        candidates.update({num_only, f"H{num_only}", f"h{num_only}"})
-
-    row_idx = ROW_MAP["Номер транс."]
-    row_vals = ws.row_values(row_idx)
-
-    for idx, val in enumerate(row_vals, start=1):
-        if str(val).strip() in candidates:
-            return idx
-    return None
+    idx = _sheet_index(ws)
+    col = idx.find_transport(target_raw)
+    if col is None:
+        # колонку могли добавить руками — перечитываем строку один раз
+        idx.refresh_header()
+        col = idx.find_transport(target_raw)
+    return col
 
 def record_payment(
     base_col_index: int,
@@ -286,9 +423,9 @@ def record_payment(
         return False, "Левая колонка для суммы недоступна"
 
     cell = f"{_col_letter(amount_col)}{row_idx}"
-    current_val = ws.acell(cell).value
+    current_val = _retry(lambda: ws.acell(cell).value, what="read amount")
     new_val = _to_number(current_val) + int(amount)
-    ws.update_acell(cell, str(new_val))
+    _retry(lambda: ws.update_acell(cell, str(new_val)), what="write amount")
 
     if also_increment_deposit:
         upsert_by_column_index(
@@ -321,8 +458,8 @@ NEW_COST_BLOCK_TOP  = 105
 
 def _ws_and_next_empty_col(sheet_id: Optional[str] = None):
     ws = _ws(sheet_id)
-    # ищем по строке "Номер транс." (строка 2)
-    row_vals = ws.row_values(NEW_ROW_MAP["Номер транс."])
+    # ищем по строке "Номер транс." (строка 2); перед созданием колонки — всегда свежая
+    row_vals = _sheet_index(ws).refresh_header()
     last = len(row_vals)
     # начинаем новую ПАРУ так, чтобы слева был ДАТНЫЙ столбец
     base_col = 1 if last == 0 else (last + 2 if last % 2 == 1 else last + 1)
@@ -331,7 +468,8 @@ def _ws_and_next_empty_col(sheet_id: Optional[str] = None):
 def _ws_and_next_empty_pair(sheet_id: Optional[str] = None):
     ws = _ws(sheet_id)
     # ориентируемся по строке "Номер транс." — она заполняется только в ЛЕВОМ столбце пары
-    vals = ws.row_values(NEW_ROW_MAP["Номер транс."])
+    # (перед созданием колонки перечитываем её, чтобы не наехать на добавленное руками)
+    vals = _sheet_index(ws).refresh_header()
     last_main_col = len(vals)  # индекс последнего заполненного основного столбца
     # размещаем новую пару через ОДИН пустой столбец: [main][sums][SPACER] -> следующий main
     left_col = 1 if last_main_col == 0 else last_main_col + 3
@@ -341,7 +479,7 @@ def _ws_and_next_empty_pair(sheet_id: Optional[str] = None):
 
 def _next_transport_number(ws) -> int:
     import re
-    vals = ws.row_values(NEW_ROW_MAP["Номер транс."])
+    vals = _sheet_index(ws).get_header()
     nums = []
     for v in vals:
         s = re.sub(r"\D+", "", str(v))
@@ -413,7 +551,8 @@ def _apply_new_design(ws, left_col: int):
             "fields": "userEnteredFormat(backgroundColor)"
         }
     })
-    svc.spreadsheets().batchUpdate(spreadsheetId=ws.spreadsheet.id, body={"requests": reqs}).execute()
+    _retry(lambda: svc.spreadsheets().batchUpdate(spreadsheetId=ws.spreadsheet.id, body={"requests": reqs}).execute(),
+           what="apply design")
 
 
 def create_client_column_auto(
@@ -469,6 +608,8 @@ def create_client_column_auto(
            what="inflow formula")
 
     _apply_new_design(ws, left_col)   # оформляем левый датный столбец
+    _sheet_index(ws).add_column(left_col, number_to_set, [r[0] for r in rows],
+                                NEW_DATE_ROWS_START, NEW_DATE_ROWS_END)
     return left_col, mainL            # возвращаем индекс ОСНОВНОГО столбца
 
 
@@ -477,10 +618,8 @@ def record_payment_new_layout(left_group_col: int, amount: int, paid_date: datet
     main_col = left_group_col                 # даты здесь
     sums_col = left_group_col + 1             # суммы здесь
 
-    rng = _retry(lambda: ws.get(f"{_col(main_col)}{NEW_DATE_ROWS_START}:{_col(main_col)}{NEW_DATE_ROWS_END}"),
-                 what="get dates range")
     target = paid_date.strftime("%d.%m.%Y")
-    row_idx = next((i for i, row in enumerate(rng, start=NEW_DATE_ROWS_START) if row and row[0].strip()==target), None)
+    row_idx = _sheet_index(ws).find_date_row(main_col, target, NEW_DATE_ROWS_START, NEW_DATE_ROWS_END)
     if not row_idx:
         return False, f"Дата {target} не найдена (12..63)."
 
@@ -489,9 +628,95 @@ def record_payment_new_layout(left_group_col: int, amount: int, paid_date: datet
     _retry(lambda: ws.update_acell(cell_amount, str(cur + int(amount))), what="write amount")
     return True, f"Оплата {amount} ₽ записана в {cell_amount}."
 
+
+class JournalWriteUncertain(RuntimeError):
+    """
+    values.batchUpdate упал (таймаут, обрыв) — неизвестно, записались ли суммы.
+    expected: {(sums_col, row): значение, которое должно оказаться в ячейке, если запись прошла} —
+    передаётся в повторный record_payments_batch_new_layout, чтобы не прибавить сумму дважды.
+    """
+
+    def __init__(self, expected: dict, cause: Exception):
+        super().__init__(f"запись журнала не подтверждена: {cause}")
+        self.expected = expected
+
+
+def record_payments_batch_new_layout(items: List[Tuple[int, int, Any]], *, sheet_id: Optional[str] = None,
+                                     expected: Optional[dict] = None) -> List[Tuple[bool, str]]:
+    """
+    Пакетная версия record_payment_new_layout: items = [(left_group_col, amount, paid_date), ...].
+    Строки дат берутся из индекса листа; один values.batchGet текущих сумм и один values.batchUpdate.
+    Суммы в одну и ту же ячейку складываются. Возвращает (ok, msg) для каждого item.
+    expected — из JournalWriteUncertain прошлой попытки тех же items: ячейки, где уже стоит ожидаемое
+    значение, считаются записанными и повторно не увеличиваются.
+    """
+    if not items:
+        return []
+    expected = expected or {}
+    ws = _ws(sheet_id)
+    svc = sheets_service()
+    spreadsheet_id = ws.spreadsheet.id
+    title = ws.title.replace("'", "''")
+    idx = _sheet_index(ws)
+
+    # (ok, msg | (sums_col, row), amount) для каждого item
+    resolved = []
+    for left_col, amount, paid_date in items:
+        target = paid_date.strftime("%d.%m.%Y")
+        row = idx.find_date_row(int(left_col), target, NEW_DATE_ROWS_START, NEW_DATE_ROWS_END)
+        if row is None:
+            resolved.append((False, f"Дата {target} не найдена (12..63).", amount))
+        else:
+            resolved.append((True, (int(left_col) + 1, row), amount))
+
+    cells = sorted({cell for ok, cell, _ in resolved if ok})
+    current = {}
+    if cells:
+        ranges = [f"'{title}'!{_col(col)}{row}" for col, row in cells]
+        resp = _retry(lambda: svc.spreadsheets().values().batchGet(
+            spreadsheetId=spreadsheet_id, ranges=ranges
+        ).execute(), what="batch get sums")
+        for cell, vr in zip(cells, resp.get("valueRanges", [])):
+            values = vr.get("values") or [[""]]
+            current[cell] = _to_number(values[0][0] if values[0] else "")
+
+    # ячейки, которые прошлая неподтверждённая попытка всё-таки записала
+    applied = {cell: value for cell, value in expected.items() if current.get(cell, 0) == value}
+
+    results = []
+    increments = {}     # (sums_col, row) -> итоговое значение
+    for ok, cell, amount in resolved:
+        if not ok:
+            results.append((False, cell))
+            continue
+        if cell in applied:
+            results.append((True, f"Оплата {amount} ₽ уже записана в {_col(cell[0])}{cell[1]}."))
+            continue
+        increments[cell] = increments.get(cell, current.get(cell, 0)) + int(amount)
+        results.append((True, f"Оплата {amount} ₽ записана в {_col(cell[0])}{cell[1]}."))
+
+    if increments:
+        # числа + USER_ENTERED, как update_acell: иначе суммы ложатся текстом и =SUM() в «Зашло» их не видит
+        data = [
+            {"range": f"'{title}'!{_col(col)}{row}", "values": [[value]]}
+            for (col, row), value in increments.items()
+        ]
+        try:
+            _retry(lambda: svc.spreadsheets().values().batchUpdate(
+                spreadsheetId=spreadsheet_id,
+                body={"valueInputOption": "USER_ENTERED", "data": data},
+            ).execute(), what="batch write journal")
+        except Exception as e:
+            raise JournalWriteUncertain({**applied, **increments}, e) from e
+    return results
+
 # --- Фото и ремонтный блок (заготовки) ---
 
 def sheets_service():
+    # httplib2 внутри googleapiclient не потокобезопасен — кэшируем сервис на поток
+    svc = getattr(_local, "sheets", None)
+    if svc is not None:
+        return svc
     try:
         from googleapiclient.discovery import build
     except ImportError as e:
@@ -499,7 +724,8 @@ def sheets_service():
             "Не установлен google-api-python-client. "
             "pip install google-api-python-client google-auth-httplib2 google-auth-oauthlib"
         ) from e
-    return build("sheets", "v4", credentials=_google_credentials())
+    svc = _local.sheets = build("sheets", "v4", http=_authorized_http(_google_credentials()), cache_discovery=False)
+    return svc
 
 # палитра
 COLOR_YELLOW = {"red": 1.0, "green": 0.9, "blue": 0.6}
@@ -542,26 +768,46 @@ def upload_image_bytes_to_drive(
 
     # Кто мы (для отладки; поле 'user' содержит emailAddress/displayName)
     try:
-        who = drv.about().get(fields="user").execute()
+        who = _retry(lambda: drv.about().get(fields="user").execute(), what="drive about")
         print("[DRIVE] whoami:", who.get("user", {}))
     except Exception as e:
         raise RuntimeError(f"Drive 'about' failed: {e}")
 
     media = MediaIoBaseUpload(io.BytesIO(image_bytes), mimetype="image/jpeg", resumable=False)
 
-    body = {"name": file_name}
+    try:
+        # id файла берём у Drive заранее: если create упал по таймауту, а файл уже создан,
+        # повтор с тем же id получит 409, а не загрузит второй такой же файл
+        new_id = _retry(lambda: drv.files().generateIds(count=1, space="drive").execute(),
+                        what="drive generate ids")["ids"][0]
+    except Exception as e:
+        raise RuntimeError(f"Drive generateIds failed: {e}") from e
+
+    body = {"id": new_id, "name": file_name}
     dest_folder = folder_id or os.getenv("DRIVE_FOLDER_ID")
     if dest_folder:
         body["parents"] = [dest_folder]
 
+    attempts = 0
+
+    def create():
+        nonlocal attempts
+        attempts += 1
+        try:
+            # ВАЖНО: supportsAllDrives=True для загрузки в Общий диск
+            return drv.files().create(
+                body=body,
+                media_body=media,
+                fields="id,parents,name",
+                supportsAllDrives=True,
+            ).execute()
+        except HttpError as e:
+            if attempts > 1 and getattr(e.resp, "status", None) == 409:
+                return {"id": new_id}     # файл создала предыдущая попытка
+            raise
+
     try:
-        # ВАЖНО: supportsAllDrives=True для загрузки в Общий диск
-        f = drv.files().create(
-            body=body,
-            media_body=media,
-            fields="id,parents,name",
-            supportsAllDrives=True,
-        ).execute()
+        f = _retry(create, what="drive create")
     except HttpError as e:
         raise RuntimeError(f"Drive create failed: {e}") from e
     except Exception as e:
@@ -571,11 +817,11 @@ def upload_image_bytes_to_drive(
 
     # Попробуем сделать файл доступным по ссылке (в доменных политиках может быть запрещено)
     try:
-        drv.permissions().create(
+        _retry(lambda: drv.permissions().create(
             fileId=file_id,
             body={"role": "reader", "type": "anyone"},
             supportsAllDrives=True,
-        ).execute()
+        ).execute(), what="drive permission")
     except HttpError as e:
         # Не критично для Общего диска; просто предупреждение
         print("[DRIVE] set public permission warning:", e)
@@ -607,10 +853,10 @@ def _add_image_over_cells(ws, sheet_id_int: int, row: int, col: int, url: str,
             }
         }]
     }
-    svc.spreadsheets().batchUpdate(
+    _retry(lambda: svc.spreadsheets().batchUpdate(
         spreadsheetId=ws.spreadsheet.id,
         body=req
-    ).execute()
+    ).execute(), what="add image")
 
 
 def place_client_photos(left_group_col: int, url1: str, url2: str, url3: str, *, sheet_id: Optional[str]=None, width_px: int=480, height_px: int=360):
@@ -636,13 +882,14 @@ def place_client_photos(left_group_col: int, url1: str, url2: str, url3: str, *,
                 "properties": {"pixelSize": height_px}, "fields": "pixelSize"
             }
         })
-    svc.spreadsheets().batchUpdate(spreadsheetId=ws.spreadsheet.id, body={"requests": reqs}).execute()
+    _retry(lambda: svc.spreadsheets().batchUpdate(spreadsheetId=ws.spreadsheet.id, body={"requests": reqs}).execute(),
+           what="photo sizes")
 
     # локаль RU -> ;  и режим 4 (кастомный размер)
     f = lambda u: f'=IMAGE("{u}";4;{height_px};{width_px})'
-    ws.update(f"{colA1}{rows[0]}", [[f(url1)]], value_input_option="USER_ENTERED")
-    ws.update(f"{colA1}{rows[1]}", [[f(url2)]], value_input_option="USER_ENTERED")
-    ws.update(f"{colA1}{rows[2]}", [[f(url3)]], value_input_option="USER_ENTERED")
+    for row, url in zip(rows, (url1, url2, url3)):
+        _retry(lambda: ws.update(f"{colA1}{row}", [[f(url)]], value_input_option="USER_ENTERED"),
+               what="place photo")
 
 
 
@@ -651,16 +898,22 @@ def drive_service():
     Пытаемся использовать пользовательский OAuth (для личного/общего диска).
     Если токена нет — падаем обратно на креды сервис-аккаунта.
     """
+    svc = getattr(_local, "drive", None)
+    if svc is not None:
+        return svc
     from googleapiclient.discovery import build
     user_creds = _user_oauth_creds()
     if user_creds:
-        return build("drive", "v3", credentials=user_creds)
-    # fallback: сервис-аккаунт
-    return build("drive", "v3", credentials=_google_credentials())
+        svc = build("drive", "v3", http=_authorized_http(user_creds), cache_discovery=False)
+    else:
+        # fallback: сервис-аккаунт
+        svc = build("drive", "v3", http=_authorized_http(_google_credentials()), cache_discovery=False)
+    _local.drive = svc
+    return svc
 
 def insert_image_from_url(col_index: int, row: int, url: str, *, sheet_id: Optional[str] = None):
     ws = _ws(sheet_id)
-    ws.update_acell(f"{_col(col_index)}{row}", f'=IMAGE("{url}")')
+    _retry(lambda: ws.update_acell(f"{_col(col_index)}{row}", f'=IMAGE("{url}")'), what="insert image")
 
 def set_cost_value(left_group_col: int, cost: int, *, sheet_id: Optional[str] = None):
     ws = _ws(sheet_id)
@@ -672,10 +925,11 @@ def add_repair_cost(col_index: int, amount: int, note: str = "", *, sheet_id: Op
     baseL = _col(col_index)
     # Накапливаем «Траты ремо»
     cell = f"{baseL}{NEW_COST_BLOCK_TOP+2}"
-    cur = _to_number(ws.acell(cell).value)
-    ws.update_acell(cell, str(cur + int(amount)))
+    cur = _to_number(_retry(lambda: ws.acell(cell).value, what="read repair cost"))
+    _retry(lambda: ws.update_acell(cell, str(cur + int(amount))), what="write repair cost")
     # лог строкой ниже блока
     r = NEW_COST_BLOCK_TOP + 4
-    while ws.acell(f"{baseL}{r}").value:
+    while _retry(lambda: ws.acell(f"{baseL}{r}").value, what="find repair log row"):
         r += 1
-    ws.update_acell(f"{baseL}{r}", f"{_fmt_date(datetime.now())} / {amount} — {note}")
\ No newline at end of file
+    _retry(lambda: ws.update_acell(f"{baseL}{r}", f"{_fmt_date(datetime.now())} / {amount} — {note}"),
+           what="write repair log")
\ No newline at end of file
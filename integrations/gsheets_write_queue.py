@@ -0,0 +1,199 @@
+# integrations/gsheets_write_queue.py
+import asyncio
+import os
+from collections import OrderedDict
+from typing import Any, Optional
+
+from dotenv import load_dotenv
+
+from integrations.gsheets_fleet_matrix import record_payments_batch_new_layout, JournalWriteUncertain
+from integrations.google_io import run_google
+from integrations.retry import CircuitOpenError
+
+
+load_dotenv()
+
+# Как часто сбрасываем накопленные записи в таблицу (сек)
+GS_FLUSH_INTERVAL = float(os.getenv("GS_FLUSH_INTERVAL", 5))
+# При стольких записях в очереди сбрасываем сразу, не дожидаясь таймера
+GS_FLUSH_MAX_ITEMS = int(os.getenv("GS_FLUSH_MAX_ITEMS", 50))
+# Сколько раз пробуем записать пачку, прежде чем выбросить
+GS_FLUSH_MAX_ATTEMPTS = int(os.getenv("GS_FLUSH_MAX_ATTEMPTS", 5))
+# Сколько при остановке бота пытаемся дописать очередь (сек), прежде чем сдаться
+GS_CLOSE_TIMEOUT = float(os.getenv("GS_CLOSE_TIMEOUT", 30))
+
+
+class PaymentJournalQueue:
+    """
+    Write-behind очередь для «журнала оплат» в Google Sheets.
+    Хендлер кладёт платёж и сразу отвечает пользователю, а очередь раз в GS_FLUSH_INTERVAL
+    (или при GS_FLUSH_MAX_ITEMS записях) пишет всё одним batchGet + batchUpdate на таблицу.
+    idem_key (например, "payment:<id>") защищает от двойного прибавления суммы.
+    Пачка, чей batchUpdate упал после отправки, повторяется отдельно и с ожидаемыми значениями ячеек
+    (JournalWriteUncertain): уже записанные ячейки не увеличиваются второй раз.
+    """
+
+    def __init__(self, applied_keys_limit: int = 10000):
+        self._pending = OrderedDict()     # idem_key -> {"sheet_id", "left_col", "amount", "paid_date", "attempts"}
+        self._applied = OrderedDict()     # недавно записанные idem_key
+        self._inflight = set()            # idem_key пачки, которая пишется прямо сейчас
+        self._uncertain = []              # [(sheet_id, entries, expected)] — пачки с неподтверждённой записью
+        self._applied_limit = applied_keys_limit
+        self._lock = asyncio.Lock()
+        self._timer: Optional[asyncio.Task] = None
+        self.stats = {"enqueued": 0, "written": 0, "duplicates": 0, "failed": 0, "flushes": 0}
+
+    def enqueue(self, idem_key: str, left_col: int, amount: int, paid_date: Any, *, sheet_id: Optional[str] = None):
+        if (idem_key in self._pending or idem_key in self._inflight or idem_key in self._applied
+                or any(idem_key == key for _, entries, _ in self._uncertain for key, _ in entries)):
+            self.stats["duplicates"] += 1
+            return
+        self._pending[idem_key] = {
+            "sheet_id": sheet_id,
+            "left_col": int(left_col),
+            "amount": int(amount or 0),
+            "paid_date": paid_date,
+            "attempts": 0,
+        }
+        self.stats["enqueued"] += 1
+
+        if len(self._pending) >= GS_FLUSH_MAX_ITEMS:
+            asyncio.get_running_loop().create_task(self.flush())
+        elif self._timer is None or self._timer.done():
+            self._timer = asyncio.get_running_loop().create_task(self._flush_later())
+
+    async def _flush_later(self):
+        await asyncio.sleep(GS_FLUSH_INTERVAL)
+        await self.flush()
+
+    def _mark_applied(self, idem_key: str):
+        self._applied[idem_key] = True
+        while len(self._applied) > self._applied_limit:
+            self._applied.popitem(last=False)
+
+    async def flush(self):
+        async with self._lock:
+            if not self._pending and not self._uncertain:
+                return
+            batch = list(self._pending.items())
+            uncertain, self._uncertain = self._uncertain, []
+            self._pending.clear()
+            self._inflight = {idem_key for idem_key, _ in batch}
+            self._inflight.update(key for _, entries, _ in uncertain for key, _ in entries)
+            self.stats["flushes"] += 1
+            try:
+                # сначала дописываем неподтверждённые пачки — ровно тем же составом
+                for sheet_id, entries, expected in uncertain:
+                    await self._write_entries(sheet_id, entries, expected)
+                await self._write_batch(batch)
+            finally:
+                self._inflight = set()
+
+        # то, что не записалось или пришло во время сброса, — на следующий круг
+        if (self._pending or self._uncertain) and (self._timer is None or self._timer.done() or self._timer is asyncio.current_task()):
+            self._timer = asyncio.get_running_loop().create_task(self._flush_later())
+
+    async def _write_batch(self, batch):
+        by_sheet = {}
+        for idem_key, item in batch:
+            by_sheet.setdefault(item["sheet_id"], []).append((idem_key, item))
+
+        for sheet_id, entries in by_sheet.items():
+            await self._write_entries(sheet_id, entries)
+
+    async def _write_entries(self, sheet_id, entries, expected: dict = None):
+        rows = [(it["left_col"], it["amount"], it["paid_date"]) for _, it in entries]
+        try:
+            # deadline=None: по таймауту поток всё равно дописал бы суммы, а мы бы сочли пачку упавшей
+            # и прибавили повторно; время вызова и так ограничено ретраями внутри функции
+            results = await run_google(record_payments_batch_new_layout, rows,
+                                       sheet_id=sheet_id, expected=expected, deadline=None)
+        except JournalWriteUncertain as e:
+            # суммы могли записаться — обычный requeue прибавил бы их ещё раз
+            print(f"[GS] {e}; {len(entries)} записей будут сверены и дописаны при следующем сбросе")
+            self._requeue_uncertain(sheet_id, entries, e.expected)
+            return
+        except CircuitOpenError as e:
+            # Google недоступен — ждём, попытку не списываем
+            print(f"[GS] {e}; {len(entries)} записей ждут следующего сброса")
+            self._requeue(entries, count_attempt=False, expected=expected, sheet_id=sheet_id)
+            return
+        except Exception as e:
+            print(f"[GS] ошибка пакетной записи ({len(entries)} шт.): {e}")
+            self._requeue(entries, expected=expected, sheet_id=sheet_id)
+            return
+
+        for (idem_key, item), (ok, msg) in zip(entries, results):
+            print("[GS]", idem_key, msg)
+            if ok:
+                self._mark_applied(idem_key)
+                self.stats["written"] += 1
+            else:
+                # даты нет в таблице — повтор не поможет
+                print(f"[GS] ❌ пропускаем {self._describe(idem_key, item)}")
+                self.stats["failed"] += 1
+
+    @staticmethod
+    def _describe(idem_key: str, item: dict) -> str:
+        """Всё, что нужно, чтобы дописать запись в журнал вручную."""
+        return (f"{idem_key}: сумма={item['amount']} колонка={item['left_col']} "
+                f"дата={item['paid_date']} таблица={item['sheet_id'] or 'по умолчанию'}")
+
+    def _count_attempt(self, entries, count_attempt: bool = True) -> list:
+        alive = []
+        for idem_key, item in entries:
+            if count_attempt:
+                item["attempts"] += 1
+            if item["attempts"] >= GS_FLUSH_MAX_ATTEMPTS:
+                self.stats["failed"] += 1
+                print(f"[GS] ❌ не записан после {item['attempts']} попыток — пропускаем {self._describe(idem_key, item)}")
+                continue
+            alive.append((idem_key, item))
+        return alive
+
+    def _requeue(self, entries, count_attempt: bool = True, expected: dict = None, sheet_id=None):
+        if expected:
+            # пачка с неподтверждённой записью остаётся отдельной, пока её не сверим
+            self._requeue_uncertain(sheet_id, entries, expected, count_attempt)
+            return
+        for idem_key, item in self._count_attempt(entries, count_attempt):
+            self._pending.setdefault(idem_key, item)
+
+    def _requeue_uncertain(self, sheet_id, entries, expected: dict, count_attempt: bool = True):
+        entries = self._count_attempt(entries, count_attempt)
+        if entries:
+            self._uncertain.append((sheet_id, entries, expected))
+
+    async def close(self, timeout: float = GS_CLOSE_TIMEOUT):
+        """
+        Дописать всё, что накопилось (при остановке бота): повторяем сброс, пока очередь не опустеет
+        или не выйдет timeout. Оплаты в базе уже подтверждены, поэтому каждую недописанную запись
+        выводим в лог целиком — по нему журнал можно дописать вручную.
+        """
+        loop = asyncio.get_running_loop()
+        deadline = loop.time() + timeout
+        while True:
+            if self._timer is not None and not self._timer.done():
+                self._timer.cancel()
+            await self.flush()
+            left = deadline - loop.time()
+            if not (self._pending or self._uncertain) or left <= 0:
+                break
+            await asyncio.sleep(min(GS_FLUSH_INTERVAL, left))
+
+        if self._timer is not None and not self._timer.done():
+            self._timer.cancel()
+        uncertain = [entry for _, entries, _ in self._uncertain for entry in entries]
+        if self._pending or uncertain:
+            print(f"[GS] ❌ при остановке не записано в журнал: {len(self._pending) + len(uncertain)}")
+            for idem_key, item in self._pending.items():
+                print(f"[GS] ❌ не записан {self._describe(idem_key, item)}")
+            for idem_key, item in uncertain:
+                # batchUpdate мог пройти — перед ручной записью сверить ячейку
+                print(f"[GS] ❌ не подтверждён {self._describe(idem_key, item)}")
+            self.stats["failed"] += len(self._pending) + len(uncertain)
+            self._pending.clear()
+            self._uncertain = []
+
+
+payment_journal_queue = PaymentJournalQueue()
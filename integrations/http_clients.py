@@ -0,0 +1,100 @@
+# integrations/http_clients.py
+from os import getenv
+
+import httpx
+import requests
+from dotenv import load_dotenv
+from requests.adapters import HTTPAdapter
+
+
+load_dotenv()
+
+# Таймауты исходящих запросов (сек)
+HTTP_CONNECT_TIMEOUT = float(getenv("HTTP_CONNECT_TIMEOUT", 5))
+HTTP_READ_TIMEOUT = float(getenv("HTTP_READ_TIMEOUT", 30))
+# Соединений на один хост (keep-alive пул)
+HTTP_MAX_PER_HOST = int(getenv("HTTP_MAX_PER_HOST", 10))
+# Сколько держать простаивающее keep-alive соединение (сек)
+HTTP_KEEPALIVE_EXPIRY = float(getenv("HTTP_KEEPALIVE_EXPIRY", 60))
+
+
+# Настройки клиентов по имени: каждый клиент ходит в один сервис,
+# поэтому лимит пула клиента — это и есть лимит на хост
+CLIENTS = {
+    "yandex_gpt": {
+        "base_url": "https://llm.api.cloud.yandex.net",
+        "max_connections": int(getenv("YANDEX_GPT_MAX_CONNECTIONS", 8)),
+        "read_timeout": float(getenv("YANDEX_GPT_READ_TIMEOUT", 60)),
+    },
+    "google": {
+        "max_connections": int(getenv("GOOGLE_IO_WORKERS", 4)) * 2,
+    },
+    "default": {},
+}
+
+
+_async_clients = {}      # name -> httpx.AsyncClient
+
+
+def _config(name: str) -> dict:
+    return {**CLIENTS["default"], **CLIENTS.get(name, {})}
+
+
+def _timeout(cfg: dict) -> httpx.Timeout:
+    read = cfg.get("read_timeout", HTTP_READ_TIMEOUT)
+    return httpx.Timeout(connect=HTTP_CONNECT_TIMEOUT, read=read, write=read, pool=HTTP_CONNECT_TIMEOUT)
+
+
+def get_async_client(name: str = "default") -> httpx.AsyncClient:
+    """
+    Общий на всё приложение httpx.AsyncClient для сервиса name:
+    keep-alive пул, лимит соединений и таймауты. Закрывается в close_http_clients().
+    """
+    client = _async_clients.get(name)
+    if client is None or client.is_closed:
+        cfg = _config(name)
+        max_conn = cfg.get("max_connections", HTTP_MAX_PER_HOST)
+        client = _async_clients[name] = httpx.AsyncClient(
+            base_url=cfg.get("base_url", ""),
+            timeout=_timeout(cfg),
+            limits=httpx.Limits(
+                max_connections=max_conn,
+                max_keepalive_connections=max_conn,
+                keepalive_expiry=HTTP_KEEPALIVE_EXPIRY,
+            ),
+        )
+    return client
+
+
+def _make_session(session: requests.Session, name: str) -> requests.Session:
+    cfg = _config(name)
+    max_conn = cfg.get("max_connections", HTTP_MAX_PER_HOST)
+    # ретраи делаем сами (integrations/retry.py), адаптер только держит пул
+    adapter = HTTPAdapter(pool_connections=4, pool_maxsize=max_conn, max_retries=0)
+    session.mount("https://", adapter)
+    session.mount("http://", adapter)
+    return session
+
+
+def make_pooled(session: requests.Session, name: str) -> requests.Session:
+    """Настроить пул у чужой сессии (например, google.auth AuthorizedSession для gspread)."""
+    return _make_session(session, name)
+
+
+def http_timeout(name: str = "default") -> tuple:
+    """(connect, read) для requests."""
+    return (HTTP_CONNECT_TIMEOUT, _config(name).get("read_timeout", HTTP_READ_TIMEOUT))
+
+
+def open_http_clients(*names: str):
+    """Создать клиенты заранее при старте бота (иначе — лениво при первом запросе)."""
+    for name in names or CLIENTS:
+        get_async_client(name)
+
+
+async def close_http_clients():
+    """Закрыть все пулы при остановке бота."""
+    for client in list(_async_clients.values()):
+        if not client.is_closed:
+            await client.aclose()
+    _async_clients.clear()
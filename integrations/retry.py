@@ -0,0 +1,197 @@
+# integrations/retry.py
+import asyncio
+import random
+import threading
+import time
+from typing import Callable, Optional, Tuple, Type
+
+import requests
+from google.auth.exceptions import TransportError
+from googleapiclient.errors import HttpError
+from gspread.exceptions import APIError
+
+
+# Ошибки, после которых имеет смысл повторить запрос к Google
+RETRYABLE: Tuple[Type[BaseException], ...] = (
+    requests.exceptions.RequestException,
+    TransportError,
+    HttpError,
+    APIError,
+    ConnectionError,
+    TimeoutError,
+)
+
+
+TRANSIENT_STATUSES = {408, 429, 500, 502, 503, 504}
+
+
+def is_transient(e: BaseException) -> bool:
+    """HTTP-ошибки повторяем только для 408/429/5xx; 400/403/404 повтор не исправит."""
+    if isinstance(e, HttpError):
+        return getattr(e.resp, "status", None) in TRANSIENT_STATUSES
+    if isinstance(e, APIError):
+        return getattr(e, "code", None) in TRANSIENT_STATUSES
+    return True
+
+
+class CircuitOpenError(RuntimeError):
+    """Сервис помечен недоступным — запрос не отправляем, сразу отказываем."""
+
+
+class CircuitBreaker:
+    """
+    Простой предохранитель: после failure_threshold ошибок подряд «размыкается»
+    на reset_timeout секунд и сразу отказывает. Потом пропускает один пробный запрос:
+    успех — снова замкнут, ошибка — ещё reset_timeout секунд отказов.
+    """
+
+    def __init__(self, name: str, failure_threshold: int = 5, reset_timeout: float = 30.0):
+        self.name = name
+        self.failure_threshold = failure_threshold
+        self.reset_timeout = reset_timeout
+        self._lock = threading.Lock()
+        self._failures = 0
+        self._opened_at: Optional[float] = None
+        self._probe_in_flight = False
+
+    @property
+    def state(self) -> str:
+        if self._opened_at is None:
+            return "closed"
+        if time.monotonic() - self._opened_at >= self.reset_timeout:
+            return "half-open"
+        return "open"
+
+    def check(self):
+        """Отказать сразу, если предохранитель разомкнут (пробный запрос не занимает)."""
+        if self.state == "open":
+            raise CircuitOpenError(f"{self.name}: сервис временно недоступен, повторите позже")
+
+    def before_call(self):
+        with self._lock:
+            state = self.state
+            if state == "closed":
+                return
+            if state == "half-open" and not self._probe_in_flight:
+                self._probe_in_flight = True
+                return
+            raise CircuitOpenError(f"{self.name}: сервис временно недоступен, повторите позже")
+
+    def release(self):
+        """Вызов завершился ошибкой, не связанной с сервисом: просто освобождаем пробный слот."""
+        with self._lock:
+            self._probe_in_flight = False
+
+    def record_success(self):
+        with self._lock:
+            self._failures = 0
+            self._opened_at = None
+            self._probe_in_flight = False
+
+    def record_failure(self):
+        with self._lock:
+            self._failures += 1
+            self._probe_in_flight = False
+            if self._opened_at is not None or self._failures >= self.failure_threshold:
+                if self._opened_at is None:
+                    print(f"[RETRY] {self.name}: предохранитель разомкнут после {self._failures} ошибок")
+                self._opened_at = time.monotonic()
+
+
+# Общий предохранитель для Sheets и Drive
+google_breaker = CircuitBreaker("google")
+
+
+def _backoff(attempt: int, base_delay: float, max_delay: float) -> float:
+    # экспонента с полным джиттером, чтобы параллельные ретраи не били в API одновременно
+    return random.uniform(0, min(max_delay, base_delay * (2 ** (attempt - 1))))
+
+
+def retry_sync(
+    fn: Callable,
+    *,
+    tries: int = 4,
+    base_delay: float = 0.8,
+    max_delay: float = 8.0,
+    deadline: Optional[float] = 30.0,
+    retry_on: Tuple[Type[BaseException], ...] = RETRYABLE,
+    breaker: Optional[CircuitBreaker] = google_breaker,
+    what: str = "",
+):
+    """
+    Синхронный ретрай. Спит через time.sleep, поэтому вызывать только в рабочих потоках,
+    не из event loop (для хендлеров — retry_async / run_google).
+    """
+    started = time.monotonic()
+    for attempt in range(1, tries + 1):
+        if breaker:
+            breaker.before_call()
+        try:
+            result = fn()
+        except retry_on as e:
+            if not is_transient(e):
+                if breaker:
+                    breaker.record_success()
+                raise
+            if breaker:
+                breaker.record_failure()
+            delay = _backoff(attempt, base_delay, max_delay)
+            out_of_budget = deadline is not None and time.monotonic() - started + delay > deadline
+            if attempt == tries or out_of_budget:
+                raise
+            print(f"[RETRY] {what}: попытка {attempt}/{tries} не удалась ({e}), повтор через {delay:.1f} сек")
+            time.sleep(delay)
+            continue
+        except BaseException:
+            if breaker:
+                breaker.release()
+            raise
+        if breaker:
+            breaker.record_success()
+        return result
+
+
+async def retry_async(
+    fn: Callable,
+    *,
+    tries: int = 4,
+    base_delay: float = 0.8,
+    max_delay: float = 8.0,
+    deadline: Optional[float] = 30.0,
+    retry_on: Tuple[Type[BaseException], ...] = RETRYABLE,
+    breaker: Optional[CircuitBreaker] = google_breaker,
+    what: str = "",
+):
+    """
+    Асинхронный ретрай: fn() должна возвращать awaitable.
+    Пауза — asyncio.sleep, весь ретрай укладывается в deadline секунд,
+    при разомкнутом предохранителе сразу CircuitOpenError.
+    """
+    started = time.monotonic()
+    for attempt in range(1, tries + 1):
+        if breaker:
+            breaker.before_call()
+        remaining = None if deadline is None else max(0.1, deadline - (time.monotonic() - started))
+        try:
+            result = await asyncio.wait_for(fn(), timeout=remaining)
+        except (asyncio.TimeoutError, *retry_on) as e:
+            if not is_transient(e):
+                if breaker:
+                    breaker.record_success()
+                raise
+            if breaker:
+                breaker.record_failure()
+            delay = _backoff(attempt, base_delay, max_delay)
+            out_of_budget = deadline is not None and time.monotonic() - started + delay > deadline
+            if attempt == tries or out_of_budget:
+                raise
+            print(f"[RETRY] {what}: попытка {attempt}/{tries} не удалась ({e!r}), повтор через {delay:.1f} сек")
+            await asyncio.sleep(delay)
+            continue
+        except BaseException:
+            if breaker:
+                breaker.release()
+            raise
+        if breaker:
+            breaker.record_success()
+        return result
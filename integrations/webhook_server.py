@@ -0,0 +1,225 @@
+# integrations/webhook_server.py
+import asyncio
+import hmac
+import json
+import re
+import signal
+from os import getenv
+
+import h11
+from dotenv import load_dotenv
+from telegram import Update
+
+
+load_dotenv()
+
+# Публичный адрес, на который Telegram шлёт вебхуки (https://bot.example.com), без пути
+WEBHOOK_BASE_URL = getenv("WEBHOOK_BASE_URL", "").rstrip("/")
+# Где слушает локальный сервер (за nginx / балансировщиком)
+WEBHOOK_LISTEN = getenv("WEBHOOK_LISTEN", "127.0.0.1")
+WEBHOOK_PORT = int(getenv("WEBHOOK_PORT", 8080))
+# Секрет из заголовка X-Telegram-Bot-Api-Secret-Token: A-Z, a-z, 0-9, _ и -, до 256 символов
+WEBHOOK_SECRET = getenv("WEBHOOK_SECRET", "")
+# Префикс пути: бот name получает вебхуки на {prefix}/{name}
+WEBHOOK_PATH_PREFIX = "/" + getenv("WEBHOOK_PATH_PREFIX", "tg").strip("/")
+# Сколько параллельных соединений Telegram открывает к нам на бота
+WEBHOOK_MAX_CONNECTIONS = int(getenv("WEBHOOK_MAX_CONNECTIONS", 40))
+# Максимальный размер тела запроса (байт) и простой keep-alive соединения (сек)
+WEBHOOK_MAX_BODY = int(getenv("WEBHOOK_MAX_BODY", 1024 * 1024))
+WEBHOOK_IDLE_TIMEOUT = float(getenv("WEBHOOK_IDLE_TIMEOUT", 75))
+# Сколько ждать уже принятые запросы при остановке (сек)
+WEBHOOK_SHUTDOWN_TIMEOUT = float(getenv("WEBHOOK_SHUTDOWN_TIMEOUT", 10))
+
+_SECRET_RE = re.compile(r"^[A-Za-z0-9_\-]{1,256}$")
+_SECRET_HEADER = b"x-telegram-bot-api-secret-token"
+
+
+class WebhookServer:
+    """
+    Один HTTP-сервер на asyncio + h11 для вебхуков нескольких ботов: путь → Application.
+    Запрос проверяется по секрету, Update кладётся в app.update_queue, Telegram сразу получает 200 —
+    обработка идёт в Application так же, как при polling.
+    GET /healthz — для балансировщика.
+    """
+
+    def __init__(self, host: str = WEBHOOK_LISTEN, port: int = WEBHOOK_PORT, secret: str = WEBHOOK_SECRET):
+        if not _SECRET_RE.match(secret or ""):
+            raise RuntimeError("WEBHOOK_SECRET не задан или содержит недопустимые символы (A-Z, a-z, 0-9, _ и -)")
+        self.host = host
+        self.port = port
+        self.secret = secret.encode()
+        self.routes = {}             # path -> Application
+        self._server = None
+        self._closing = False
+        self._connections = set()    # задачи открытых соединений
+        self._busy = set()           # соединения, которые сейчас обрабатывают запрос
+        self.stats = {"accepted": 0, "rejected": 0, "errors": 0}
+
+    def add_bot(self, path: str, application):
+        self.routes[path] = application
+
+    async def start(self):
+        self._server = await asyncio.start_server(self._handle, self.host, self.port)
+        print(f"[WEBHOOK] сервер слушает {self.host}:{self.port}: {', '.join(self.routes)}")
+
+    async def stop(self, timeout: float = WEBHOOK_SHUTDOWN_TIMEOUT):
+        """Перестать принимать соединения, дождаться принятых запросов, закрыть простаивающие keep-alive."""
+        self._closing = True
+        if self._server is not None:
+            self._server.close()
+        idle = self._connections - self._busy
+        for task in idle:
+            task.cancel()
+        if self._connections:
+            await asyncio.wait(self._connections, timeout=timeout)
+        for task in self._connections:
+            task.cancel()
+        print("[WEBHOOK] сервер остановлен")
+
+    # --- HTTP ---
+
+    async def _handle(self, reader: asyncio.StreamReader, writer: asyncio.StreamWriter):
+        task = asyncio.current_task()
+        self._connections.add(task)
+        conn = h11.Connection(h11.SERVER, max_incomplete_event_size=16 * 1024)
+        try:
+            while not self._closing:
+                event = await self._next_event(conn, reader)
+                if not isinstance(event, h11.Request):
+                    break
+                self._busy.add(task)
+                try:
+                    body = await self._read_body(conn, reader)
+                    if body is None:
+                        status, payload = 413, {"ok": False}
+                    else:
+                        status, payload = await self._dispatch(event, body)
+                    await self._respond(conn, writer, status, payload)
+                finally:
+                    self._busy.discard(task)
+                if conn.our_state is h11.MUST_CLOSE:
+                    break
+                conn.start_next_cycle()
+        except (h11.ProtocolError, asyncio.TimeoutError, ConnectionError, asyncio.IncompleteReadError):
+            pass
+        except asyncio.CancelledError:
+            pass
+        finally:
+            self._connections.discard(task)
+            writer.close()
+
+    async def _next_event(self, conn: h11.Connection, reader: asyncio.StreamReader):
+        while True:
+            event = conn.next_event()
+            if event is not h11.NEED_DATA:
+                return event
+            data = await asyncio.wait_for(reader.read(65536), WEBHOOK_IDLE_TIMEOUT)
+            conn.receive_data(data)
+
+    async def _read_body(self, conn: h11.Connection, reader: asyncio.StreamReader):
+        chunks, size = [], 0
+        while True:
+            event = await self._next_event(conn, reader)
+            if isinstance(event, h11.Data):
+                size += len(event.data)
+                if size > WEBHOOK_MAX_BODY:
+                    return None
+                chunks.append(event.data)
+            elif isinstance(event, h11.EndOfMessage):
+                return b"".join(chunks)
+            else:
+                raise h11.RemoteProtocolError("неожиданный конец запроса")
+
+    async def _respond(self, conn: h11.Connection, writer: asyncio.StreamWriter, status: int, payload: dict):
+        body = json.dumps(payload).encode()
+        headers = [("content-type", "application/json"), ("content-length", str(len(body)))]
+        if self._closing or status == 413:
+            headers.append(("connection", "close"))
+        writer.write(conn.send(h11.Response(status_code=status, headers=headers)))
+        writer.write(conn.send(h11.Data(data=body)))
+        writer.write(conn.send(h11.EndOfMessage()))
+        await writer.drain()
+
+    async def _dispatch(self, request: h11.Request, body: bytes):
+        path = request.target.split(b"?", 1)[0].decode("latin-1")
+        if request.method == b"GET" and path == "/healthz":
+            return 200, {"ok": not self._closing}
+
+        application = self.routes.get(path)
+        if application is None:
+            return 404, {"ok": False}
+        if request.method != b"POST":
+            return 405, {"ok": False}
+
+        secret = next((value for name, value in request.headers if name == _SECRET_HEADER), b"")
+        if not hmac.compare_digest(secret, self.secret):
+            self.stats["rejected"] += 1
+            print(f"[WEBHOOK] ⚠️ неверный секрет на {path}")
+            return 403, {"ok": False}
+
+        try:
+            update = Update.de_json(json.loads(body), application.bot)
+        except (ValueError, TypeError, KeyError) as e:
+            self.stats["errors"] += 1
+            print(f"[WEBHOOK] ❌ не удалось разобрать update на {path}: {e}")
+            return 400, {"ok": False}
+
+        await application.update_queue.put(update)
+        self.stats["accepted"] += 1
+        return 200, {"ok": True}
+
+
+def _stop_on_signals() -> asyncio.Event:
+    stop = asyncio.Event()
+    loop = asyncio.get_running_loop()
+    for sig in (signal.SIGINT, signal.SIGTERM):
+        try:
+            loop.add_signal_handler(sig, stop.set)
+        except (NotImplementedError, RuntimeError):
+            pass    # Windows — остаётся Ctrl+C через KeyboardInterrupt
+    return stop
+
+
+async def serve_webhooks(bots: dict, stop: asyncio.Event = None):
+    """
+    Режим webhook вместо run_polling для нескольких ботов сразу: bots — {name: Application}.
+    Регистрирует вебхук {WEBHOOK_BASE_URL}{WEBHOOK_PATH_PREFIX}/{name} у каждого бота и работает до SIGINT/SIGTERM.
+    Остановка: сервер перестаёт принимать запросы, дожидается принятых, затем Application
+    дообрабатывают очередь апдейтов. Вебхук при выходе не снимаем: пока процесс перезапускается,
+    Telegram копит апдейты и повторяет доставку.
+
+    Запускать одну реплику. Состояние ConversationHandler, user_data/chat_data и очерёдность апдейтов
+    одного чата (utils/update_processor.py) живут в памяти процесса: если апдейты одного чата попадут
+    в разные процессы, диалоги (анкеты, оплата) ломаются. Несколько реплик за балансировщиком — только
+    с маршрутизацией всех апдейтов одного чата в один процесс и общим persistence у Application.
+    """
+    if not WEBHOOK_BASE_URL:
+        raise RuntimeError("Для BOT_MODE=webhook нужен WEBHOOK_BASE_URL")
+    stop = stop or _stop_on_signals()
+    server = WebhookServer()
+    for name, application in bots.items():
+        server.add_bot(f"{WEBHOOK_PATH_PREFIX}/{name}", application)
+
+    started = []
+    try:
+        for application in bots.values():
+            await application.initialize()
+            await application.start()
+            started.append(application)
+        await server.start()
+
+        for path, application in server.routes.items():
+            await application.bot.set_webhook(
+                url=f"{WEBHOOK_BASE_URL}{path}",
+                secret_token=WEBHOOK_SECRET,
+                allowed_updates=Update.ALL_TYPES,
+                max_connections=WEBHOOK_MAX_CONNECTIONS,
+            )
+        print(f"[WEBHOOK] вебхуки зарегистрированы: {len(server.routes)}")
+
+        await stop.wait()
+    finally:
+        await server.stop()
+        for application in started:
+            await application.stop()
+            await application.shutdown()
@@ -14,8 +14,20 @@ from telegram.ext import (
 )
 
 from apscheduler.schedulers.asyncio import AsyncIOScheduler
-from utils.notify_utils import send_payment_notifications_with_button
+from apscheduler.jobstores.memory import MemoryJobStore
+from utils.reminder_planner import ReminderPlanner
+from integrations.gsheets_write_queue import payment_journal_queue
+from integrations.google_io import get_google_io_stats, shutdown_google_io
+from integrations.http_clients import open_http_clients, close_http_clients
+from integrations.webhook_server import serve_webhooks
+from services.faq_cache import faq_answer_cache
+from utils.encryption import get_file_id_cache_stats
+from utils.update_processor import update_processor
 from utils.bot_commands import setup_bot_commands
+from database.db import init_pool, close_pool, get_pool_stats
+from database.migrate import check_schema
+from database.job_store import PostgresJobStore
+from database.leader import LeaderElection
 
 # Хендлеры пользователей
 from handlers.start import start
@@ -40,10 +52,28 @@ from handlers.admin_assign import assign_repair_callback, handle_master_selectio
 
 load_dotenv()
 BOT_TOKEN = os.getenv("BOT_TOKEN")
+# Задача APScheduler, опоздавшая (перезапуск, смена лидера) не больше чем на столько секунд, ещё выполняется
+SCHEDULER_MISFIRE_GRACE = int(os.getenv("SCHEDULER_MISFIRE_GRACE", 900))
+# Хранилище общих задач — в Postgres, подключается только у процесса-лидера
+SHARED_JOBSTORE = "shared"
+# polling — getUpdates (по умолчанию); webhook — оба бота (основной и notifier) на одном HTTP-сервере
+BOT_MODE = os.getenv("BOT_MODE", "polling")
+
+
+def log_pool_stats():
+    print(f"[DB] pool stats: {get_pool_stats()}")
+    print(f"[GOOGLE] io stats: {get_google_io_stats()}")
+    print(f"[FAQ] cache stats: {faq_answer_cache.get_stats()}")
+    print(f"[ENC] file_id cache stats: {get_file_id_cache_stats()}")
+    print(f"[UPDATES] processor stats: {update_processor.get_stats()}")
 
 
 async def main():
-    app = Application.builder().token(BOT_TOKEN).build()
+    init_pool()
+    check_schema()
+    open_http_clients()
+    # Апдейты разных пользователей — параллельно, одного пользователя/чата — строго по очереди
+    app = Application.builder().token(BOT_TOKEN).concurrent_updates(update_processor).build()
 
     # --- Пользовательские FSM и хендлеры ---
     app.add_handler(faq_conv_handler)
@@ -96,31 +126,58 @@ async def main():
 
 
     # --- Планировщик уведомлений ---
-    scheduler = AsyncIOScheduler()
-
-# Уведомления при просрочке (раз в 60 минут)
-    scheduler.add_job(
-    send_payment_notifications_with_button,
-    "interval",
-    minutes=25,
-    kwargs={"bot": app.bot, "severity": "overdue"}
-)
-
-# Стандартные уведомления в 8:00, 12:00, 16:00, 20:00
-    times = [(8, 0), (12, 0), (16, 0), (16, 53), (20, 0)]
-
-    for hour, minute in times:
-        scheduler.add_job(
-            send_payment_notifications_with_button,
-            "cron",
-        hour=hour,
-        minute = minute,
-        kwargs={"bot": app.bot, "severity": "standard"}
+    # Процессов бота может быть несколько: в каждом работают только локальные задачи (метрики),
+    # общие задачи и напоминания об оплате выполняет один лидер (advisory-lock в Postgres).
+    # coalesce — пропущенные запуски одной задачи схлопываются в один
+    scheduler = AsyncIOScheduler(
+        jobstores={"default": MemoryJobStore()},
+        job_defaults={"coalesce": True, "misfire_grace_time": SCHEDULER_MISFIRE_GRACE, "max_instances": 1},
     )
 
+# Метрики пула соединений с БД и пула Google I/O — в каждом процессе
+    scheduler.add_job(log_pool_stats, "interval", minutes=30)
+
+# Напоминания об оплате: просрочка (каждые REMINDER_OVERDUE_INTERVAL мин) и день оплаты (REMINDER_TIMES).
+# Планировщик просыпается только к сроку конкретного клиента или по NOTIFY об изменении его платежей
+    reminder_planner = ReminderPlanner(app.bot)
+
+    async def on_elected():
+        scheduler.add_jobstore(PostgresJobStore(), SHARED_JOBSTORE)
+        # Чистка истёкших ключей кнопки «Я оплатил»; задачу не пересоздаём, чтобы не сдвигать расписание
+        if scheduler.get_job("purge_payment_confirm_keys", SHARED_JOBSTORE) is None:
+            scheduler.add_job(
+                "utils.confirm_registry:payment_confirm_registry.purge_expired",
+                "interval", hours=6,
+                id="purge_payment_confirm_keys", jobstore=SHARED_JOBSTORE,
+            )
+        await reminder_planner.start()
+
+    async def on_demoted():
+        await reminder_planner.stop()
+        try:
+            scheduler.remove_jobstore(SHARED_JOBSTORE)
+        except KeyError:
+            pass      # on_elected упал раньше, чем подключил хранилище
+
+    leader = LeaderElection(on_elected, on_demoted)
+
 # Запуск планировщика
     scheduler.start()
-    await app.run_polling()
+    await leader.start()
+    try:
+        if BOT_MODE == "webhook":
+            # notifier-бот (кнопки мастера) обслуживается здесь же — отдельный main_notify.py не нужен
+            from main_notify import app as notifier_app
+            await serve_webhooks({"main": app, "notifier": notifier_app})
+        else:
+            await app.run_polling()
+    finally:
+        await leader.stop()
+        scheduler.shutdown(wait=False)
+        await payment_journal_queue.close()
+        shutdown_google_io()
+        await close_http_clients()
+        close_pool()
     
 
 if __name__ == "__main__":
@@ -5,6 +5,8 @@ load_dotenv()
 
 from telegram.ext import Application, CallbackQueryHandler
 from handlers.repair_done import confirm_repair_completion, finish_repair_and_notify_admin
+from database.db import init_pool, close_pool
+from database.migrate import check_schema
 
 # Создаём Application для второго бота
 app = Application.builder().token(os.getenv("NOTIFIER_TOKEN")).build()
@@ -14,5 +16,13 @@ app.add_handler(CallbackQueryHandler(confirm_repair_completion, pattern=r"^done_
 app.add_handler(CallbackQueryHandler(finish_repair_and_notify_admin, pattern=r"^confirm_done:\d+$"))
 
 if __name__ == "__main__":
+    if os.getenv("BOT_MODE", "polling") == "webhook":
+        print("ℹ️ BOT_MODE=webhook: вебхуки notifier-бота принимает main.py, отдельный процесс не нужен")
+        raise SystemExit(0)
+    init_pool()
+    check_schema(auto_migrate=False)
     print("✅ Notifier bot запущен и слушает callback-кнопки...")
-    app.run_polling()
+    try:
+        app.run_polling()
+    finally:
+        close_pool()
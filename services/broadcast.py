@@ -0,0 +1,198 @@
+import asyncio
+import os
+import time
+from datetime import timedelta
+
+import httpx
+from dotenv import load_dotenv
+from telegram.error import RetryAfter, TimedOut, NetworkError, Forbidden, BadRequest
+
+
+load_dotenv()
+
+# Сколько сообщений отправляется одновременно
+BROADCAST_WORKERS = int(os.getenv("BROADCAST_WORKERS", 10))
+# Глобальный лимит Telegram ~30 msg/s на бота, берём с запасом
+BROADCAST_GLOBAL_RATE = float(os.getenv("BROADCAST_GLOBAL_RATE", 25))
+# Не чаще одного сообщения в секунду в один чат
+BROADCAST_PER_CHAT_INTERVAL = float(os.getenv("BROADCAST_PER_CHAT_INTERVAL", 1.0))
+# Сколько раз повторять отправку при RetryAfter / ошибках соединения до отправки запроса
+BROADCAST_MAX_RETRIES = int(os.getenv("BROADCAST_MAX_RETRIES", 3))
+
+# Ошибки httpx, после которых запрос точно не ушёл в Telegram: соединение не установлено
+# или не дождались свободного соединения в пуле — повтор не задублирует сообщение
+_NOT_SENT_ERRORS = (httpx.ConnectError, httpx.ConnectTimeout, httpx.PoolTimeout)
+
+
+class _RateLimiter:
+    """
+    Лимиты одного бота: общий поток сообщений (token bucket) и интервал на чат.
+    Один экземпляр на токен бота, чтобы параллельные рассылки делили лимит.
+    """
+
+    def __init__(self, rate: float, per_chat_interval: float):
+        self.rate = rate
+        self.per_chat_interval = per_chat_interval
+        self._tokens = rate
+        self._updated = time.monotonic()
+        self._lock = asyncio.Lock()
+        self._paused_until = 0.0      # после RetryAfter ждут все воркеры
+        self._chat_next = {}          # chat_id -> когда можно писать снова
+
+    def pause(self, seconds: float):
+        self._paused_until = max(self._paused_until, time.monotonic() + seconds)
+
+    async def _wait_global(self):
+        while True:
+            async with self._lock:
+                now = time.monotonic()
+                if now < self._paused_until:
+                    delay = self._paused_until - now
+                else:
+                    self._tokens = min(self.rate, self._tokens + (now - self._updated) * self.rate)
+                    self._updated = now
+                    if self._tokens >= 1:
+                        self._tokens -= 1
+                        return
+                    delay = (1 - self._tokens) / self.rate
+            await asyncio.sleep(delay)
+
+    async def _wait_chat(self, chat_id):
+        now = time.monotonic()
+        next_at = self._chat_next.get(chat_id, 0.0)
+        # резервируем слот сразу, чтобы два воркера не писали в чат одновременно
+        self._chat_next[chat_id] = max(now, next_at) + self.per_chat_interval
+        if next_at > now:
+            await asyncio.sleep(next_at - now)
+
+        # не даём словарю расти бесконечно
+        if len(self._chat_next) > 10000:
+            for cid, ts in list(self._chat_next.items()):
+                if ts < now:
+                    del self._chat_next[cid]
+
+    async def wait(self, chat_id):
+        await self._wait_chat(chat_id)
+        await self._wait_global()
+
+
+_limiters = {}
+
+
+def _get_limiter(bot) -> _RateLimiter:
+    limiter = _limiters.get(bot.token)
+    if limiter is None:
+        limiter = _limiters[bot.token] = _RateLimiter(BROADCAST_GLOBAL_RATE, BROADCAST_PER_CHAT_INTERVAL)
+    return limiter
+
+
+def _not_sent(e: NetworkError) -> bool:
+    # PTB заворачивает исключение httpx в NetworkError / TimedOut через raise ... from
+    return isinstance(e.__cause__, _NOT_SENT_ERRORS)
+
+
+def _retry_after_seconds(e: RetryAfter) -> float:
+    value = e.retry_after
+    if isinstance(value, timedelta):
+        return value.total_seconds()
+    return float(value)
+
+
+async def send_limited(bot, message: dict, stats: dict = None):
+    """
+    Отправляет одно сообщение с учётом лимитов.
+    message: {"chat_id": ..., "method": "send_message" | "send_photo" | ..., остальные kwargs метода}
+    Возвращает отправленное сообщение (или True) при успехе, False — если не доставлено
+    или доставка не подтверждена (такое не повторяем); ошибки не пробрасывает.
+    """
+    kwargs = dict(message)
+    method = getattr(bot, kwargs.pop("method", "send_message"))
+    chat_id = kwargs["chat_id"]
+    limiter = _get_limiter(bot)
+
+    for attempt in range(BROADCAST_MAX_RETRIES + 1):
+        await limiter.wait(chat_id)
+        try:
+            result = await method(**kwargs)
+            if stats is not None:
+                stats["sent"] += 1
+            return result or True
+        except RetryAfter as e:
+            delay = _retry_after_seconds(e)
+            limiter.pause(delay)
+            if stats is not None:
+                stats["retry_after"] += 1
+            print(f"[BROADCAST] RetryAfter {delay} сек (chat {chat_id}, попытка {attempt + 1})")
+        except (Forbidden, BadRequest) as e:
+            # бот заблокирован / чат не найден — повторять бессмысленно
+            if stats is not None:
+                stats["failed"] += 1
+                stats["rejected"] += 1
+            print(f"[BROADCAST] {chat_id} → {e}")
+            return False
+        except (TimedOut, NetworkError) as e:
+            if not _not_sent(e):
+                # таймаут чтения, обрыв после отправки, 5xx: сообщение могло дойти — повтор
+                # продублировал бы его (и новую кнопку «Я оплатил», и загрузку фото)
+                if stats is not None:
+                    stats["failed"] += 1
+                    stats["uncertain"] += 1
+                print(f"[BROADCAST] {chat_id} → {e!r}: доставка не подтверждена, не повторяем")
+                return False
+            delay = 2 ** attempt
+            if stats is not None:
+                stats["retried"] += 1
+            print(f"[BROADCAST] сетевая ошибка для {chat_id}: {e}, повтор через {delay} сек")
+            await asyncio.sleep(delay)
+        except Exception as e:
+            if stats is not None:
+                stats["failed"] += 1
+            print(f"[BROADCAST] {chat_id} → {e}")
+            return False
+
+    if stats is not None:
+        stats["failed"] += 1
+    print(f"[BROADCAST] {chat_id} → не доставлено после {BROADCAST_MAX_RETRIES} повторов")
+    return False
+
+
+async def broadcast(bot, messages, label: str = "broadcast", workers: int = None) -> dict:
+    """
+    Рассылает сообщения пулом воркеров, соблюдая лимиты Telegram.
+    messages — список словарей для send_limited.
+    Возвращает статистику прогона: total / sent / failed / rejected / uncertain / retried / retry_after / duration.
+    uncertain — входят в failed, но могли быть доставлены (таймаут после отправки).
+    """
+    messages = list(messages)
+    stats = {
+        "total": len(messages),
+        "sent": 0,
+        "failed": 0,
+        "rejected": 0,
+        "uncertain": 0,
+        "retried": 0,
+        "retry_after": 0,
+        "duration": 0.0,
+    }
+    if not messages:
+        return stats
+
+    started = time.monotonic()
+    queue = asyncio.Queue()
+    for message in messages:
+        queue.put_nowait(message)
+
+    async def worker():
+        while True:
+            try:
+                message = queue.get_nowait()
+            except asyncio.QueueEmpty:
+                return
+            await send_limited(bot, message, stats)
+
+    workers = min(workers or BROADCAST_WORKERS, len(messages))
+    await asyncio.gather(*(worker() for _ in range(workers)))
+
+    stats["duration"] = round(time.monotonic() - started, 2)
+    print(f"[BROADCAST] {label}: {stats}")
+    return stats
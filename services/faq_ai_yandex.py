@@ -1,75 +1,146 @@
-import os
-import requests
+import asyncio
 import json
+import os
+import time
+from typing import AsyncIterator
+
+import httpx
 from dotenv import load_dotenv
 
+from integrations.http_clients import get_async_client
+from services.faq_cache import faq_answer_cache
+
 load_dotenv()
 
 YANDEX_API_KEY = os.getenv("YANDEX_API_KEY")
 YANDEX_FOLDER_ID = os.getenv("YANDEX_FOLDER_ID")
 
-def ask_yandex_gpt(question: str) -> str:
-    url = "https://llm.api.cloud.yandex.net/foundationModels/v1/completion"
+COMPLETION_PATH = "/foundationModels/v1/completion"
+# Сколько запросов к YandexGPT выполняется одновременно; остальные ждут
+YANDEX_GPT_MAX_CONCURRENCY = int(os.getenv("YANDEX_GPT_MAX_CONCURRENCY", 4))
+# Сколько ждать свободное место, прежде чем ответить «попробуйте позже» (сек)
+YANDEX_GPT_QUEUE_TIMEOUT = float(os.getenv("YANDEX_GPT_QUEUE_TIMEOUT", 15))
+
+ERROR_ANSWER = "Ошибка при запросе к YandexGPT. Попробуйте позже."
+BUSY_ANSWER = "Сейчас много вопросов, попробуйте ещё раз через минуту."
+
+SYSTEM_PROMPT = (
+    "Ты — дружелюбный Telegram-бот компании Ibilsh, которая сдает электроскутеры в аренду. "
+    "Ты помогаешь пользователям по вопросам аренды, оплаты, ремонта и выкупа электроскутеров. "
+    "В конце каждого своего ответа аккуратно прописывай, что для того чтобы выйти из режима общения с тобой — пользователю надо прописать /start. "
+    "Пропиши это сообщение с переносом на две строки. "
+    "Всегда отвечай кратко, понятно и по делу. Если не знаешь ответа — вежливо скажи, что не можешь помочь. "
+    "Обязательно поздоровайся при первом ответе пользователю, но не повторяй приветствие в каждом сообщении. "
+    "\n\nТарифы:\n— аренда без выкупа: 2.000₽ в неделю\n— аренда с выкупом: 3.000₽ в неделю, срок ~12 месяцев\n"
+    "— при оформлении можно выбрать 1 или 2 аккумулятора (при выкупе — только 1 АКБ). "
+    "\n\nРемонт:\n— если человек арендует электровелосипед Ibilsh, ремонт бесплатный, если поломка не по вине клиента. Обязательно укажи то, что ремонт бесплатный если человек арендует электровелосипед у Ibilsh! "
+    "— если поломка спорная или не связана с арендой, дружелюбно объясни, что каждый случай рассматривается индивидуально. "
+    "— напомни, что заявку на ремонт можно оставить через кнопку «Необходим ремонт» в главном меню бота. "
+    "\n\nОплата:\n— вносится каждую пятницу. Можно оплатить сразу за 2–3 недели вперёд или перенести платеж с доплатой. "
+    "\n\nЕсли вопрос не по теме — ответь вежливо и дай понять, что бот предназначен только для помощи по аренде, оплате, ремонту и выкупу."
+)
+
 
-    headers = {
+class YandexGPTError(RuntimeError):
+    """Ответ от YandexGPT не получен; текст исключения можно показать пользователю."""
+
+
+_slots = None
+
+
+def _get_slots() -> asyncio.Semaphore:
+    global _slots
+    if _slots is None:
+        _slots = asyncio.Semaphore(YANDEX_GPT_MAX_CONCURRENCY)
+    return _slots
+
+
+def _headers() -> dict:
+    return {
         "Authorization": f"Api-Key {YANDEX_API_KEY}",
         "Content-Type": "application/json"
     }
 
-    payload = {
-    "modelUri": f"gpt://{YANDEX_FOLDER_ID}/yandexgpt-lite/latest",
-    "completionOptions": {
-        "stream": False,
-        "temperature": 0.4,
-        "maxTokens": 200
-    },
-    "messages": [
-        {
-            "role": "system",
-            "text": (
-                "Ты — дружелюбный Telegram-бот компании Ibilsh, которая сдает электроскутеры в аренду. "
-                "Ты помогаешь пользователям по вопросам аренды, оплаты, ремонта и выкупа электроскутеров. "
-                "В конце каждого своего ответа аккуратно прописывай, что для того чтобы выйти из режима общения с тобой — пользователю надо прописать /start. "
-                "Пропиши это сообщение с переносом на две строки. "
-                "Всегда отвечай кратко, понятно и по делу. Если не знаешь ответа — вежливо скажи, что не можешь помочь. "
-                "Обязательно поздоровайся при первом ответе пользователю, но не повторяй приветствие в каждом сообщении. "
-                "\n\nТарифы:\n— аренда без выкупа: 2.000₽ в неделю\n— аренда с выкупом: 3.000₽ в неделю, срок ~12 месяцев\n"
-                "— при оформлении можно выбрать 1 или 2 аккумулятора (при выкупе — только 1 АКБ). "
-                "\n\nРемонт:\n— если человек арендует электровелосипед Ibilsh, ремонт бесплатный, если поломка не по вине клиента. Обязательно укажи то, что ремонт бесплатный если человек арендует электровелосипед у Ibilsh! "
-                "— если поломка спорная или не связана с арендой, дружелюбно объясни, что каждый случай рассматривается индивидуально. "
-                "— напомни, что заявку на ремонт можно оставить через кнопку «Необходим ремонт» в главном меню бота. "
-                "\n\nОплата:\n— вносится каждую пятницу. Можно оплатить сразу за 2–3 недели вперёд или перенести платеж с доплатой. "
-                "\n\nЕсли вопрос не по теме — ответь вежливо и дай понять, что бот предназначен только для помощи по аренде, оплате, ремонту и выкупу."
-            )
+
+def _payload(question: str, stream: bool) -> dict:
+    return {
+        "modelUri": f"gpt://{YANDEX_FOLDER_ID}/yandexgpt-lite/latest",
+        "completionOptions": {
+            "stream": stream,
+            "temperature": 0.4,
+            "maxTokens": 200
         },
-        {"role": "user", "text": question}
-    ]
-}
+        "messages": [
+            {"role": "system", "text": SYSTEM_PROMPT},
+            {"role": "user", "text": question}
+        ]
+    }
+
+
+def _extract_text(data: dict):
+    try:
+        return data["result"]["alternatives"][0]["message"]["text"]
+    except (KeyError, IndexError, TypeError):
+        return None
+
+
+async def _acquire_slot():
+    try:
+        await asyncio.wait_for(_get_slots().acquire(), timeout=YANDEX_GPT_QUEUE_TIMEOUT)
+    except asyncio.TimeoutError:
+        raise YandexGPTError(BUSY_ANSWER)
+
+
+async def stream_yandex_gpt(question: str) -> AsyncIterator[str]:
+    """
+    Потоковый ответ: отдаёт текст ответа по мере генерации (каждый раз — весь текст на данный момент).
+    При ошибке — YandexGPTError с сообщением для пользователя.
+    """
+    await _acquire_slot()
+    started = time.monotonic()
+    text = ""
     try:
-        print("📤 Отправляем в YandexGPT:")
-        print(json.dumps(payload, indent=2, ensure_ascii=False))
-
-        response = requests.post(url, headers=headers, json=payload)
-
-        if not response.ok:
-            print(f"🔴 Ответ от Yandex: {response.status_code} — {response.text}")
-            return "Не удалось получить ответ от YandexGPT. Попробуйте позже."
-
-        data = response.json()
-
-        if (
-            "result" in data and
-            "alternatives" in data["result"] and
-            len(data["result"]["alternatives"]) > 0 and
-            "message" in data["result"]["alternatives"][0] and
-            "text" in data["result"]["alternatives"][0]["message"]
-        ):
-            return data["result"]["alternatives"][0]["message"]["text"]
-        else:
-            print("⚠️ Ответ не содержит ожидаемых полей:")
-            print(json.dumps(data, indent=2, ensure_ascii=False))
-            return "Ответ от YandexGPT был получен, но в неожиданном формате."
-
-    except Exception as e:
-        print("YandexGPT error:", e)
-        return "Ошибка при запросе к YandexGPT. Попробуйте позже."
+        client = get_async_client("yandex_gpt")
+        async with client.stream("POST", COMPLETION_PATH, headers=_headers(), json=_payload(question, stream=True)) as response:
+            if response.status_code != 200:
+                body = (await response.aread()).decode("utf-8", "replace")
+                print(f"🔴 Ответ от Yandex: {response.status_code} — {body[:500]}")
+                raise YandexGPTError("Не удалось получить ответ от YandexGPT. Попробуйте позже.")
+
+            # ответ — JSON-объекты по одному на строку, в каждом весь текст на текущий момент
+            async for line in response.aiter_lines():
+                if not line.strip():
+                    continue
+                try:
+                    chunk = _extract_text(json.loads(line))
+                except json.JSONDecodeError:
+                    continue
+                if not chunk:
+                    continue
+                text = chunk if chunk.startswith(text) else text + chunk
+                yield text
+    except httpx.HTTPError as e:
+        print(f"[FAQ] YandexGPT error: {e!r}")
+        raise YandexGPTError(ERROR_ANSWER) from e
+    finally:
+        _get_slots().release()
+        print(f"[FAQ] YandexGPT stream: {len(text)} симв. за {time.monotonic() - started:.1f} сек")
+
+    if not text:
+        raise YandexGPTError("Ответ от YandexGPT был получен, но в неожиданном формате.")
+
+
+async def stream_faq_answer(question: str) -> AsyncIterator[str]:
+    """
+    Ответ на вопрос FAQ: из кэша, если такой (или очень похожий) вопрос уже задавали,
+    иначе — потоком из YandexGPT, и готовый ответ кладётся в кэш.
+    """
+    cached = faq_answer_cache.get(question)
+    if cached is not None:
+        yield cached
+        return
+
+    answer = ""
+    async for answer in stream_yandex_gpt(question):
+        yield answer
+    faq_answer_cache.put(question, answer)
@@ -0,0 +1,118 @@
+import os
+import re
+import time
+from collections import OrderedDict
+from typing import Optional
+
+from dotenv import load_dotenv
+
+
+load_dotenv()
+
+# Сколько ответов держим в памяти
+FAQ_CACHE_SIZE = int(os.getenv("FAQ_CACHE_SIZE", 500))
+# Сколько живёт ответ (сек) — после правки промпта/тарифов старые ответы уйдут сами
+FAQ_CACHE_TTL = float(os.getenv("FAQ_CACHE_TTL", 24 * 3600))
+# Порог похожести вопросов (0..1) для нечёткого попадания; 0 — только точное совпадение (по умолчанию)
+FAQ_CACHE_SIMILARITY = float(os.getenv("FAQ_CACHE_SIMILARITY", 0))
+
+_PUNCT_RE = re.compile(r"[^\w\s]+")
+_SPACES_RE = re.compile(r"\s+")
+_DIGITS_RE = re.compile(r"\d+")
+# Слова, переворачивающие смысл вопроса: «можно ли с правами» ≠ «можно ли без прав»
+_NEGATIONS = frozenset({"не", "нет", "ни", "без", "нельзя"})
+
+
+def normalize_question(text: str) -> str:
+    """«Когда платить?!» и «когда  платить» — один и тот же ключ."""
+    text = (text or "").lower().replace("ё", "е")
+    text = _PUNCT_RE.sub(" ", text)
+    return _SPACES_RE.sub(" ", text).strip()
+
+
+def _trigrams(text: str) -> frozenset:
+    padded = f"  {text} "
+    return frozenset(padded[i:i + 3] for i in range(len(padded) - 2))
+
+
+def _meaning_marks(text: str) -> tuple:
+    """Числа и отрицания вопроса: при нечётком совпадении они должны быть одинаковыми."""
+    return frozenset(_DIGITS_RE.findall(text)), _NEGATIONS.intersection(text.split())
+
+
+class FAQAnswerCache:
+    """
+    Кэш ответов FAQ перед YandexGPT: ключ — нормализованный текст вопроса.
+    По умолчанию — только точное совпадение. С FAQ_CACHE_SIMILARITY > 0 ищем самый похожий вопрос
+    по триграммам (коэффициент Жаккара), но не отдаём чужой ответ, если у вопросов различаются
+    числа или отрицания («аренда на 2 недели» / «на 3 недели», «с правами» / «без прав»).
+    TTL + вытеснение самых давно использованных (LRU).
+    """
+
+    def __init__(self, size: int = FAQ_CACHE_SIZE, ttl: float = FAQ_CACHE_TTL,
+                 similarity: float = FAQ_CACHE_SIMILARITY):
+        self.size = size
+        self.ttl = ttl
+        self.similarity = similarity
+        self._items = OrderedDict()      # key -> (answer, trigrams, meaning_marks, expires_at)
+        self.stats = {"hits": 0, "similar_hits": 0, "misses": 0, "stored": 0, "evicted": 0, "expired": 0}
+
+    def _similar_key(self, grams: frozenset, marks: tuple, now: float) -> Optional[str]:
+        best_key, best_score = None, self.similarity
+        for key, (_, other, other_marks, expires_at) in self._items.items():
+            if expires_at <= now or not other or other_marks != marks:
+                continue
+            score = len(grams & other) / len(grams | other)
+            if score >= best_score:
+                best_key, best_score = key, score
+        return best_key
+
+    def get(self, question: str) -> Optional[str]:
+        key = normalize_question(question)
+        if not key:
+            return None
+        now = time.monotonic()
+
+        item = self._items.get(key)
+        if item is not None and item[3] <= now:
+            del self._items[key]
+            self.stats["expired"] += 1
+            item = None
+        if item is not None:
+            self._items.move_to_end(key)
+            self.stats["hits"] += 1
+            return item[0]
+
+        if self.similarity > 0:
+            similar = self._similar_key(_trigrams(key), _meaning_marks(key), now)
+            if similar is not None:
+                self._items.move_to_end(similar)
+                self.stats["similar_hits"] += 1
+                return self._items[similar][0]
+
+        self.stats["misses"] += 1
+        return None
+
+    def put(self, question: str, answer: str):
+        key = normalize_question(question)
+        if not key or not answer:
+            return
+        self._items[key] = (answer, _trigrams(key), _meaning_marks(key), time.monotonic() + self.ttl)
+        self._items.move_to_end(key)
+        self.stats["stored"] += 1
+        while len(self._items) > self.size:
+            self._items.popitem(last=False)
+            self.stats["evicted"] += 1
+
+    def clear(self):
+        self._items.clear()
+
+    def get_stats(self) -> dict:
+        stats = dict(self.stats)
+        lookups = stats["hits"] + stats["similar_hits"] + stats["misses"]
+        stats["size"] = len(self._items)
+        stats["hit_rate"] = round((stats["hits"] + stats["similar_hits"]) / lookups, 3) if lookups else 0.0
+        return stats
+
+
+faq_answer_cache = FAQAnswerCache()
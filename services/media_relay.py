@@ -0,0 +1,94 @@
+import asyncio
+import os
+from collections import OrderedDict
+
+from dotenv import load_dotenv
+from telegram.error import TelegramError
+
+from services.broadcast import broadcast, send_limited
+
+
+load_dotenv()
+
+# Сколько соответствий file_id «бот-источник → бот-получатель» держим в памяти
+MEDIA_RELAY_CACHE_SIZE = int(os.getenv("MEDIA_RELAY_CACHE_SIZE", 2000))
+
+
+class PhotoRelay:
+    """
+    Пересылка фото между ботами: file_id одного бота не работает у другого,
+    поэтому фото один раз скачивается source_bot в память и один раз загружается target_bot.
+    Полученный у target_bot file_id кэшируется — остальным получателям (и при повторной
+    отправке той же заявки) уходит уже file_id, без скачивания и загрузки.
+    """
+
+    def __init__(self, source_bot, target_bot, cache_size: int = MEDIA_RELAY_CACHE_SIZE):
+        self.source_bot = source_bot
+        self.target_bot = target_bot
+        self.cache_size = cache_size
+        self._cache = OrderedDict()      # source file_id -> target file_id
+        self._locks = {}                 # source file_id -> asyncio.Lock, чтобы не грузить одно фото дважды
+        self.stats = {"hits": 0, "downloads": 0, "uploads": 0, "failed": 0}
+
+    def _remember(self, source_id: str, target_id: str):
+        self._cache[source_id] = target_id
+        self._cache.move_to_end(source_id)
+        while len(self._cache) > self.cache_size:
+            self._cache.popitem(last=False)
+
+    async def _download(self, source_id: str) -> bytes:
+        tg_file = await self.source_bot.get_file(source_id)
+        data = await tg_file.download_as_bytearray()
+        self.stats["downloads"] += 1
+        return bytes(data)
+
+    async def send(self, source_id: str, messages: list, label: str = "relay") -> bool:
+        """
+        messages — словари для send_limited без "photo" (chat_id, caption, parse_mode, reply_markup...).
+        Возвращает False, если фото не удалось получить/загрузить — тогда вызывающий шлёт текст.
+        """
+        messages = [dict(m, method="send_photo") for m in messages]
+        if not messages:
+            return True
+
+        target_id = self._cache.get(source_id)
+        if target_id is None:
+            lock = self._locks.setdefault(source_id, asyncio.Lock())
+            try:
+                async with lock:
+                    target_id = self._cache.get(source_id)
+                    if target_id is None:
+                        target_id, messages = await self._upload(source_id, messages)
+            finally:
+                if not lock.locked():
+                    self._locks.pop(source_id, None)
+            if target_id is None:
+                return False
+        else:
+            self._cache.move_to_end(source_id)
+            self.stats["hits"] += 1
+
+        if messages:
+            await broadcast(self.target_bot, [dict(m, photo=target_id) for m in messages], label=label)
+        return True
+
+    async def _upload(self, source_id: str, messages: list):
+        """Скачивает фото и отправляет байты первому, кому удалось доставить. Возвращает (file_id, оставшиеся)."""
+        try:
+            data = await self._download(source_id)
+        except TelegramError as e:
+            self.stats["failed"] += 1
+            print(f"[RELAY] не удалось скачать фото {source_id}: {e}")
+            return None, messages
+
+        for idx, message in enumerate(messages):
+            sent = await send_limited(self.target_bot, dict(message, photo=data))
+            if sent and getattr(sent, "photo", None):
+                self.stats["uploads"] += 1
+                target_id = sent.photo[-1].file_id
+                self._remember(source_id, target_id)
+                return target_id, messages[idx + 1:]
+
+        self.stats["failed"] += 1
+        print(f"[RELAY] фото {source_id} не доставлено ни одному получателю")
+        return None, messages
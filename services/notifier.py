@@ -1,12 +1,11 @@
 import os
-import aiofiles
-import aiohttp
 from dotenv import load_dotenv
-from telegram import Bot, InlineKeyboardMarkup, InlineKeyboardButton, InputFile
-from telegram.error import TelegramError
+from telegram import Bot, InlineKeyboardMarkup, InlineKeyboardButton
 
-from database.users import get_user_info
-from database.admins import get_all_admins
+from database.users import get_user_info_async
+from database.admins import get_all_admins_async
+from services.broadcast import broadcast
+from services.media_relay import PhotoRelay
 
 
 load_dotenv()
@@ -14,8 +13,11 @@ load_dotenv()
 NOTIFIER_BOT = Bot(token=os.getenv("NOTIFIER_TOKEN"))
 MAIN_BOT = Bot(token=os.getenv("BOT_TOKEN"))
 
+# Фото заявок приходят в главный бот, а уходят через бота-уведомителя
+repair_photo_relay = PhotoRelay(MAIN_BOT, NOTIFIER_BOT)
+
 async def notify_admin_about_new_repair(data: dict):
-    admin_ids = [a["tg_id"] for a in get_all_admins()]
+    admin_ids = [a["tg_id"] for a in await get_all_admins_async()]
 
     # Формирование текста заявки
     if data.get("is_short"):
@@ -45,42 +47,24 @@ async def notify_admin_about_new_repair(data: dict):
             f"🆔 <code>{data['tg_id']}</code>"
         )
 
-    # Работа с фото (если есть)
+    # Работа с фото (если есть): одна загрузка на всех админов, дальше — file_id
     file_id = data.get("photo_file_id")
     if file_id:
-        try:
-            tg_file = await MAIN_BOT.get_file(file_id)
-            file_url = tg_file.file_path
-
-            async with aiohttp.ClientSession() as session:
-                async with session.get(file_url) as response:
-                    if response.status == 200:
-                        os.makedirs("temp", exist_ok=True)
-                        temp_path = os.path.join("temp", f"repair_photo_{data['tg_id']}.jpg")
-                        async with aiofiles.open(temp_path, 'wb') as f:
-                            await f.write(await response.read())
-
-                        with open(temp_path, 'rb') as photo:
-                             for admin_id in admin_ids:
-                                await NOTIFIER_BOT.send_photo(
-                                    chat_id=admin_id,
-                                    photo=InputFile(photo),
-                                    caption=text,
-                                    parse_mode="HTML"
-                            )
-                        os.remove(temp_path)
-                        return
-        except TelegramError as e:
-            print("❌ Ошибка при передаче фото:", e)
+        sent = await repair_photo_relay.send(file_id, [
+            {"chat_id": admin_id, "caption": text, "parse_mode": "HTML"} for admin_id in admin_ids
+        ], label="admins:new_repair")
+        if sent:
+            return
 
     # Без фото — просто текст
-    for admin_id in admin_ids:
-        await NOTIFIER_BOT.send_message(chat_id=admin_id, text=text, parse_mode="HTML")
+    await broadcast(NOTIFIER_BOT, [
+        {"chat_id": admin_id, "text": text, "parse_mode": "HTML"} for admin_id in admin_ids
+    ], label="admins:new_repair")
 
 
 #Заявка на вело
 async def notify_admin_about_new_client(data: dict):
-    admin_ids = [a["tg_id"] for a in get_all_admins()]
+    admin_ids = [a["tg_id"] for a in await get_all_admins_async()]
 
     text = (
         f"⚠️ <b>Внимание, поступила заявка на скутер</b>\n\n"
@@ -92,12 +76,9 @@ async def notify_admin_about_new_client(data: dict):
         f"🆔 <code>{data['tg_id']}</code>\n\n"
         f"❗ После выдачи скутера не забудьте оформить данные нового пользователя в главном боте Ibilsh."
     )
-    for admin_id in admin_ids:
-        await NOTIFIER_BOT.send_message(
-            chat_id=admin_id,
-            text=text,
-            parse_mode="HTML"
-        )
+    await broadcast(NOTIFIER_BOT, [
+        {"chat_id": admin_id, "text": text, "parse_mode": "HTML"} for admin_id in admin_ids
+    ], label="admins:new_client")
 
 
 # Отправка заявки на ремонт мастеру
@@ -117,30 +98,11 @@ async def send_repair_to_master(master_id: int, repair: dict):
 
     file_id = repair.get("photo_file_id")
     if file_id:
-        try:
-            os.makedirs("temp", exist_ok=True)
-            tg_file = await MAIN_BOT.get_file(file_id)
-            file_url = tg_file.file_path
-            temp_path = os.path.join("temp", f"repair_to_master_{repair['tg_id']}.jpg")
-
-            async with aiohttp.ClientSession() as session:
-                async with session.get(file_url) as response:
-                    if response.status == 200:
-                        async with aiofiles.open(temp_path, 'wb') as f:
-                            await f.write(await response.read())
-
-                        with open(temp_path, 'rb') as photo:
-                            await NOTIFIER_BOT.send_photo(
-                                chat_id=master_id,
-                                photo=InputFile(photo),
-                                caption=text,
-                                parse_mode="HTML",
-                                reply_markup=keyboard
-                            )
-                        os.remove(temp_path)
-                        return
-        except Exception as e:
-            print("❌ Ошибка при отправке фото мастеру:", e)
+        sent = await repair_photo_relay.send(file_id, [
+            {"chat_id": master_id, "caption": text, "parse_mode": "HTML", "reply_markup": keyboard}
+        ], label="master:repair")
+        if sent:
+            return
 
     # если фото нет или ошибка — отправить только текст
     await NOTIFIER_BOT.send_message(
@@ -153,8 +115,8 @@ async def send_repair_to_master(master_id: int, repair: dict):
 
 async def notify_admin_about_postpone(tg_id: int, full_name: str, original_date, scheduled_date, with_fine: bool, fine_amount: int, vin: str):
     
-    admin_ids = [a["tg_id"] for a in get_all_admins()]
-    user_info = get_user_info(tg_id)
+    admin_ids = [a["tg_id"] for a in await get_all_admins_async()]
+    user_info = await get_user_info_async(tg_id)
 
     fine_text = f"⚠️ Со штрафом: +{fine_amount}₽" if with_fine else "✅ Без штрафа"
 
@@ -166,6 +128,6 @@ async def notify_admin_about_postpone(tg_id: int, full_name: str, original_date,
         f"📅 {original_date.strftime('%d.%m.%Y')} → {scheduled_date.strftime('%d.%m.%Y')}\n"
         f"{fine_text}"
     )
-    for admin_id in admin_ids:
-
-        await NOTIFIER_BOT.send_message(admin_id, text, parse_mode="HTML")
+    await broadcast(NOTIFIER_BOT, [
+        {"chat_id": admin_id, "text": text, "parse_mode": "HTML"} for admin_id in admin_ids
+    ], label="admins:postpone")
@@ -0,0 +1,72 @@
+import os
+import uuid
+from datetime import timedelta
+
+from dotenv import load_dotenv
+
+from database.payment_confirm import (
+    save_payment_confirm_keys_async, claim_payment_confirm_key_async,
+    purge_expired_payment_confirm_keys_async
+)
+
+
+load_dotenv()
+
+# Сколько живёт кнопка «✅ Я оплатил»
+PAYMENT_CONFIRM_TTL_DAYS = int(os.getenv("PAYMENT_CONFIRM_TTL_DAYS", 14))
+# Сколько раз перегенерировать ключ, если он уже занят
+PAYMENT_CONFIRM_KEY_ATTEMPTS = 5
+
+
+class PaymentConfirmRegistry:
+    """
+    Ключи кнопки «✅ Я оплатил» → id платежей.
+    Источник правды — таблица payment_confirm_keys (переживает рестарт и общая для всех процессов).
+    Ключ выдаёт сам реестр и никогда не перезаписывает занятый. Использовать ключ можно один раз:
+    claim() удаляет его и возвращает платежи одним запросом, поэтому повторное нажатие —
+    в том же или другом процессе — ничего не получит. Неиспользованные ключи удаляются по TTL.
+    """
+
+    def __init__(self, ttl_days: int = PAYMENT_CONFIRM_TTL_DAYS):
+        self.ttl = timedelta(days=ttl_days)
+
+    @staticmethod
+    def new_key() -> str:
+        # 32 hex-символа: вместе с "confirm_payment:" укладывается в 64 байта callback_data
+        return uuid.uuid4().hex
+
+    async def put(self, payment_ids: list) -> str:
+        """Сохранить id платежей под новым ключом и вернуть ключ для callback_data."""
+        return (await self.put_many([payment_ids]))[0]
+
+    async def put_many(self, groups: list) -> list:
+        """groups = [payment_ids, ...] — сохраняется одним запросом, возвращает ключи в том же порядке."""
+        keys = [None] * len(groups)
+        pending = list(range(len(groups)))
+        for _ in range(PAYMENT_CONFIRM_KEY_ATTEMPTS):
+            if not pending:
+                return keys
+            items = [(self.new_key(), groups[i]) for i in pending]
+            inserted = await save_payment_confirm_keys_async(items, self.ttl)
+            retry = []
+            for i, (key, _) in zip(pending, items):
+                if key in inserted:
+                    keys[i] = key
+                else:
+                    retry.append(i)
+            pending = retry
+        if pending:
+            raise RuntimeError(f"не удалось выдать уникальный ключ подтверждения оплаты ({len(pending)} шт.)")
+        return keys
+
+    async def claim(self, key: str):
+        """id платежей ключа (ключ при этом удаляется) или None, если ключ уже использован или истёк."""
+        return await claim_payment_confirm_key_async(key)
+
+    async def purge_expired(self) -> int:
+        deleted = await purge_expired_payment_confirm_keys_async()
+        print(f"[CONFIRM] удалено истёкших ключей: {deleted}")
+        return deleted
+
+
+payment_confirm_registry = PaymentConfirmRegistry()
@@ -1,5 +1,7 @@
 import os
-from cryptography.fernet import Fernet
+from functools import lru_cache
+
+from cryptography.fernet import Fernet, InvalidToken
 
 # Берём ключ из .env
 key = os.getenv("FILE_ID_KEY")
@@ -8,14 +10,54 @@ if not key:
 
 fernet = Fernet(key.encode())
 
+# Метка зашифрованного значения в БД: "fernet:<токен>"; без метки — старые значения
+ENC_PREFIX = "fernet:"
+# Старые зашифрованные значения без метки: токен Fernet начинается с версии 0x80 → "gAAAAA"
+_LEGACY_TOKEN_PREFIX = "gAAAAA"
+# Сколько расшифрованных file_id держим в памяти
+FILE_ID_CACHE_SIZE = int(os.getenv("FILE_ID_CACHE_SIZE", 4096))
+
+
 def encrypt_file_id(file_id: str) -> str:
     """Шифрует file_id перед сохранением в БД"""
-    return fernet.encrypt(file_id.encode()).decode()
+    return ENC_PREFIX + fernet.encrypt(file_id.encode()).decode()
+
+
+@lru_cache(maxsize=FILE_ID_CACHE_SIZE)
+def _decrypt_token(token: str) -> str:
+    # HMAC + AES на каждый показ карточки дорого, а одни и те же фото открываются постоянно
+    return fernet.decrypt(token.encode()).decode()
+
 
 def decrypt_file_id(encrypted_file_id: str) -> str:
     """Расшифровывает file_id перед отправкой в Telegram"""
+    if not encrypted_file_id:
+        return encrypted_file_id
+    if encrypted_file_id.startswith(ENC_PREFIX):
+        token = encrypted_file_id[len(ENC_PREFIX):]
+    elif encrypted_file_id.startswith(_LEGACY_TOKEN_PREFIX):
+        token = encrypted_file_id
+    else:
+        # незашифрованное старое значение — это и есть file_id
+        return encrypted_file_id
     try:
-        return fernet.decrypt(encrypted_file_id.encode()).decode()
-    except Exception:
-        # Если данные не были зашифрованы — возвращаем как есть
-        return encrypted_file_id
\ No newline at end of file
+        return _decrypt_token(token)
+    except InvalidToken:
+        print("[ENC] не удалось расшифровать file_id (другой ключ?)")
+        return encrypted_file_id
+
+
+def decrypt_file_ids(values) -> list:
+    """Пакетная расшифровка (пустые значения остаются как есть)."""
+    return [decrypt_file_id(v) for v in values]
+
+
+def get_file_id_cache_stats() -> dict:
+    info = _decrypt_token.cache_info()
+    lookups = info.hits + info.misses
+    return {
+        "hits": info.hits,
+        "misses": info.misses,
+        "size": info.currsize,
+        "hit_rate": round(info.hits / lookups, 3) if lookups else 0.0,
+    }
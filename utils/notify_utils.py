@@ -1,17 +1,11 @@
 from telegram import Bot, InlineKeyboardButton, InlineKeyboardMarkup
-from database.db import get_connection
-from database.clients import get_all_clients
-from database.scooters import get_scooters_by_client
-from database.payments import get_payments_by_scooter
-from database.postpone import get_active_postpones, close_postpone
+from database.payments import get_payment_notification_candidates_async
+from services.broadcast import broadcast
+from utils.confirm_registry import payment_confirm_registry
 from utils.time_utils import get_today
-import uuid
 
 
 
-
-payment_confirm_registry = {}
-
 # Основная функция уведомления по текущей дате
 def format_payment_instruction_block(total_amount: int) -> str:
     return (
@@ -23,85 +17,77 @@ def format_payment_instruction_block(total_amount: int) -> str:
         f"⚠️ Без выполнения всех трёх шагов платёж <b>не будет засчитан</b>."
     )
 
-async def send_payment_notifications_with_button(bot: Bot, severity: str = "debug"):
+def group_notification_candidates(rows, today):
+    """
+    Один проход по строкам get_payment_notification_candidates.
+    Возвращает клиентов в порядке выборки:
+    {"tg_id", "full_name", "overdue": [(scooter, payment)], "postponed": [(scooter, payment, postpone)], "normal": [(scooter, payment)]}
+    Просрочки, по дате которых есть активный перенос, сюда не попадают.
+    """
+    clients = {}
+    for row in rows:
+        (client_id, tg_id, full_name,
+         scooter_id, model, weekly_price,
+         pid, pay_date, amount,
+         orig_date, sched_date, with_fine, fine_amount,
+         covered_by_postpone) = row
+
+        client = clients.get(client_id)
+        if client is None:
+            client = clients[client_id] = {
+                "tg_id": tg_id,
+                "full_name": full_name,
+                "overdue": [],
+                "postponed": [],
+                "normal": [],
+            }
+
+        scooter = {"id": scooter_id, "model": model, "weekly_price": weekly_price}
+        payment = (pid, pay_date, amount)
+
+        # Просрочка
+        if pay_date < today:
+            if not covered_by_postpone:
+                client["overdue"].append((scooter, payment))
+        # Сегодня (перенос или обычная оплата)
+        elif sched_date is not None:
+            client["postponed"].append((scooter, payment, (orig_date, sched_date, with_fine, fine_amount)))
+        else:
+            client["normal"].append((scooter, payment))
+
+    return list(clients.values())
+
+
+# client_ids — разослать только этим клиентам (их выбирает utils/reminder_planner.py), None — всем
+async def send_payment_notifications_with_button(bot: Bot, severity: str = "debug", client_ids: list = None):
     today = get_today()
     print(f"\n=== ▶️ ЗАПУСК УВЕДОМЛЕНИЙ ({severity.upper()}) | TODAY: {today} ===")
 
-    clients = get_all_clients()
-    print(f"👥 Найдено клиентов: {len(clients)}")
-
-    for client in clients:
-        tg_id = client['telegram_id']
-        client_id = client['id']
-        print(f"\n🔍 Клиент: {client['full_name']} (id={client_id})")
-
-        scooters = get_scooters_by_client(client_id)
-        print(f"🛵 Скутеров у клиента: {len(scooters)}")
-
-        overdue = []
-        postponed = []
-        normal_payments = []
-
-        # === Собираем платежи по каждому скутеру ===
-        for scooter in scooters:
-            scooter_id = scooter['id']
-            payments = get_payments_by_scooter(scooter_id)
-            postpones = get_active_postpones(scooter_id)
-
-            skip_dates = {p[0] for p in postpones}        # original_date
-            notify_dates = {p[1] for p in postpones}      # scheduled_date
-
-            print(f"📜 Скутер {scooter['model']} → платежей: {len(payments)}, переносов: {len(postpones)}")
-
-            for p in payments:
-                pid, pay_date, amount, is_paid, _ = p
-                print(f"   💵 Платёж {pid} | Дата: {pay_date} | Сумма: {amount} | Оплачен: {is_paid}")
-
-                if is_paid:
-                    continue
+    # Один запрос на весь прогон вместо запросов по каждому клиенту и скутеру
+    rows = await get_payment_notification_candidates_async(today, client_ids)
+    clients = group_notification_candidates(rows, today)
+    print(f"👥 Клиентов с неоплаченными платежами: {len(clients)} (платежей: {len(rows)})")
 
-                # Просрочка
-                if pay_date < today:
-                    overdue.append((scooter, p))
-                    print(f"     ⚠️ Помечен как ПРОСРОЧКА")
+    # Сначала собираем все сообщения, потом отправляем одной рассылкой с лимитами Telegram
+    messages = []
+    confirm_groups = []          # id платежей кнопки «Я оплатил» — по одной на сообщение
 
-                # Сегодня (перенос или обычная оплата)
-                elif pay_date == today:
-                    postpone = next((post for post in postpones if post[1] == pay_date), None)
-                    if postpone:
-                        postponed.append((scooter, p, postpone))
-                        print(f"     🔁 Помечен как ПЕРЕНОС")
-                    else:
-                        normal_payments.append((scooter, p))
-                        print(f"     ✅ Помечен как ОБЫЧНАЯ ОПЛАТА")
+    for client in clients:
+        tg_id = client["tg_id"]
+        overdue = client["overdue"]
+        postponed = client["postponed"]
+        normal_payments = client["normal"]
 
-        print(f"📊 Итог по клиенту → Просрочки: {len(overdue)}, Переносы: {len(postponed)}, Обычные платежи: {len(normal_payments)}")
+        print(f"\n🔍 Клиент: {client['full_name']} → Просрочки: {len(overdue)}, Переносы: {len(postponed)}, Обычные платежи: {len(normal_payments)}")
 
         # === 1. Уведомления при ПРОСРОЧКЕ ===
         if severity == "overdue":
             print(f"📨 [OVERDUE] проверяем...")
             if not overdue:
-                print(f"   ❌ Просрочек нет — уведомление не отправляем.")
-                continue
-
-    # ✅ Фильтруем платежи: убираем те, у которых есть перенос на scheduled_date
-            filtered_overdue = []
-            for scooter, row in overdue:
-                scooter_id = scooter["id"]
-                payment_date = row[1]  # дата платежа (original_date)
-                active_postpones = get_active_postpones(scooter_id)
-
-        # Если по этой дате есть перенос → не добавляем в список просрочек
-                if any(p[0] == payment_date or p[1] == payment_date for p in active_postpones):
-                    print(f"   ⏩ Пропущено: {scooter['model']} — перенос найден на {payment_date}")
-                    continue
-
-                filtered_overdue.append((scooter, row))
-
-            if not filtered_overdue:
-                print(f"   ❌ Все просрочки оказались с переносами → уведомления не шлём.")
+                print(f"   ❌ Просрочек без переносов нет — уведомление не отправляем.")
                 continue
 
+            filtered_overdue = overdue
             print(f"   ✅ Найдено {len(filtered_overdue)} просрочек (без переносов), отправляем уведомление…")
 
         # === отправка уведомления о просрочках ===
@@ -117,37 +103,15 @@ async def send_payment_notifications_with_button(bot: Bot, severity: str = "debu
             )
 
             text += format_payment_instruction_block(total)
-            key = str(uuid.uuid4())[:8]
-            payment_confirm_registry[key] = payment_ids
-            cb_data = f"confirm_payment:{key}"
-            keyboard = InlineKeyboardMarkup([
-                [InlineKeyboardButton("✅ Я оплатил", callback_data=cb_data)]
-            ])
-
-            try:
-                await bot.send_message(chat_id=tg_id, text=text, reply_markup=keyboard, parse_mode="HTML")
-                print(f"✅ [OVERDUE] уведомление отправлено → {tg_id}")
-            except Exception as e:
-                print(f"[❌ overdue] {tg_id} → {e}")
+            confirm_groups.append(payment_ids)
+            messages.append({"chat_id": tg_id, "text": text, "parse_mode": "HTML"})
 
             continue  # не даем дойти до стандартных уведомлений
 
         # === 2. Стандартные уведомления / переносы ===
         if severity == "standard":
             print(f"📨 [STANDARD] проверяем...")
-            filtered_overdue = []
-            for scooter, row in overdue:
-                scooter_id = scooter["id"]
-                payment_date = row[1]
-                active_postpones = get_active_postpones(scooter_id)
-
-                if any(p[0] == payment_date or p[1] == payment_date for p in active_postpones):
-                    print(f"   ⏩ {scooter['model']} {payment_date} пропущен (перенос найден)")
-                    continue
-
-                filtered_overdue.append((scooter, row))
-
-            if filtered_overdue:
+            if overdue:
                 print(f"   ⚠️ У клиента есть ЧИСТЫЕ просрочки → стандартное уведомление не отправляем")
                 continue
 
@@ -167,13 +131,8 @@ async def send_payment_notifications_with_button(bot: Bot, severity: str = "debu
                     amount = scooter['weekly_price'] * 2 + fine
                     total += amount
 
+                    # платёж на scheduled_date — это и есть текущая строка
                     payment_ids.append(payment[0])
-                    sched_pid = next(
-                        (p[0] for p in get_payments_by_scooter(scooter['id']) if p[1] == postpone[1]),
-                        None
-                    )
-                    if sched_pid:
-                        payment_ids.append(sched_pid)
 
                     text += (
                         f"🛵 <b>Модель: {scooter['model']}</b>\n"
@@ -183,18 +142,8 @@ async def send_payment_notifications_with_button(bot: Bot, severity: str = "debu
                     )
 
                 text += format_payment_instruction_block(total)
-                key = str(uuid.uuid4())[:8]
-                payment_confirm_registry[key] = payment_ids
-                cb_data = f"confirm_payment:{key}"
-                keyboard = InlineKeyboardMarkup([
-                    [InlineKeyboardButton("✅ Я оплатил", callback_data=cb_data)]
-                ])
-
-                try:
-                    await bot.send_message(chat_id=tg_id, text=text, reply_markup=keyboard, parse_mode="HTML")
-                    print(f"✅ [POSTPONED] уведомление отправлено → {tg_id}")
-                except Exception as e:
-                    print(f"[❌ postpone] {tg_id} → {e}")
+                confirm_groups.append(payment_ids)
+                messages.append({"chat_id": tg_id, "text": text, "parse_mode": "HTML"})
 
                 continue
 
@@ -211,17 +160,15 @@ async def send_payment_notifications_with_button(bot: Bot, severity: str = "debu
                     + format_payment_instruction_block(total)
                 )
 
-                key = str(uuid.uuid4())[:8]
-                payment_confirm_registry[key] = payment_ids
-                cb_data = f"confirm_payment:{key}"
-                keyboard = InlineKeyboardMarkup([
-                    [InlineKeyboardButton("✅ Я оплатил", callback_data=cb_data)]
-                ])
-
-                try:
-                    await bot.send_message(chat_id=tg_id, text=text, reply_markup=keyboard, parse_mode="HTML")
-                    print(f"✅ [NORMAL] уведомление отправлено → {tg_id}")
-                except Exception as e:
-                    print(f"[❌ normal] {tg_id} → {e}")
+                confirm_groups.append(payment_ids)
+                messages.append({"chat_id": tg_id, "text": text, "parse_mode": "HTML"})
             else:
                 print(f"   ❌ Нет обычных платежей на сегодня")
+
+    # ключи кнопок «Я оплатил» — одним запросом до отправки сообщений
+    keys = await payment_confirm_registry.put_many(confirm_groups)
+    for message, key in zip(messages, keys):
+        message["reply_markup"] = InlineKeyboardMarkup([
+            [InlineKeyboardButton("✅ Я оплатил", callback_data=f"confirm_payment:{key}")]
+        ])
+    return await broadcast(bot, messages, label=f"payments:{severity}")
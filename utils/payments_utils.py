@@ -1,7 +1,7 @@
 from datetime import date
 from typing import List
 
-from database.db import get_connection
+from database.db import get_connection, to_async
 from typing import Optional
 from psycopg2.extras import RealDictCursor
 
@@ -58,3 +58,7 @@ def get_payment_id_by_date(scooter_id: int, payment_date: date) -> Optional[int]
             """, (scooter_id, payment_date))
             result = cur.fetchone()
             return result["id"] if result else None
+
+
+
+get_payment_id_by_date_async = to_async(get_payment_id_by_date)
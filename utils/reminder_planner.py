@@ -0,0 +1,336 @@
+import asyncio
+import heapq
+import itertools
+import time
+from datetime import datetime, timedelta, time as dtime
+from os import getenv
+
+from dotenv import load_dotenv
+
+from database.db import open_listen_connection
+from database.ledger import LEDGER_CHANNEL, get_reminder_ledgers_async
+from database.reminders import get_reminder_marks_async, mark_reminders_fired_async
+from utils.notify_utils import send_payment_notifications_with_button
+from utils.time_utils import get_today
+
+
+load_dotenv()
+
+# Как часто повторять напоминание о просрочке (мин)
+REMINDER_OVERDUE_INTERVAL = float(getenv("REMINDER_OVERDUE_INTERVAL", 25))
+# Время стандартных напоминаний в день оплаты, через запятую
+REMINDER_TIMES = sorted(
+    dtime(*map(int, t.split(":")))
+    for t in getenv("REMINDER_TIMES", "08:00,12:00,16:00,16:53,20:00").split(",")
+    if t.strip()
+)
+# Слот, пропущенный из-за перезапуска или смены лидера, ещё отправляем, если опоздали не больше (сек)
+REMINDER_MISFIRE_GRACE = float(getenv("REMINDER_MISFIRE_GRACE", 900))
+# Пауза перед переподключением LISTEN после обрыва (сек): растёт вдвое до максимума
+REMINDER_LISTEN_RETRY_MAX = float(getenv("REMINDER_LISTEN_RETRY_MAX", 60))
+# Полная перестройка плана (ч) — страховка, если NOTIFY потерялся при обрыве соединения
+REMINDER_REBUILD_HOURS = float(getenv("REMINDER_REBUILD_HOURS", 6))
+
+
+def plan_client(ledgers: list, now: datetime, marks: dict = None):
+    """
+    Следующее напоминание клиента по сводкам его скутеров: (когда, severity) или None.
+    marks — {severity: когда последний раз слали} из reminder_marks.
+    severity=None — ничего не слать, только пересчитать (например, в полночь, когда
+    сегодняшний платёж становится просроченным).
+    Просрочку считаем с запасом (перенос учитывается только ближайший) — точный отбор
+    при отправке делает get_payment_notification_candidates, лишний запуск ничего не отправит.
+    """
+    today = get_today()
+    overdue = due_today = False
+    next_date = None
+
+    for ledger in ledgers:
+        covered = set(ledger["postponed_dates"])
+        if ledger["postpone_scheduled_date"] is not None:
+            covered.add(ledger["postpone_scheduled_date"])
+        for pay_date in ledger["unpaid_dates"]:
+            if pay_date < today:
+                overdue = overdue or pay_date not in covered
+            elif pay_date == today:
+                due_today = True
+            elif next_date is None or pay_date < next_date:
+                next_date = pay_date
+
+    marks = marks or {}
+    if overdue:
+        last_overdue = marks.get("overdue")
+        if last_overdue is None:
+            return now, "overdue"
+        return max(now, last_overdue + timedelta(minutes=REMINDER_OVERDUE_INTERVAL)), "overdue"
+
+    if due_today:
+        last_standard = marks.get("standard")
+        for slot in REMINDER_TIMES:
+            when = datetime.combine(now.date(), slot)
+            if last_standard is not None and when <= last_standard:
+                continue      # этот слот уже отправлен
+            if when > now:
+                return when, "standard"
+            if (now - when).total_seconds() <= REMINDER_MISFIRE_GRACE:
+                return now, "standard"
+        # слоты на сегодня кончились — в полночь платёж может стать просрочкой
+        return datetime.combine(now.date() + timedelta(days=1), dtime.min), None
+
+    if next_date is not None and REMINDER_TIMES:
+        return datetime.combine(next_date, REMINDER_TIMES[0]), "standard"
+    return None
+
+
+class ReminderPlanner:
+    """
+    Напоминания об оплате по событиям вместо опроса всех клиентов по таймеру.
+    Для каждого клиента с долгом хранится ближайший момент напоминания в куче (heapq);
+    цикл спит до вершины кучи и будит только тех клиентов, кому пора.
+    План клиента пересчитывается, когда меняется его сводка (LISTEN scooter_ledger
+    от триггера в Postgres) или после отправки ему напоминания. Простой ничего не стоит:
+    ни запросов, ни проходов по клиентам, пока не наступил срок или не пришёл NOTIFY.
+    """
+
+    def __init__(self, bot):
+        self.bot = bot
+        self._heap = []              # (when, seq, client_id)
+        self._plan = {}              # client_id -> (when, severity, seq); устаревшие записи кучи пропускаем
+        self._marks = {}             # client_id -> {severity: когда последний раз слали} (копия reminder_marks)
+        self._dirty = set()          # клиенты, которых надо пересчитать
+        self._seq = itertools.count()
+        self._wakeup = None
+        self._task = None
+        self._listen_conn = None
+        self._reconnect_task = None
+        self._rebuild_at = 0.0       # time.monotonic() следующей полной перестройки
+        self.stats = {"rebuilds": 0, "replanned": 0, "notifies": 0, "fired": 0, "wakeups": 0}
+
+    # --- Запуск / остановка ---
+
+    async def start(self):
+        self._wakeup = asyncio.Event()
+        self._rebuild_at = 0.0       # при (пере)запуске — сразу полный план
+        if not await self._listen():
+            self._schedule_reconnect()
+        self._task = asyncio.create_task(self._run(), name="reminder-planner")
+        print("[REMINDERS] планировщик напоминаний запущен")
+
+    async def stop(self):
+        if self._reconnect_task is not None:
+            self._reconnect_task.cancel()
+            self._reconnect_task = None
+        self._drop_listen()
+        if self._task is not None:
+            self._task.cancel()
+            try:
+                await self._task
+            except asyncio.CancelledError:
+                pass
+            self._task = None
+
+    # --- LISTEN ---
+
+    async def _listen(self) -> bool:
+        try:
+            # psycopg2.connect блокирующий — не держим им event loop
+            conn = await asyncio.to_thread(open_listen_connection, LEDGER_CHANNEL)
+        except Exception as e:
+            print(f"[REMINDERS] ⚠️ LISTEN {LEDGER_CHANNEL} недоступен: {e}")
+            return False
+        self._listen_conn = conn
+        asyncio.get_running_loop().add_reader(conn.fileno(), self._on_notify)
+        return True
+
+    def _drop_listen(self):
+        conn, self._listen_conn = self._listen_conn, None
+        if conn is None:
+            return
+        try:
+            asyncio.get_running_loop().remove_reader(conn.fileno())
+        except (ValueError, OSError):
+            pass      # сокет уже закрыт
+        try:
+            conn.close()
+        except Exception:
+            pass
+
+    def _schedule_reconnect(self):
+        if self._reconnect_task is None or self._reconnect_task.done():
+            self._reconnect_task = asyncio.create_task(self._reconnect(), name="reminder-listen-reconnect")
+
+    async def _reconnect(self):
+        delay = 1.0
+        while True:
+            await asyncio.sleep(delay)
+            if await self._listen():
+                # пока LISTEN не работал, NOTIFY терялись — план строим заново
+                print(f"[REMINDERS] LISTEN {LEDGER_CHANNEL} восстановлен")
+                self._rebuild_at = 0.0
+                if self._wakeup is not None:
+                    self._wakeup.set()
+                return
+            delay = min(delay * 2, REMINDER_LISTEN_RETRY_MAX)
+
+    # --- События ---
+
+    def _on_notify(self):
+        conn = self._listen_conn
+        if conn is None:
+            return
+        try:
+            conn.poll()
+            if conn.closed:
+                raise ConnectionError("соединение закрыто")
+        except Exception as e:
+            # без remove_reader мёртвый сокет будил бы цикл бесконечно
+            print(f"[REMINDERS] ⚠️ LISTEN оборвался: {e}; переподключаемся")
+            self._drop_listen()
+            self._schedule_reconnect()
+            return
+        while conn.notifies:
+            notify = conn.notifies.pop()
+            self.stats["notifies"] += 1
+            if notify.payload.isdigit():
+                self._dirty.add(int(notify.payload))
+        if self._dirty:
+            self._wakeup.set()
+
+    def invalidate(self, *client_ids: int):
+        """Пересчитать план клиентов (если изменения пришли не через базу)."""
+        self._dirty.update(client_ids)
+        if self._wakeup is not None:
+            self._wakeup.set()
+
+    # --- План ---
+
+    def _schedule(self, client_id: int, ledgers: list, now: datetime):
+        planned = plan_client(ledgers, now, self._marks.get(client_id)) if ledgers else None
+        if planned is None:
+            self._plan.pop(client_id, None)
+            self._marks.pop(client_id, None)
+            return
+        when, severity = planned
+        old = self._plan.get(client_id)
+        if old is not None and old[:2] == (when, severity):
+            return
+        seq = next(self._seq)
+        self._plan[client_id] = (when, severity, seq)
+        heapq.heappush(self._heap, (when, seq, client_id))
+
+    async def _rebuild(self):
+        # NOTIFY, пришедшие во время чтения, останутся в _dirty и пересчитаются следом
+        self._dirty.clear()
+        ledgers = await get_reminder_ledgers_async()
+        self._marks = await get_reminder_marks_async(list(ledgers))
+        now = datetime.now()
+        self._heap.clear()
+        self._plan.clear()
+        for client_id, items in ledgers.items():
+            self._schedule(client_id, items, now)
+        self._rebuild_at = time.monotonic() + REMINDER_REBUILD_HOURS * 3600
+        self.stats["rebuilds"] += 1
+        print(f"[REMINDERS] план перестроен: клиентов с долгом {len(self._plan)}")
+
+    async def _replan_dirty(self):
+        client_ids, self._dirty = list(self._dirty), set()
+        try:
+            ledgers = await get_reminder_ledgers_async(client_ids)
+            missing = [cid for cid in client_ids if cid in ledgers and cid not in self._marks]
+            if missing:
+                self._marks.update(await get_reminder_marks_async(missing))
+        except Exception:
+            self._dirty.update(client_ids)
+            raise
+        now = datetime.now()
+        for client_id in client_ids:
+            self._schedule(client_id, ledgers.get(client_id, []), now)
+        self.stats["replanned"] += len(client_ids)
+
+    def _pop_due(self, now: datetime) -> dict:
+        """{severity: [client_id, ...]} всех, чей срок наступил."""
+        due = {}
+        while self._heap and self._heap[0][0] <= now:
+            when, seq, client_id = heapq.heappop(self._heap)
+            planned = self._plan.get(client_id)
+            if planned is None or planned[2] != seq:
+                continue      # план клиента уже пересчитан
+            del self._plan[client_id]
+            due.setdefault(planned[1], []).append(client_id)
+        return due
+
+    def _next_delay(self, now: datetime) -> float:
+        while self._heap:
+            when, seq, client_id = self._heap[0]
+            planned = self._plan.get(client_id)
+            if planned is not None and planned[2] == seq:
+                break
+            heapq.heappop(self._heap)
+        delay = self._rebuild_at - time.monotonic()
+        if self._heap:
+            delay = min(delay, (self._heap[0][0] - now).total_seconds())
+        return max(delay, 0.0)
+
+    async def _fire(self, severity: str, client_ids: list):
+        try:
+            if severity is None:
+                return
+            # отметку ставим до рассылки: после падения посреди рассылки лучше пропустить слот, чем продублировать
+            now = datetime.now()
+            await mark_reminders_fired_async(client_ids, severity, now)
+            for client_id in client_ids:
+                self._marks.setdefault(client_id, {})[severity] = now
+            self.stats["fired"] += len(client_ids)
+            try:
+                await send_payment_notifications_with_button(self.bot, severity=severity, client_ids=client_ids)
+            except Exception as e:
+                print(f"[REMINDERS] ❌ ошибка рассылки {severity}: {e}")
+        finally:
+            # клиенты уже сняты с плана (_pop_due): следующий срок — по свежей сводке,
+            # в том числе если отметку записать не удалось — иначе они выпали бы до полной перестройки
+            self._dirty.update(client_ids)
+
+    async def _run(self):
+        while True:
+            try:
+                if time.monotonic() >= self._rebuild_at:
+                    await self._rebuild()
+                if self._dirty:
+                    await self._replan_dirty()
+
+                due = self._pop_due(datetime.now())
+                failed = False
+                for severity, client_ids in due.items():
+                    try:
+                        await self._fire(severity, client_ids)
+                    except Exception as e:
+                        # остальные группы всё равно отправляем; эти клиенты уже в _dirty
+                        print(f"[REMINDERS] ❌ не удалось отправить {severity} ({len(client_ids)} клиентов): {e}")
+                        failed = True
+                if failed:
+                    await asyncio.sleep(60)     # не долбим недоступную базу: их срок уже наступил
+                if due:
+                    continue
+
+                self._wakeup.clear()
+                if self._dirty:
+                    continue      # NOTIFY пришёл, пока мы пересчитывали план
+                try:
+                    await asyncio.wait_for(self._wakeup.wait(), timeout=self._next_delay(datetime.now()))
+                    self.stats["wakeups"] += 1
+                except asyncio.TimeoutError:
+                    pass
+            except asyncio.CancelledError:
+                raise
+            except Exception as e:
+                # база недоступна и т.п. — не роняем цикл, пробуем снова через минуту
+                print(f"[REMINDERS] ❌ ошибка планировщика: {e}")
+                await asyncio.sleep(60)
+
+    def get_stats(self) -> dict:
+        stats = dict(self.stats)
+        stats["planned"] = len(self._plan)
+        stats["listening"] = self._listen_conn is not None
+        if self._heap:
+            stats["next_at"] = self._heap[0][0].isoformat(timespec="seconds")
+        return stats
@@ -0,0 +1,99 @@
+import asyncio
+import sys
+from os import getenv
+
+from dotenv import load_dotenv
+from telegram import Update
+from telegram.ext import BaseUpdateProcessor
+
+
+load_dotenv()
+
+# Сколько апдейтов обрабатываем одновременно (по разным чатам)
+UPDATE_CONCURRENCY = int(getenv("UPDATE_CONCURRENCY", 64))
+
+
+class PerChatUpdateProcessor(BaseUpdateProcessor):
+    """
+    Параллельная обработка апдейтов разных пользователей при строгой очерёдности внутри одного чата/пользователя.
+    Медленная запись в Google Sheets у одного клиента больше не задерживает остальных, а
+    ConversationHandler (ключ — чат + пользователь) и context.user_data / chat_data
+    по-прежнему видят апдейты одного человека строго по одному и в порядке получения.
+
+    Очерёдность: Application создаёт задачи в порядке получения апдейтов, а asyncio.Lock и семафор
+    отдают место по очереди (FIFO), поэтому апдейты одного ключа выполняются в том же порядке.
+    Апдейт держит lock пользователя и lock чата; берём их в отсортированном порядке — без взаимных блокировок.
+    Место в общем лимите (свой семафор _slots) занимаем только после своих lock: очередь одного
+    активного чата ждёт на его lock и не забирает слоты у остальных. Семафор базового класса
+    берётся раньше do_process_update, поэтому его лимит отключён (sys.maxsize).
+    """
+
+    def __init__(self, max_concurrent_updates: int = UPDATE_CONCURRENCY):
+        super().__init__(sys.maxsize)
+        self.slots_limit = max_concurrent_updates
+        self._slots = asyncio.BoundedSemaphore(max_concurrent_updates)
+        self._locks = {}             # ключ -> [asyncio.Lock, сколько апдейтов его ждут/держат]
+        self.stats = {"processed": 0, "waited": 0, "max_queue": 0}
+
+    @staticmethod
+    def _keys(update) -> list:
+        if not isinstance(update, Update):
+            return []
+        keys = set()
+        if update.effective_user is not None:
+            keys.add(("user", update.effective_user.id))
+        if update.effective_chat is not None:
+            keys.add(("chat", update.effective_chat.id))
+        return sorted(keys)
+
+    def _enter(self, key) -> asyncio.Lock:
+        entry = self._locks.get(key)
+        if entry is None:
+            entry = self._locks[key] = [asyncio.Lock(), 0]
+        entry[1] += 1
+        self.stats["max_queue"] = max(self.stats["max_queue"], entry[1])
+        return entry[0]
+
+    def _leave(self, key):
+        entry = self._locks[key]
+        entry[1] -= 1
+        if entry[1] == 0:
+            del self._locks[key]
+
+    async def do_process_update(self, update, coroutine):
+        keys = self._keys(update)
+        locks = [self._enter(key) for key in keys]
+        acquired = []
+        started = False
+        try:
+            for lock in locks:
+                if lock.locked():
+                    self.stats["waited"] += 1
+                await lock.acquire()
+                acquired.append(lock)
+            async with self._slots:
+                started = True
+                await coroutine
+            self.stats["processed"] += 1
+        finally:
+            if not started:
+                coroutine.close()     # отменили, пока ждали очереди
+            for lock in reversed(acquired):
+                lock.release()
+            for key in keys:
+                self._leave(key)
+
+    async def initialize(self):
+        pass
+
+    async def shutdown(self):
+        pass
+
+    def get_stats(self) -> dict:
+        stats = dict(self.stats)
+        stats["active_keys"] = len(self._locks)
+        stats["slots_limit"] = self.slots_limit
+        return stats
+
+
+update_processor = PerChatUpdateProcessor()
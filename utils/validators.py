@@ -31,6 +31,69 @@ BAD_PATTERNS = [
 compiled_bad_patterns = [re.compile(p, re.IGNORECASE) for p in BAD_PATTERNS]
 
 
+def _trie_regex(words) -> str:
+    """
+    Слова → одна регулярка-префиксное дерево: «бля|блять|блядь» → «бля(?:ть|дь)?».
+    Движок не перебирает сотню альтернатив в каждой позиции, а идёт по общим префиксам.
+    """
+    trie = {}
+    for word in words:
+        node = trie
+        for ch in word:
+            node = node.setdefault(ch, {})
+        node[""] = {}
+
+    def build(node) -> str:
+        ends_here = "" in node
+        branches = [re.escape(ch) + build(child) for ch, child in sorted(node.items()) if ch]
+        if not branches:
+            return ""
+        body = branches[0] if len(branches) == 1 else "(?:" + "|".join(branches) + ")"
+        if ends_here:
+            body = (body if len(branches) > 1 else "(?:" + body + ")") + "?"
+        return body
+
+    return build(trie)
+
+
+# Один проход по тексту: сначала словарь (подстроки), затем шаблоны с обходом цензуры.
+# Без IGNORECASE — текст приводится к нижнему регистру заранее, так движок в разы быстрее.
+PROFANITY_RE = re.compile(
+    "(?P<word>" + _trie_regex(BAD_WORDS) + ")|(?P<pattern>" + "|".join(f"(?:{p})" for p in BAD_PATTERNS) + ")"
+)
+
+# Латиница, цифры и символы, которыми заменяют кириллицу: «xу1ня», «6ля», «п@дла»
+_LEET = str.maketrans({
+    "a": "а", "b": "б", "c": "с", "e": "е", "k": "к", "m": "м", "o": "о", "p": "р",
+    "t": "т", "x": "х", "y": "у", "u": "и",
+    "0": "о", "3": "з", "4": "а", "6": "б", "@": "а", "$": "с",
+})
+_LEET_CHAR_RE = re.compile(r"[abcekmoptxyu0346@$]")
+_CYRILLIC_RE = re.compile(r"[а-яё]")
+
+
+def normalize_leet(text: str) -> str:
+    # заменяем только в словах, где есть и кириллица, и подмены, — «John» и «300₽» не трогаем
+    return " ".join(
+        token.translate(_LEET) if _CYRILLIC_RE.search(token) and _LEET_CHAR_RE.search(token) else token
+        for token in text.split()
+    )
+
+
+def find_profanity(text: str):
+    """
+    "word" — слово из BAD_WORDS, "pattern" — маскированный мат из BAD_PATTERNS, None — чисто.
+    Текст проверяется одной регуляркой; вторая проверка — только если в нём есть подмены символов.
+    """
+    text = text.lower()
+    match = PROFANITY_RE.search(text)
+    if match is None and _LEET_CHAR_RE.search(text):
+        normalized = normalize_leet(text)
+        if normalized != " ".join(text.split()):
+            match = PROFANITY_RE.search(normalized)
+    return match.lastgroup if match else None
+
+
 def is_valid_name(text: str) -> bool:
     text = text.strip().lower()
 
@@ -38,12 +101,37 @@ def is_valid_name(text: str) -> bool:
     if not re.fullmatch(r"[а-яёa-z\s\-]{2,50}", text, re.IGNORECASE):
         return False
 
-    for bad in BAD_WORDS:
-        if bad in text:
-            return False
+    return find_profanity(text) is None
+
+
+def _legacy_find_profanity(text: str):
+    """Прежняя проверка (циклы по словам и шаблонам) — только для сравнения в бенчмарке."""
+    text = text.lower()
+    if any(bad in text for bad in BAD_WORDS):
+        return "word"
+    if any(pattern.search(text) for pattern in compiled_bad_patterns):
+        return "pattern"
+    return None
+
+
+if __name__ == "__main__":
+    # Микробенчмарк: python -m utils.validators
+    import timeit
+
+    samples = [
+        "Здравствуйте, хочу оплатить аренду за две недели вперёд, можно?",
+        "когда приедет мастер? скутер не заводится уже второй день",
+        "Иванов Иван Иванович",
+        "да пошёл ты, сука",
+        "это п@дла какая-то",
+        "ну ты и xуйня",
+    ] * 10
+    number = 200
 
-    for pattern in compiled_bad_patterns:
-        if pattern.search(text):
-            return False
+    for name, fn in (("legacy", _legacy_find_profanity), ("single-pass", find_profanity)):
+        elapsed = timeit.timeit(lambda: [fn(t) for t in samples], number=number)
+        per_msg = elapsed / (number * len(samples)) * 1e6
+        print(f"{name:12s}: {per_msg:.2f} мкс/сообщение")
 
-    return True
+    for t in samples[:6]:
+        print(f"{t!r}: legacy={_legacy_find_profanity(t)}, new={find_profanity(t)}")
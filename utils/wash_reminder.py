@@ -16,7 +16,8 @@ from telegram.ext import (
 )
 
 # === DB ===
-from database.users import get_renters_tg_ids
+from database.users import get_renters_tg_ids_async
+from services.broadcast import broadcast
 
 # === Google Drive (сервисный аккаунт) ===
 from google.oauth2 import service_account
@@ -24,6 +25,8 @@ from googleapiclient.discovery import build
 from googleapiclient.http import MediaIoBaseUpload
 
 from services.google_drive import user_drive_service
+from integrations.retry import retry_sync
+from integrations.google_io import run_google
 
 from dotenv import load_dotenv
 
@@ -53,12 +56,9 @@ async def send_wash_reminders(bot):
         [InlineKeyboardButton("Загрузить фото мойки", callback_data="wash_upload")]
     ])
 
-    tg_ids = get_renters_tg_ids()
-    for tg_id in tg_ids:
-        try:
-            await bot.send_message(chat_id=tg_id, text=text, reply_markup=keyboard)
-        except Exception as e:
-            print(f"[wash_reminder] failed to send to {tg_id}: {e}")
+    tg_ids = await get_renters_tg_ids_async()
+    messages = [{"chat_id": tg_id, "text": text, "reply_markup": keyboard} for tg_id in tg_ids]
+    return await broadcast(bot, messages, label="wash_reminder")
 
 
 def next_friday_15():
@@ -87,21 +87,22 @@ def _find_or_create_subfolder(service, parent_id: str, name: str) -> str:
         f"mimeType='application/vnd.google-apps.folder' and name='{name}' "
         f"and '{parent_id}' in parents and trashed=false"
     )
-    res = service.files().list(q=query, spaces="drive", fields="files(id,name)", pageSize=1).execute()
+    res = retry_sync(lambda: service.files().list(q=query, spaces="drive", fields="files(id,name)", pageSize=1).execute(),
+                     what="wash: find folder")
     files = res.get("files", [])
     if files:
         return files[0]["id"]
 
     # создаём подпапку
     body = {"name": name, "mimeType": "application/vnd.google-apps.folder", "parents": [parent_id]}
-    folder = service.files().create(body=body, fields="id").execute()
+    folder = retry_sync(lambda: service.files().create(body=body, fields="id").execute(), what="wash: create folder")
     return folder["id"]
 
 
 def _upload_jpeg_bytes(service, folder_id: str, filename: str, data: bytes):
     media = MediaIoBaseUpload(io.BytesIO(data), mimetype="image/jpeg", resumable=False)
     body = {"name": filename, "parents": [folder_id]}
-    service.files().create(body=body, media_body=media, fields="id").execute()
+    retry_sync(lambda: service.files().create(body=body, media_body=media, fields="id").execute(), what="wash: upload")
 
 
 # ======================================================
@@ -175,10 +176,11 @@ async def _upload_pack_to_drive(update, context, file_ids):
     owner_tag = username or str(user.id)
     today = datetime.now().date().isoformat()
 
-    service = _drive_service()
     _, wash_folder_id = _env()  # ← получаем актуальный ID папки
     subfolder = f"{today}__{owner_tag}"
-    pack_folder_id = _find_or_create_subfolder(service, wash_folder_id, subfolder)
+    # Drive — блокирующий клиент, поэтому всё через рабочий поток
+    service = await run_google(_drive_service)
+    pack_folder_id = await run_google(_find_or_create_subfolder, service, wash_folder_id, subfolder)
 
     for idx, fid in enumerate(file_ids[:MAX_PHOTOS], start=1):
         tg_file = await context.bot.get_file(fid)
@@ -186,7 +188,7 @@ async def _upload_pack_to_drive(update, context, file_ids):
         await tg_file.download_to_memory(out=buff)
         buff.seek(0)
         filename = f"{today}__{owner_tag}__{idx}.jpg"
-        _upload_jpeg_bytes(service, pack_folder_id, filename, buff.getvalue())
+        await run_google(_upload_jpeg_bytes, service, pack_folder_id, filename, buff.getvalue())
 
 
 